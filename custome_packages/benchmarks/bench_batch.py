@@ -0,0 +1,79 @@
+"""
+バッチモード (get_batch_responses) のローカル実行
+
+スタブサーバーの files / batches API に対して、分類プロンプトを複数のシャード (JSONL) に分けて投入し、
+結果が custom_id で元のリクエストに対応付けられて返ってくることと、シャード作成・全体の所要時間を確認する。
+一部のリクエストは空のメッセージにして、リクエスト単位のエラーとして返ることも確認する。
+
+    pip install hypercorn
+    python bench_batch.py
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# 直接のPythonスクリプト実行を行うために、custome_packagesをパスに追加する
+custome_package_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(custome_package_path))
+
+from agent_framework import ChatOptions  # noqa: E402
+
+from custom_openai import OpenAIChatClient  # noqa: E402
+from mock_openai_server import run_mock_server  # noqa: E402
+
+REQUESTS = 20_000
+REQUESTS_PER_BATCH = 5_000
+INVALID_EVERY = 1_000
+SERVER_ENV = {"MOCK_TOKENS": "2", "MOCK_BATCH_LATENCY": "1.0"}
+
+
+def requests():
+    for index in range(REQUESTS):
+        text = (
+            ""
+            if index % INVALID_EVERY == 0
+            else f"Classify the sentiment: review {index}"
+        )
+        yield f"review-{index}", text
+
+
+async def main() -> None:
+    with run_mock_server(env=SERVER_ENV) as base_url:
+        client = OpenAIChatClient(
+            model_id="mock-model", api_key="mock", base_url=base_url
+        )
+        started = time.perf_counter()
+        first_result = None
+        succeeded = failed = 0
+        batches: set[str | None] = set()
+        seen: set[str] = set()
+        async for result in client.get_batch_responses(
+            requests(),
+            chat_options=ChatOptions(temperature=0.0, max_tokens=4),
+            max_requests_per_batch=REQUESTS_PER_BATCH,
+            poll_interval=0.25,
+            max_poll_interval=1.0,
+        ):
+            if first_result is None:
+                first_result = time.perf_counter() - started
+            seen.add(result.custom_id)
+            batches.add(result.batch_id)
+            if result.response is not None:
+                succeeded += 1
+            else:
+                failed += 1
+        elapsed = time.perf_counter() - started
+        await client.client.close()
+
+    assert seen == {custom_id for custom_id, _ in requests()}
+    print(
+        f"{REQUESTS} requests in {len(batches)} batches: "
+        f"{succeeded} succeeded, {failed} failed (expected {REQUESTS // INVALID_EVERY})"
+    )
+    print(f"first result after {first_result:.2f}s, all results after {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""
+記録・再生トランスポート (CassetteTransport) を使ったオフラインの負荷テストのベンチマーク
+
+スタブサーバーに chat completions / responses のストリームを1本ずつ流してカセットに記録し、
+サーバーを止めたあと、同じリクエストの STREAMS 本の同時ストリームをカセットから再生する。
+記録したときのペース・SPEED 倍速・待ちなしのそれぞれで、経過時間と、
+クライアント側のCPU時間 (実際のパース処理を通る) をチャンクあたりで表示する。
+
+    pip install hypercorn
+    python bench_cassette.py
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+# 直接のPythonスクリプト実行を行うために、custome_packagesをパスに追加する
+custome_package_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(custome_package_path))
+
+from custom_openai import (  # noqa: E402
+    CassetteTransport,
+    OpenAIChatClient,
+    OpenAIResponsesClient,
+)
+from mock_openai_server import run_mock_server  # noqa: E402
+
+STREAMS = 500
+SPEED = 10
+TOKENS = 64
+SERVER_ENV = {
+    "MOCK_TOKENS": str(TOKENS),
+    "MOCK_CHUNK_SIZE": "1",
+    "MOCK_TOKENS_PER_SECOND": "50",
+    "MOCK_FIRST_TOKEN_LATENCY": "0.3",
+}
+CLIENTS: dict[str, Any] = {
+    "chat": OpenAIChatClient,
+    "responses": OpenAIResponsesClient,
+}
+
+
+async def drain(client: Any) -> None:
+    async for _ in client.get_streaming_response("Tell me a story"):
+        pass
+
+
+async def record(path: Path) -> None:
+    with run_mock_server(env=SERVER_ENV) as base_url:
+        for client_class in CLIENTS.values():
+            cassette = CassetteTransport(path, mode="record")
+            client = client_class(
+                model_id="mock-model",
+                api_key="mock",
+                base_url=base_url,
+                cassette=cassette,
+            )
+            await drain(client)
+            await client.client.close()
+
+
+async def replay(path: Path, name: str, speed: float | None) -> None:
+    cassette = CassetteTransport(path, speed=speed)
+    client = CLIENTS[name](model_id="mock-model", api_key="mock", cassette=cassette)
+    wall_started = time.perf_counter()
+    cpu_started = time.process_time()
+    await asyncio.gather(*(drain(client) for _ in range(STREAMS)))
+    cpu = time.process_time() - cpu_started
+    wall = time.perf_counter() - wall_started
+    await client.client.close()
+    pace = "no delays" if speed is None else f"{speed:g}x"
+    print(
+        f"{name:<10} {pace:<10} {STREAMS} streams in {wall:6.2f}s  "
+        f"{cpu / (STREAMS * TOKENS) * 1e6:6.1f}us client CPU/chunk  "
+        f"{cassette.stats()}"
+    )
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "streams.jsonl.gz"
+        await record(path)
+        print(f"recorded {path.stat().st_size} bytes")
+        for name in CLIENTS:
+            for speed in (1.0, SPEED, None):
+                await replay(path, name, speed)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
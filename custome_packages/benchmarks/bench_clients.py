@@ -0,0 +1,257 @@
+"""
+クライアント (chat completions / responses / assistants) のベンチマークスイート
+
+スタブサーバー (mock_openai_server.py、別プロセス) に対して、クライアントごとに
+- リクエストあたりのCPU時間 (ストリーミングなし、初回レイテンシ 0)
+- チャンクあたりのCPU時間 (長いストリームと短いストリームのCPU時間の差をチャンク数の差で割った、限界コスト)
+- ストリームあたりのメモリ (CONCURRENT 本を同時に流したときの tracemalloc のピークの増分)
+- 1コアあたりの最大同時ストリーム数 (実際のモデルに近いトークンレートのストリームの長さを、
+  CONCURRENT 本を同時に流したときのストリームあたりのCPU時間で割った、1コアが飽和する同時ストリーム数)
+を計測する。サーバーは別プロセスなので、CPU時間はクライアント側だけのもの。
+
+結果は client_benchmarks.json にコミットごとに記録し、最後に記録された結果と比較する。
+
+    pip install hypercorn
+    python bench_clients.py                      # 計測して最後の記録と比較する
+    python bench_clients.py --record             # 計測結果を現在のコミットで記録する
+    python bench_clients.py --clients chat responses
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any
+
+# 直接のPythonスクリプト実行を行うために、custome_packagesをパスに追加する
+custome_package_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(custome_package_path))
+
+from custom_openai import (  # noqa: E402
+    OpenAIAssistantsClient,
+    OpenAIChatClient,
+    OpenAIResponsesClient,
+)
+from mock_openai_server import run_mock_server  # noqa: E402
+
+RESULTS_FILE = Path(__file__).with_name("client_benchmarks.json")
+CLIENTS = {
+    "chat": OpenAIChatClient,
+    "responses": OpenAIResponsesClient,
+    "assistants": OpenAIAssistantsClient,
+}
+# CPU時間の計測は RUNS 回の最小値を使う
+RUNS = 3
+
+REQUESTS = 100
+REQUEST_CONCURRENCY = 20
+REQUEST_ENV = {
+    "MOCK_TOKENS": "16",
+    "MOCK_CHUNK_SIZE": "16",
+    "MOCK_FIRST_TOKEN_LATENCY": "0",
+    "MOCK_TOKENS_PER_SECOND": "0",
+}
+
+STREAMS = 50
+SHORT_TOKENS = 16
+LONG_TOKENS = 144
+STREAM_ENV = {
+    "MOCK_CHUNK_SIZE": "1",
+    "MOCK_FIRST_TOKEN_LATENCY": "0",
+    "MOCK_TOKENS_PER_SECOND": "0",
+}
+
+CONCURRENT = 100
+REALISTIC_ENV = {
+    "MOCK_TOKENS": "64",
+    "MOCK_CHUNK_SIZE": "1",
+    "MOCK_FIRST_TOKEN_LATENCY": "0.3",
+    "MOCK_TOKENS_PER_SECOND": "50",
+}
+
+# 比較時に変化として表示する閾値
+NOISE = 0.1
+
+
+def create_client(name: str, base_url: str) -> Any:
+    return CLIENTS[name](model_id="mock-model", api_key="mock", base_url=base_url)
+
+
+async def close_client(client: Any) -> None:
+    # assistants では一時的に作成したアシスタントも削除される
+    await client.close()
+    await client.client.close()
+
+
+async def drain(client: Any) -> None:
+    async for _ in client.get_streaming_response("Tell me a story"):
+        pass
+
+
+async def requests_cpu(name: str, base_url: str) -> float:
+    """ストリーミングなしのリクエストあたりのCPU時間 (秒)"""
+    client = create_client(name, base_url)
+    await client.get_response("Hello")
+    semaphore = asyncio.Semaphore(REQUEST_CONCURRENCY)
+
+    async def one_request() -> None:
+        async with semaphore:
+            await client.get_response("Hello")
+
+    best = float("inf")
+    for _ in range(RUNS):
+        started = time.process_time()
+        await asyncio.gather(*(one_request() for _ in range(REQUESTS)))
+        best = min(best, time.process_time() - started)
+    await close_client(client)
+    return best / REQUESTS
+
+
+async def streams_cpu(name: str, base_url: str) -> float:
+    """STREAMS 本のストリームを同時に流したときのCPU時間 (秒)"""
+    client = create_client(name, base_url)
+    await drain(client)
+    best = float("inf")
+    for _ in range(RUNS):
+        started = time.process_time()
+        await asyncio.gather(*(drain(client) for _ in range(STREAMS)))
+        best = min(best, time.process_time() - started)
+    await close_client(client)
+    return best
+
+
+async def memory_per_stream(name: str, base_url: str) -> float:
+    """CONCURRENT 本のストリームを同時に流したときの、ストリームあたりのメモリのピーク (バイト)"""
+    client = create_client(name, base_url)
+    await drain(client)
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    await asyncio.gather(*(drain(client) for _ in range(CONCURRENT)))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    await close_client(client)
+    return (peak - before) / CONCURRENT
+
+
+async def streams_per_core(name: str, base_url: str) -> float:
+    """ストリームあたりのCPU時間とストリームの長さから求めた、1コアが飽和する同時ストリーム数"""
+    client = create_client(name, base_url)
+    await drain(client)
+    cpu_started = time.process_time()
+    await asyncio.gather(*(drain(client) for _ in range(CONCURRENT)))
+    cpu_per_stream = (time.process_time() - cpu_started) / CONCURRENT
+    await close_client(client)
+    # 計測した経過時間はサーバーと同じコアを取り合うと延びるため、ストリームの本来の長さを使う
+    duration = float(REALISTIC_ENV["MOCK_FIRST_TOKEN_LATENCY"]) + int(
+        REALISTIC_ENV["MOCK_TOKENS"]
+    ) / float(REALISTIC_ENV["MOCK_TOKENS_PER_SECOND"])
+    return duration / cpu_per_stream
+
+
+async def measure(names: list[str]) -> dict[str, dict[str, float]]:
+    results: dict[str, dict[str, float]] = {name: {} for name in names}
+    with run_mock_server(env=REQUEST_ENV) as base_url:
+        for name in names:
+            results[name]["cpu_per_request_us"] = (
+                await requests_cpu(name, base_url) * 1e6
+            )
+    stream_cpu: dict[str, list[float]] = {name: [] for name in names}
+    for tokens in (SHORT_TOKENS, LONG_TOKENS):
+        with run_mock_server(
+            env={**STREAM_ENV, "MOCK_TOKENS": str(tokens)}
+        ) as base_url:
+            for name in names:
+                stream_cpu[name].append(await streams_cpu(name, base_url))
+    for name in names:
+        short, long = stream_cpu[name]
+        chunks = STREAMS * (LONG_TOKENS - SHORT_TOKENS)
+        results[name]["cpu_per_chunk_us"] = (long - short) / chunks * 1e6
+    with run_mock_server(env=REALISTIC_ENV) as base_url:
+        for name in names:
+            results[name]["memory_per_stream_kb"] = (
+                await memory_per_stream(name, base_url) / 1024
+            )
+            results[name]["streams_per_core"] = await streams_per_core(name, base_url)
+    return results
+
+
+def git(*args: str) -> str:
+    return subprocess.run(
+        ["git", *args],
+        cwd=custome_package_path,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+
+
+def current_commit() -> str:
+    """現在のコミット (custom_openai に未コミットの変更があれば -dirty を付ける)"""
+    commit = git("rev-parse", "--short", "HEAD")
+    if git("status", "--porcelain", "--", "custom_openai"):
+        commit += "-dirty"
+    return commit
+
+
+def report(
+    results: dict[str, dict[str, float]],
+    previous: dict[str, dict[str, float]] | None,
+    previous_commit: str | None,
+) -> None:
+    if previous_commit is not None:
+        print(f"compared with {previous_commit}")
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            line = f"{name:<11} {metric:<22} {value:10.1f}"
+            before = (previous or {}).get(name, {}).get(metric)
+            if before:
+                change = value / before - 1
+                # streams_per_core は大きいほうが良い
+                worse = change < 0 if metric == "streams_per_core" else change > 0
+                mark = "" if abs(change) < NOISE else (" worse" if worse else " better")
+                line += f"  {before:10.1f}  {change:+7.1%}{mark}"
+            print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--record", action="store_true")
+    parser.add_argument(
+        "--clients", nargs="+", choices=list(CLIENTS), default=list(CLIENTS)
+    )
+    args = parser.parse_args()
+
+    history: dict[str, dict[str, Any]] = (
+        json.loads(RESULTS_FILE.read_text()) if RESULTS_FILE.exists() else {}
+    )
+    commit = current_commit()
+    previous_commit = next((key for key in reversed(history) if key != commit), None)
+    results = asyncio.run(measure(args.clients))
+    report(
+        results,
+        history[previous_commit]["results"] if previous_commit else None,
+        previous_commit,
+    )
+    if args.record:
+        entry = history.pop(commit, {"results": {}})
+        entry["subject"] = git("log", "-1", "--format=%s")
+        entry["results"].update(
+            {
+                name: {metric: round(value, 2) for metric, value in metrics.items()}
+                for name, metrics in results.items()
+            }
+        )
+        history[commit] = entry
+        RESULTS_FILE.write_text(json.dumps(history, indent=2) + "\n")
+        print(f"recorded as {commit} in {RESULTS_FILE.name}")
+
+
+if __name__ == "__main__":
+    main()
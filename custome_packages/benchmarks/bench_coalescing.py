@@ -0,0 +1,81 @@
+"""
+RequestCoalescer (同一リクエストの相乗り) のベンチマーク
+
+ファンアウトするワークフローを想定して、同じプロンプトを BURST 件ずつ同時に送るバーストを繰り返し、
+相乗りなし / ありで、スタブサーバーへの呼び出し数とバースト全体の所要時間を、
+非ストリーミングとストリーミング (上流のストリームを全リクエストに分配) で比較する。
+スタブサーバーの同時処理数を制限しているので、相乗りなしでは 503 を受けて再試行が発生する。
+
+    pip install hypercorn
+    python bench_coalescing.py
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# 直接のPythonスクリプト実行を行うために、custome_packagesをパスに追加する
+custome_package_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(custome_package_path))
+
+from custom_openai import OpenAIChatClient, RequestCoalescer  # noqa: E402
+from mock_openai_server import run_mock_server  # noqa: E402
+
+BURSTS = 20
+BURST = 16
+SERVER_ENV = {
+    "MOCK_TOKENS": "128",
+    "MOCK_CHUNK_SIZE": "4",
+    "MOCK_TOKENS_PER_SECOND": "2000",
+    "MOCK_FIRST_TOKEN_LATENCY": "0.1",
+    "MOCK_MAX_CONCURRENCY": "8",
+}
+
+
+async def run_mode(
+    base_url: str, coalescer: RequestCoalescer | None, stream: bool
+) -> None:
+    client = OpenAIChatClient(
+        model_id="mock-model",
+        api_key="mock",
+        base_url=base_url,
+        request_coalescer=coalescer,
+    )
+
+    async def one_request(prompt: str) -> str:
+        if not stream:
+            return (await client.get_response(prompt)).text
+        return "".join(
+            [update.text async for update in client.get_streaming_response(prompt)]
+        )
+
+    started = time.perf_counter()
+    for burst in range(BURSTS):
+        prompt = f"Summarize the report of task {burst}"
+        texts = await asyncio.gather(*(one_request(prompt) for _ in range(BURST)))
+        assert coalescer is None or len(set(texts)) == 1
+    elapsed = (time.perf_counter() - started) / BURSTS
+    await client.client.close()
+
+    mode = "stream" if stream else "response"
+    if coalescer is None:
+        print(f"{mode:<9} no coalescing  {elapsed * 1000:7.1f}ms/burst")
+        return
+    stats = coalescer.stats()
+    upstream = stats.streams if stream else stats.calls
+    print(
+        f"{mode:<9} coalescing     {elapsed * 1000:7.1f}ms/burst  "
+        f"upstream calls {upstream}/{BURSTS * BURST}  coalesced {stats.coalesced_ratio:.0%}"
+    )
+
+
+async def main() -> None:
+    with run_mock_server(env=SERVER_ENV) as base_url:
+        for stream in (False, True):
+            await run_mode(base_url, None, stream)
+            await run_mode(base_url, RequestCoalescer(), stream)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
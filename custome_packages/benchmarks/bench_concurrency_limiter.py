@@ -0,0 +1,124 @@
+"""
+AdaptiveConcurrencyLimiter (AIMD) と固定の同時実行数の比較ベンチマーク
+
+同時処理数に上限のあるスタブサーバー (MOCK_MAX_CONCURRENCY、超過分は 503) に対して、
+アプリ側から多数のリクエスト (ストリーミング/非ストリーミング半々) を同時に投げ、
+- 制限なし: 503 が多発し、SDK のリトライを使い切ったリクエストが失敗する
+- 固定で小さい同時実行数: 失敗はしないが、サーバーの処理能力を使い切れない
+- AIMD: サーバーの処理能力付近に同時実行数が収束する
+ことを、503 の数・失敗数・総時間で比較する。
+
+    pip install hypercorn
+    python bench_concurrency_limiter.py
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+# 直接のPythonスクリプト実行を行うために、custome_packagesをパスに追加する
+custome_package_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(custome_package_path))
+
+from custom_openai import AdaptiveConcurrencyLimiter, OpenAIChatClient  # noqa: E402
+from mock_openai_server import run_mock_server  # noqa: E402
+
+SERVER_CAPACITY = 32
+REQUESTS = 600
+APP_CONCURRENCY = 200
+SERVER_ENV = {
+    "MOCK_TOKENS": "16",
+    "MOCK_TOKENS_PER_SECOND": "100",
+    "MOCK_FIRST_TOKEN_LATENCY": "0.3",
+    "MOCK_MAX_CONCURRENCY": str(SERVER_CAPACITY),
+}
+
+
+async def run_mode(
+    base_url: str,
+    name: str,
+    app_concurrency: int,
+    limiter: AdaptiveConcurrencyLimiter | None,
+) -> None:
+    overloaded = 0
+
+    async def count_503(response: httpx.Response) -> None:
+        nonlocal overloaded
+        if response.status_code == 503:
+            overloaded += 1
+
+    async_client = AsyncOpenAI(
+        api_key="mock",
+        base_url=base_url,
+        http_client=DefaultAsyncHttpxClient(
+            event_hooks={"response": [count_503]},
+            limits=httpx.Limits(max_connections=1000),
+        ),
+    )
+    client = OpenAIChatClient(
+        model_id="mock-model", async_client=async_client, concurrency_limiter=limiter
+    )
+    semaphore = asyncio.Semaphore(app_concurrency)
+    failures = 0
+    peak_queue = 0
+    limits: list[float] = []
+
+    async def one_request(stream: bool) -> None:
+        nonlocal failures
+        async with semaphore:
+            try:
+                if stream:
+                    async for _ in client.get_streaming_response("hello"):
+                        pass
+                else:
+                    await client.get_response("hello")
+            except Exception:
+                failures += 1
+
+    async def sample(done: asyncio.Event) -> None:
+        nonlocal peak_queue
+        while limiter is not None and not done.is_set():
+            stats = limiter.stats()
+            peak_queue = max(peak_queue, stats.queue_depth)
+            limits.append(stats.limit)
+            await asyncio.sleep(0.05)
+
+    done = asyncio.Event()
+    sampler = asyncio.create_task(sample(done))
+    started = time.perf_counter()
+    await asyncio.gather(*(one_request(index % 2 == 0) for index in range(REQUESTS)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await sampler
+    await async_client.close()
+
+    print(
+        f"{name:<12} 503s {overloaded:>5}  failures {failures:>4}  "
+        f"total {elapsed:6.2f}s  {REQUESTS / elapsed:7.1f} req/s"
+    )
+    if limiter is not None and limits:
+        stats = limiter.stats()
+        print(
+            f"{'':<12} limit avg {sum(limits) / len(limits):5.1f}  final {stats.limit:5.1f}  "
+            f"peak queue {peak_queue}  cuts {stats.decreases}"
+        )
+
+
+async def main() -> None:
+    print(f"server capacity {SERVER_CAPACITY} concurrent requests")
+    modes = [
+        ("unlimited", APP_CONCURRENCY, None),
+        ("fixed 8", 8, None),
+        ("aimd", APP_CONCURRENCY, AdaptiveConcurrencyLimiter(initial_limit=8)),
+    ]
+    for name, app_concurrency, limiter in modes:
+        with run_mock_server(env=SERVER_ENV) as base_url:
+            await run_mode(base_url, name, app_concurrency, limiter)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""
+コンテキスト予算 (ContextBudget) の事前チェックのコストのベンチマーク
+
+ツール呼び出しを含む会話を TURNS ターンまで伸ばしながら、毎ターンのリクエストの準備
+(_prepare_options) にかかる時間を、予算なし / 予算あり (メッセージごとのトークン数をキャッシュ) /
+予算あり (毎回全メッセージを数え直す) で比較する。予算は会話の途中から超えるように設定し、
+各戦略で送られたメッセージ数とトークン数も表示する。
+
+    python bench_context_budget.py
+"""
+
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# 直接のPythonスクリプト実行を行うために、custome_packagesをパスに追加する
+custome_package_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(custome_package_path))
+
+from agent_framework import (  # noqa: E402
+    ChatMessage,
+    ChatOptions,
+    FunctionCallContent,
+    FunctionResultContent,
+)
+
+from custom_openai import (  # noqa: E402
+    ContextBudget,
+    ContextTrimStrategy,
+    DropOldest,
+    DropOldToolResultsFirst,
+    KeepSystemAndLastN,
+    OpenAIChatClient,
+)
+
+TURNS = 300
+BUDGET = 60_000
+
+
+def add_turn(messages: list[ChatMessage], turn: int) -> None:
+    messages.append(ChatMessage(role="user", text=f"Question {turn}: " + "why " * 40))
+    messages.append(
+        ChatMessage(
+            role="assistant",
+            contents=[
+                FunctionCallContent(
+                    call_id=f"call_{turn}", name="search", arguments={"query": "why"}
+                )
+            ],
+        )
+    )
+    messages.append(
+        ChatMessage(
+            role="tool",
+            contents=[
+                FunctionResultContent(
+                    call_id=f"call_{turn}", result="A search hit. " * 150
+                )
+            ],
+        )
+    )
+    messages.append(ChatMessage(role="assistant", text="Because " * 60))
+
+
+def run_mode(
+    name: str, budget: ContextBudget | None, recount: bool = False
+) -> list[float]:
+    client = OpenAIChatClient(
+        model_id="mock-model", api_key="mock", context_budget=budget
+    )
+    messages = [ChatMessage(role="system", text="You are a helpful agent. " * 200)]
+    timings: list[float] = []
+    sent = 0
+    for turn in range(TURNS):
+        add_turn(messages, turn)
+        if budget is not None and recount:
+            budget._message_tokens.clear()
+        started = time.perf_counter()
+        options = client._prepare_options(messages, ChatOptions())
+        timings.append(time.perf_counter() - started)
+        sent = len(options["messages"])
+    last = timings[-50:]
+    detail = ""
+    if budget is not None:
+        stats = budget.stats()
+        detail = (
+            f"  trimmed {stats.trimmed_requests} requests, "
+            f"last request {sent}/{len(messages)} messages"
+        )
+    print(
+        f"{name:<36} {statistics.mean(last) * 1e6:8.1f}us/turn (last 50 turns){detail}"
+    )
+    return timings
+
+
+def main() -> None:
+    run_mode("no budget", None)
+    run_mode("budget, counts cached per message", ContextBudget(BUDGET))
+    run_mode("budget, recounting every message", ContextBudget(BUDGET), recount=True)
+    strategies: list[ContextTrimStrategy] = [
+        DropOldest(),
+        KeepSystemAndLastN(40),
+        DropOldToolResultsFirst(),
+    ]
+    for strategy in strategies:
+        run_mode(
+            f"strategy {type(strategy).__name__}",
+            ContextBudget(BUDGET, strategy=strategy),
+        )
+
+
+if __name__ == "__main__":
+    main()
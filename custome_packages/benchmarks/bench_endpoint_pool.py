@@ -0,0 +1,133 @@
+"""
+OpenAIEndpointPool の負荷分散・フェイルオーバー確認ベンチマーク
+
+初回レイテンシの異なる3台のスタブサーバーと、何も待ち受けていないポート (停止中のエンドポイント) を
+1つのプールにまとめ、ストリーミングリクエストを流す。
+
+1. 定常状態: 速いエンドポイントにリクエストが寄り、停止中のエンドポイントが排除されること
+2. 障害発生: 途中で最速のサーバーを停止し、トークン受信前の接続エラーが他のエンドポイントへ
+   フェイルオーバーされ、呼び出し側にエラーが返らないこと
+
+    pip install hypercorn
+    python bench_endpoint_pool.py
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+# 直接のPythonスクリプト実行を行うために、custome_packagesをパスに追加する
+custome_package_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(custome_package_path))
+
+from custom_openai import OpenAIChatClient, OpenAIEndpointPool  # noqa: E402
+from mock_openai_server import free_port, run_mock_server  # noqa: E402
+
+# エンドポイントごとの初回レイテンシ (秒)
+LATENCIES = (0.02, 0.1, 0.3)
+REQUESTS = 200
+CONCURRENCY = 20
+
+
+def print_stats(pool: OpenAIEndpointPool) -> None:
+    print(
+        f"  {'endpoint':<28} {'state':<8} {'requests':>8} {'failures':>8} "
+        f"{'latency':>9} {'errors':>6}"
+    )
+    for stats in pool.stats():
+        latency = (
+            f"{stats.latency_ms:7.1f}ms" if stats.latency_ms is not None else "       -"
+        )
+        print(
+            f"  {stats.base_url:<28} {stats.state:<8} {stats.requests:>8} "
+            f"{stats.failures:>8} {latency:>9} {stats.error_rate:>6.2f}"
+        )
+
+
+async def run_requests(
+    client: OpenAIChatClient, count: int, on_halfway: "asyncio.Event | None" = None
+) -> tuple[list[float], int]:
+    """count本のストリーミングリクエストを同時実行数CONCURRENCYで流し、TTFTとエラー数を返す"""
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    ttfts: list[float] = []
+    errors = 0
+    finished = 0
+
+    async def one_request() -> None:
+        nonlocal errors, finished
+        async with semaphore:
+            start = time.perf_counter()
+            first = True
+            try:
+                async for update in client.get_streaming_response("hello"):
+                    if first and update.text:
+                        ttfts.append(time.perf_counter() - start)
+                        first = False
+            except Exception as ex:
+                errors += 1
+                print(f"  error: {type(ex).__name__}: {ex}")
+            finished += 1
+            if on_halfway is not None and finished == count // 2:
+                on_halfway.set()
+
+    await asyncio.gather(*(one_request() for _ in range(count)))
+    return ttfts, errors
+
+
+def print_result(ttfts: list[float], errors: int, elapsed: float) -> None:
+    ttfts.sort()
+    print(
+        f"  ok {len(ttfts)}  errors {errors}  "
+        f"p50 TTFT {statistics.median(ttfts) * 1000:.1f}ms  "
+        f"p99 TTFT {ttfts[int(len(ttfts) * 0.99) - 1] * 1000:.1f}ms  "
+        f"total {elapsed:.2f}s"
+    )
+
+
+async def main() -> None:
+    env = {"MOCK_TOKENS": "16", "MOCK_TOKENS_PER_SECOND": "0"}
+    with ExitStack() as servers:
+        fastest = servers.enter_context(ExitStack())
+        base_urls = [
+            (fastest if index == 0 else servers).enter_context(
+                run_mock_server(env={**env, "MOCK_FIRST_TOKEN_LATENCY": str(latency)})
+            )
+            for index, latency in enumerate(LATENCIES)
+        ]
+        dead_url = f"http://127.0.0.1:{free_port()}/v1"
+        pool = OpenAIEndpointPool(
+            [dead_url, *base_urls], eject_after=2, ejection_duration=1.0
+        )
+        client = OpenAIChatClient(
+            model_id="mock-model", api_key="mock", endpoint_pool=pool
+        )
+
+        print("steady state")
+        started = time.perf_counter()
+        ttfts, errors = await run_requests(client, REQUESTS)
+        print_result(ttfts, errors, time.perf_counter() - started)
+        print_stats(pool)
+
+        print(f"fastest endpoint ({LATENCIES[0] * 1000:.0f}ms) stops halfway")
+        halfway = asyncio.Event()
+
+        async def stop_fastest() -> None:
+            await halfway.wait()
+            await asyncio.to_thread(fastest.close)
+
+        started = time.perf_counter()
+        stopper = asyncio.create_task(stop_fastest())
+        ttfts, errors = await run_requests(client, REQUESTS, halfway)
+        await stopper
+        print_result(ttfts, errors, time.perf_counter() - started)
+        print_stats(pool)
+
+        await client.client.close()
+        await pool.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
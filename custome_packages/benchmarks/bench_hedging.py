@@ -0,0 +1,76 @@
+"""
+HedgingPolicy (ヘッジリクエスト) によるテールレイテンシ削減のベンチマーク
+
+一定の確率で遅くなるスタブサーバー (MOCK_SLOW_PROBABILITY / MOCK_SLOW_LATENCY) に対して
+非ストリーミングの get_response を流し、ヘッジなし/ありで p50・p99 レイテンシと
+ヘッジ率・ヘッジ側の勝率を比較する。
+
+    pip install hypercorn
+    python bench_hedging.py
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# 直接のPythonスクリプト実行を行うために、custome_packagesをパスに追加する
+custome_package_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(custome_package_path))
+
+from custom_openai import HedgingPolicy, OpenAIChatClient  # noqa: E402
+from mock_openai_server import run_mock_server  # noqa: E402
+
+REQUESTS = 400
+CONCURRENCY = 20
+SERVER_ENV = {
+    "MOCK_TOKENS": "16",
+    "MOCK_TOKENS_PER_SECOND": "0",
+    "MOCK_FIRST_TOKEN_LATENCY": "0.05",
+    # 3% のリクエストが 1 秒かかる遅いバックエンドに当たる
+    "MOCK_SLOW_PROBABILITY": "0.03",
+    "MOCK_SLOW_LATENCY": "1.0",
+}
+
+
+async def run_mode(base_url: str, hedging: HedgingPolicy | None) -> None:
+    client = OpenAIChatClient(
+        model_id="mock-model", api_key="mock", base_url=base_url, hedging=hedging
+    )
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies: list[float] = []
+
+    async def one_request() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await client.get_response("hello")
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one_request() for _ in range(REQUESTS)))
+    await client.client.close()
+
+    latencies.sort()
+    name = "hedging" if hedging else "none"
+    print(
+        f"{name:<8} p50 {statistics.median(latencies) * 1000:7.1f}ms  "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:7.1f}ms  "
+        f"max {latencies[-1] * 1000:7.1f}ms"
+    )
+    if hedging:
+        stats = hedging.stats()
+        print(
+            f"         hedge rate {stats.hedge_rate:.1%}  wins {stats.hedge_wins}/{stats.hedged} "
+            f"({stats.win_rate:.0%})  budget exhausted {stats.budget_exhausted}  "
+            f"deadline {stats.delay * 1000:.1f}ms"
+        )
+
+
+async def main() -> None:
+    with run_mock_server(env=SERVER_ENV) as base_url:
+        await run_mode(base_url, None)
+        await run_mode(base_url, HedgingPolicy(percentile=95, budget=0.1))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+"""
+HTTP/1.1 と HTTP/2 (HTTP2MultiplexTransport) の同時ストリーミング比較ベンチマーク
+
+ローカルのスタブサーバーに対して 100/500/1000 本の同時ストリームを張り、
+ソケット数・メモリ使用量 (RSS増加分)・TTFT (time to first token) の p99 を比較する。
+
+    pip install h2 hypercorn psutil
+    python bench_http2_streams.py
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import psutil
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+# 直接のPythonスクリプト実行を行うために、custome_packagesをパスに追加する
+custome_package_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(custome_package_path))
+
+from custom_openai import HTTP2MultiplexTransport, OpenAIChatClient  # noqa: E402
+from mock_openai_server import run_mock_server  # noqa: E402
+
+CONCURRENCY_LEVELS = (100, 500, 1000)
+
+
+def create_client(base_url: str, mode: str) -> OpenAIChatClient:
+    """指定したトランスポートでクライアントを作成する"""
+    if mode == "http2":
+        # スタブサーバーは平文なので、ALPNではなくprior knowledgeでHTTP/2を使う
+        transport = HTTP2MultiplexTransport(max_concurrent_streams=100, http1=False)
+        http_client = DefaultAsyncHttpxClient(transport=transport)
+    else:
+        http_client = DefaultAsyncHttpxClient()
+    async_client = AsyncOpenAI(
+        api_key="mock", base_url=base_url, http_client=http_client
+    )
+    return OpenAIChatClient(model_id="mock-model", async_client=async_client)
+
+
+def count_sockets(port: int) -> int:
+    """サーバーポートに接続しているクライアント側のTCPソケット数"""
+    return sum(
+        1
+        for conn in psutil.Process().net_connections(kind="tcp")
+        if conn.raddr and conn.raddr.port == port
+    )
+
+
+async def run_level(base_url: str, mode: str, concurrency: int) -> dict[str, float]:
+    """1つの同時実行数で計測する"""
+    port = int(base_url.rsplit(":", 1)[1].split("/")[0])
+    client = create_client(base_url, mode)
+    ttfts: list[float] = []
+    peak_sockets = 0
+    process = psutil.Process()
+    baseline_rss = peak_rss = process.memory_info().rss
+
+    async def one_stream() -> None:
+        start = time.perf_counter()
+        first = True
+        async for update in client.get_streaming_response("hello"):
+            if first and update.text:
+                ttfts.append(time.perf_counter() - start)
+                first = False
+
+    async def sample_sockets(done: asyncio.Event) -> None:
+        nonlocal peak_sockets, peak_rss
+        while not done.is_set():
+            peak_sockets = max(peak_sockets, count_sockets(port))
+            peak_rss = max(peak_rss, process.memory_info().rss)
+            await asyncio.sleep(0.05)
+
+    done = asyncio.Event()
+    sampler = asyncio.create_task(sample_sockets(done))
+    started = time.perf_counter()
+    await asyncio.gather(*(one_stream() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await sampler
+    await client.client.close()
+
+    ttfts.sort()
+    return {
+        "sockets": peak_sockets,
+        "rss_mib": (peak_rss - baseline_rss) / 2**20,
+        "ttft_p50_ms": statistics.median(ttfts) * 1000,
+        "ttft_p99_ms": ttfts[int(len(ttfts) * 0.99) - 1] * 1000,
+        "elapsed_s": elapsed,
+    }
+
+
+async def main() -> None:
+    with run_mock_server(env={"MOCK_TOKENS": "32"}) as base_url:
+        print(
+            f"{'mode':<6} {'streams':>7} {'sockets':>7} {'+RSS MiB':>9} "
+            f"{'p50 TTFT':>9} {'p99 TTFT':>9} {'total s':>8}"
+        )
+        for concurrency in CONCURRENCY_LEVELS:
+            for mode in ("http1", "http2"):
+                result = await run_level(base_url, mode, concurrency)
+                print(
+                    f"{mode:<6} {concurrency:>7} {result['sockets']:>7} "
+                    f"{result['rss_mib']:>9.1f} {result['ttft_p50_ms']:>7.1f}ms "
+                    f"{result['ttft_p99_ms']:>7.1f}ms {result['elapsed_s']:>8.2f}"
+                )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,156 @@
+"""
+custom_openai のインポート時間ベンチマーク (python -X importtime ベース)
+
+シナリオごとに新しいプロセスで `python -X importtime` を実行し、
+openai / agent_framework 自体が読み込むモジュールを除いた「パッケージ分の上乗せ時間」
+(追加で読み込まれたモジュールの自己時間の合計) を計測する。
+import_time_budget.json の予算を超えた場合や、遅延ロードされるべきモジュールが
+読み込まれていた場合は終了コード 1 で失敗する。
+
+    python bench_import_time.py            # 計測して予算と比較する
+    python bench_import_time.py --update   # 現在の計測値から予算を更新する
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+# 直接のPythonスクリプト実行を行うために、custome_packagesをパスに追加する
+custome_package_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(custome_package_path))
+
+BUDGET_FILE = Path(__file__).with_name("import_time_budget.json")
+RUNS = 7
+# 予算更新時に計測値へ掛ける余裕
+HEADROOM = 1.5
+# 予算がこれより小さいとノイズで失敗するため、下限を設ける (マイクロ秒)
+MIN_BUDGET_US = 5_000
+
+# パッケージ自体が避けられないインポート
+FRAMEWORK_FLOOR = (
+    "import openai, agent_framework._clients, agent_framework.observability, "
+    "agent_framework._middleware"
+)
+
+# シナリオ名: (実行する文, 読み込まれてはいけないモジュール)
+SCENARIOS: dict[str, tuple[str, tuple[str, ...]]] = {
+    "package": ("import custom_openai", ("openai", "agent_framework")),
+    "chat_client": (
+        "from custom_openai import OpenAIChatClient",
+        (
+            "custom_openai._responses_client",
+            "custom_openai._assistants_client",
+            "packaging.version",
+        ),
+    ),
+    "responses_client": (
+        "from custom_openai import OpenAIResponsesClient",
+        ("custom_openai._chat_client", "custom_openai._assistants_client"),
+    ),
+    "assistants_client": (
+        "from custom_openai import OpenAIAssistantsClient",
+        ("custom_openai._chat_client", "custom_openai._responses_client"),
+    ),
+}
+
+
+def import_times(statement: str) -> dict[str, int]:
+    """新しいプロセスで文を実行し、モジュールごとの自己インポート時間 (マイクロ秒) を返す"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=custome_package_path,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, _, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(self_us)
+    return times
+
+
+def overhead(statement: str, floor_modules: set[str]) -> tuple[int, set[str]]:
+    """フロアに含まれないモジュールの自己時間の合計を、RUNS回の最小値で返す"""
+    runs = [import_times(statement) for _ in range(RUNS)]
+    totals = [
+        sum(us for name, us in times.items() if name not in floor_modules)
+        for times in runs
+    ]
+    return min(totals), set(runs[0])
+
+
+def check_exports() -> list[str]:
+    """遅延ロード表 (_IMPORTS) が各モジュールとパッケージの __all__ と一致しているか確認する"""
+    import importlib
+
+    import custom_openai
+
+    errors: list[str] = []
+    modules = set(getattr(custom_openai, "_IMPORTS", {}).values())
+    for module_name in sorted(modules):
+        module = importlib.import_module(f"custom_openai.{module_name}")
+        for name in module.__all__:
+            if custom_openai._IMPORTS.get(name) != module_name:
+                errors.append(f"{module_name}.{name} is missing from _IMPORTS")
+    if sorted(custom_openai.__all__) != sorted(custom_openai._IMPORTS):
+        errors.append("custom_openai.__all__ does not match _IMPORTS")
+    return errors
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--update", action="store_true", help="予算を更新する")
+    args = parser.parse_args()
+
+    startup_modules = set(import_times("pass"))
+    framework_modules = set(import_times(FRAMEWORK_FLOOR))
+    budgets: dict[str, int] = (
+        json.loads(BUDGET_FILE.read_text()) if BUDGET_FILE.exists() else {}
+    )
+    failures = check_exports()
+    measured: dict[str, int] = {}
+
+    for name, (statement, forbidden) in SCENARIOS.items():
+        # package シナリオは openai 自体を読み込まないので、起動時のモジュールだけを除く
+        floor = startup_modules if name == "package" else framework_modules
+        spent, modules = overhead(statement, floor)
+        measured[name] = spent
+        budget = budgets.get(name)
+        status = "ok"
+        if budget is not None and spent > budget:
+            status = "REGRESSION"
+            failures.append(f"{name}: {spent} us > budget {budget} us")
+        if loaded := sorted(set(forbidden) & modules):
+            status = "REGRESSION"
+            failures.append(f"{name}: unexpectedly imported {', '.join(loaded)}")
+        budget_text = f"{budget / 1000:8.1f} ms" if budget is not None else "       -"
+        print(
+            f"{name:<18} overhead {spent / 1000:8.1f} ms  budget {budget_text}  {status}"
+        )
+
+    if args.update:
+        BUDGET_FILE.write_text(
+            json.dumps(
+                {
+                    name: max(int(value * HEADROOM), MIN_BUDGET_US)
+                    for name, value in measured.items()
+                },
+                indent=2,
+            )
+            + "\n"
+        )
+        print(f"updated {BUDGET_FILE.name}")
+        return 0
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
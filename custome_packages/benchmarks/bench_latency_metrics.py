@@ -0,0 +1,104 @@
+"""
+レイテンシ計測 (LatencyMetrics) のオーバーヘッドのベンチマーク
+
+1. スタブサーバー (SSE) に STREAMS 本のストリームを同時に流し、計測なし / ありで、
+   チャンクあたりのクライアントのCPU時間を比較し、計測した TTFT・トークン間隔・スループットを表示する。
+2. ネットワークを除いた1チャンクあたりの記録 (RequestTiming.update) のコストと、
+   記録中に確保されたメモリ (tracemalloc) を測り、チャンクごとの確保がないことを確認する。
+
+    pip install hypercorn
+    python bench_latency_metrics.py
+"""
+
+import asyncio
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# 直接のPythonスクリプト実行を行うために、custome_packagesをパスに追加する
+custome_package_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(custome_package_path))
+
+from agent_framework import ChatResponseUpdate, TextContent  # noqa: E402
+
+from custom_openai import LatencyMetrics, OpenAIChatClient  # noqa: E402
+from mock_openai_server import run_mock_server  # noqa: E402
+
+STREAMS = 200
+TOKENS = 256
+SERVER_ENV = {
+    "MOCK_TOKENS": str(TOKENS),
+    "MOCK_CHUNK_SIZE": "1",
+    "MOCK_TOKENS_PER_SECOND": "2000",
+    "MOCK_FIRST_TOKEN_LATENCY": "0.05",
+}
+RECORD_UPDATES = 200_000
+
+
+async def run_server_mode(base_url: str, metrics: LatencyMetrics | None) -> None:
+    client = OpenAIChatClient(
+        model_id="mock-model",
+        api_key="mock",
+        base_url=base_url,
+        latency_metrics=metrics,
+    )
+
+    async def one_stream() -> None:
+        async for _ in client.get_streaming_response("Tell me a story"):
+            pass
+
+    cpu_started = time.process_time()
+    await asyncio.gather(*(one_stream() for _ in range(STREAMS)))
+    cpu = time.process_time() - cpu_started
+    await client.client.close()
+    chunks = STREAMS * (TOKENS + 2)
+    name = "with metrics" if metrics is not None else "no metrics"
+    print(f"server  {name:<13} {cpu / chunks * 1e6:6.2f}us client CPU/chunk")
+    if metrics is not None:
+        for (_, model, endpoint), stats in metrics.stats().items():
+            ttft = stats.time_to_first_token
+            gap = stats.inter_token_gap
+            throughput = stats.tokens_per_second
+            print(
+                f"        {model} {endpoint}: {stats.requests} requests, "
+                f"TTFT p50 {ttft.percentile(50) * 1000:.0f}ms p95 {ttft.percentile(95) * 1000:.0f}ms, "
+                f"gap p50 {gap.percentile(50) * 1000:.2f}ms p99 {gap.percentile(99) * 1000:.2f}ms, "
+                f"{throughput.mean:.0f} tokens/s, "
+                f"preparation p50 {stats.preparation.percentile(50) * 1e6:.0f}us"
+            )
+
+
+def run_record() -> None:
+    update = ChatResponseUpdate(contents=[TextContent(text="token")], role="assistant")
+    timing = LatencyMetrics().start("mock-model", "local", streaming=True)
+    timing.prepared()
+    timing.update(update)
+
+    started = time.perf_counter()
+    for _ in range(RECORD_UPDATES):
+        timing.update(update)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for _ in range(RECORD_UPDATES):
+        timing.update(update)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"record  {elapsed / RECORD_UPDATES * 1e9:6.0f}ns/chunk  "
+        f"memory retained after {RECORD_UPDATES} chunks: {after - before} bytes "
+        f"(peak {peak - before} bytes)"
+    )
+
+
+async def main() -> None:
+    with run_mock_server(env=SERVER_ENV) as base_url:
+        await run_server_mode(base_url, None)
+        await run_server_mode(base_url, LatencyMetrics())
+    run_record()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+"""
+リーンストリーミングモード (LeanStreaming) のチャンクあたりのオーバーヘッドのベンチマーク
+
+1. スタブサーバー (SSE) に STREAMS 本のストリームを同時に流し、通常モードとリーンモードで、
+   チャンクあたりのプロセスCPU時間と、受け取った更新 (ChatResponseUpdate) の数を比較する。
+2. ネットワークを除いたチャンク→更新の変換だけのコストを、事前に作ったチャンクで比較する。
+
+    pip install hypercorn
+    python bench_lean_streaming.py
+"""
+
+import asyncio
+import sys
+import time
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+# 直接のPythonスクリプト実行を行うために、custome_packagesをパスに追加する
+custome_package_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(custome_package_path))
+
+from openai.types.chat import ChatCompletionChunk  # noqa: E402
+
+from custom_openai import LeanStreaming, OpenAIChatClient  # noqa: E402
+from custom_openai._tool_calls import StreamingToolCallAssembler  # noqa: E402
+from mock_openai_server import run_mock_server  # noqa: E402
+
+STREAMS = 200
+TOKENS = 256
+SERVER_ENV = {
+    "MOCK_TOKENS": str(TOKENS),
+    "MOCK_CHUNK_SIZE": "1",
+    "MOCK_TOKENS_PER_SECOND": "2000",
+    "MOCK_FIRST_TOKEN_LATENCY": "0.01",
+}
+PARSE_CHUNKS = 50_000
+
+
+async def run_server_mode(base_url: str, lean: LeanStreaming | None) -> None:
+    client = OpenAIChatClient(
+        model_id="mock-model", api_key="mock", base_url=base_url, lean_streaming=lean
+    )
+    updates = 0
+
+    async def one_stream() -> None:
+        nonlocal updates
+        async for _ in client.get_streaming_response("Tell me a story"):
+            updates += 1
+
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    await asyncio.gather(*(one_stream() for _ in range(STREAMS)))
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    await client.client.close()
+    # The stub sends one chunk per token, a finish chunk and a usage chunk
+    chunks = STREAMS * (TOKENS + 2)
+    name = "default" if lean is None else f"lean({lean.max_text_chars})"
+    print(
+        f"server  {name:<10} {cpu / chunks * 1e6:6.1f}us client CPU/chunk  "
+        f"{updates / STREAMS:6.1f} updates/stream  {elapsed:5.2f}s"
+    )
+
+
+def make_chunks() -> list[ChatCompletionChunk]:
+    chunks = [
+        ChatCompletionChunk.model_validate(
+            {
+                "id": "chatcmpl-bench",
+                "object": "chat.completion.chunk",
+                "created": 1_700_000_000,
+                "model": "mock-model",
+                "system_fingerprint": "fp_bench",
+                "choices": [
+                    {
+                        "index": 0,
+                        "delta": {"role": "assistant", "content": "tok "},
+                        "finish_reason": None,
+                    }
+                ],
+            }
+        )
+        for _ in range(PARSE_CHUNKS)
+    ]
+    chunks[-1].choices[0].finish_reason = "stop"
+    return chunks
+
+
+async def iterate(
+    chunks: list[ChatCompletionChunk],
+) -> AsyncIterator[ChatCompletionChunk]:
+    for chunk in chunks:
+        yield chunk
+
+
+async def run_parse_mode(
+    client: OpenAIChatClient,
+    chunks: list[ChatCompletionChunk],
+    lean: LeanStreaming | None,
+) -> None:
+    tool_calls = StreamingToolCallAssembler()
+    updates = 0
+    started = time.perf_counter()
+    if lean is None:
+        async for chunk in iterate(chunks):
+            client._create_chat_response_update(chunk, tool_calls)
+            updates += 1
+    else:
+        async for _ in client._lean_updates(iterate(chunks), tool_calls, lean):
+            updates += 1
+    elapsed = time.perf_counter() - started
+    name = "default" if lean is None else f"lean({lean.max_text_chars})"
+    print(
+        f"parse   {name:<10} {elapsed / len(chunks) * 1e6:6.2f}us/chunk  {updates} updates"
+    )
+
+
+async def main() -> None:
+    with run_mock_server(env=SERVER_ENV) as base_url:
+        for lean in (None, LeanStreaming(max_text_chars=1), LeanStreaming()):
+            await run_server_mode(base_url, lean)
+
+    client = OpenAIChatClient(model_id="mock-model", api_key="mock")
+    chunks = make_chunks()
+    for lean in (None, LeanStreaming(max_text_chars=1), LeanStreaming()):
+        await run_parse_mode(client, chunks, lean)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
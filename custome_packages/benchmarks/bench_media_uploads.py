@@ -0,0 +1,97 @@
+"""
+メディアのアップロードキャッシュ (MediaUploadCache) のベンチマーク
+
+1ターン目に 5MB の PDF を添付した会話を TURNS ターン続け、キャッシュなし (毎ターン base64 の
+data URI でインライン送信) / あり (初回に Files API へアップロードし、以降は file_id で参照) で、
+送信したリクエストボディの合計サイズと、会話全体の所要時間を比較する。
+
+    pip install hypercorn
+    python bench_media_uploads.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+# 直接のPythonスクリプト実行を行うために、custome_packagesをパスに追加する
+custome_package_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(custome_package_path))
+
+from agent_framework import ChatMessage, DataContent, TextContent  # noqa: E402
+from openai import AsyncOpenAI  # noqa: E402
+
+from custom_openai import MediaUploadCache, OpenAIChatClient  # noqa: E402
+from mock_openai_server import run_mock_server  # noqa: E402
+
+TURNS = 30
+PDF_BYTES = 5 * 1024 * 1024
+SERVER_ENV = {
+    "MOCK_TOKENS": "32",
+    "MOCK_TOKENS_PER_SECOND": "0",
+    "MOCK_FIRST_TOKEN_LATENCY": "0.01",
+}
+
+
+async def run_mode(base_url: str, uploads: MediaUploadCache | None) -> None:
+    sent = {"requests": 0, "bytes": 0}
+
+    async def count_request(request: httpx.Request) -> None:
+        sent["requests"] += 1
+        # Uploads are streamed, their content is not read yet
+        sent["bytes"] += int(request.headers.get("content-length", 0))
+
+    http_client = httpx.AsyncClient(event_hooks={"request": [count_request]})
+    client = OpenAIChatClient(
+        model_id="mock-model",
+        async_client=AsyncOpenAI(
+            api_key="mock", base_url=base_url, http_client=http_client
+        ),
+        media_uploads=uploads,
+    )
+    pdf = DataContent(
+        data=b"%PDF-1.7\n" + os.urandom(PDF_BYTES), media_type="application/pdf"
+    )
+    messages = [
+        ChatMessage(
+            role="user",
+            contents=[pdf, TextContent(text="Summarize the attached report")],
+        )
+    ]
+    started = time.perf_counter()
+    for turn in range(TURNS):
+        response = await client.get_response(messages)
+        messages.extend(response.messages)
+        messages.append(ChatMessage(role="user", text=f"Follow-up question {turn}"))
+    elapsed = time.perf_counter() - started
+    if uploads is not None:
+        await uploads.clear()
+    await http_client.aclose()
+
+    name = "upload cache" if uploads is not None else "inline base64"
+    print(
+        f"{name:<14} {sent['bytes'] / 1e6:8.1f}MB sent in {sent['requests']} requests  "
+        f"{elapsed:6.2f}s for {TURNS} turns",
+        end="",
+    )
+    if uploads is not None:
+        stats = uploads.stats()
+        print(
+            f"  (uploads {stats.uploads}, references {stats.references}, "
+            f"deleted {stats.deletions})",
+            end="",
+        )
+    print()
+
+
+async def main() -> None:
+    with run_mock_server(env=SERVER_ENV) as base_url:
+        await run_mode(base_url, None)
+        await run_mode(base_url, MediaUploadCache())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
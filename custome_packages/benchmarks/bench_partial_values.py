@@ -0,0 +1,111 @@
+"""
+構造化出力の部分的な値のストリーミング (partial_values) のマイクロベンチマーク
+
+約 ITEMS 件の明細を持つ請求書の JSON を、DELTA_CHARS 文字ずつのテキストの差分として受け取るときに、
+差分ごとに部分的なモデルを作るコストを
+- バッファ全体の再パース (差分ごとに、それまでのテキスト全体を pydantic_core.from_json(allow_partial=True) でパースする)
+- インクリメンタルなパース (PartialJsonParser が前の差分までの状態を引き継ぎ、値が変わった差分だけ検証する)
+で比較する。どちらも部分的なモデル (partial_model) への検証を含む。
+
+    python bench_partial_values.py
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Literal
+
+from pydantic import BaseModel
+from pydantic_core import from_json
+
+# 直接のPythonスクリプト実行を行うために、custome_packagesをパスに追加する
+custome_package_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(custome_package_path))
+
+from custom_openai import PartialJsonParser, partial_model  # noqa: E402
+
+ITEMS = 60
+DELTA_CHARS = 4
+STREAMS = 20
+
+
+class LineItem(BaseModel):
+    description: str
+    quantity: float
+    unit_price: float
+    category: Literal["goods", "services", "fees", "other"]
+
+
+class Invoice(BaseModel):
+    invoice_number: str
+    customer: str
+    items: list[LineItem]
+    notes: list[str]
+    total: float
+
+
+TEXT = json.dumps(
+    {
+        "invoice_number": "INV-2025-0001",
+        "customer": "Contoso Ltd.",
+        "items": [
+            {
+                "description": f"Consulting hours, week {index}",
+                "quantity": 7.5,
+                "unit_price": 120.0,
+                "category": "services",
+            }
+            for index in range(ITEMS)
+        ],
+        "notes": ["Payable within 30 days"],
+        "total": ITEMS * 900.0,
+    }
+)
+DELTAS = [
+    TEXT[index : index + DELTA_CHARS] for index in range(0, len(TEXT), DELTA_CHARS)
+]
+PARTIAL_INVOICE = partial_model(Invoice)
+
+
+def reparse_stream() -> int:
+    emitted = 0
+    buffer = ""
+    for delta in DELTAS:
+        buffer += delta
+        PARTIAL_INVOICE.model_validate(from_json(buffer, allow_partial=True))
+        emitted += 1
+    return emitted
+
+
+def incremental_stream() -> int:
+    emitted = 0
+    parser = PartialJsonParser()
+    for delta in DELTAS:
+        if parser.feed(delta):
+            PARTIAL_INVOICE.model_validate(parser.value)
+            emitted += 1
+    return emitted
+
+
+def main() -> None:
+    print(f"{len(TEXT)} characters in {len(DELTAS)} deltas of {DELTA_CHARS} characters")
+    baseline = None
+    for name, stream in (
+        ("re-parse whole buffer", reparse_stream),
+        ("incremental", incremental_stream),
+    ):
+        started = time.perf_counter()
+        for _ in range(STREAMS):
+            emitted = stream()
+        elapsed = (time.perf_counter() - started) / STREAMS
+        baseline = baseline or elapsed
+        print(
+            f"{name:<22} {elapsed * 1000:7.2f}ms/stream  "
+            f"{elapsed / len(DELTAS) * 1e6:6.1f}us/delta  "
+            f"{emitted} partial values  {baseline / elapsed:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Predicted Outputs (PredictedOutput) のベンチマーク
+
+ほとんど変わらないファイルを書き直すワークロードを想定し、REWRITES 件のストリーミングの書き直しを、
+予測なし / ほぼ一致する予測 / あまり一致しない予測 で送り、1件あたりの所要時間と、
+クライアントが集計した予測の採用率 (prediction_stats) を比較する。
+スタブサーバーは採用したトークンを生成せずに送る (MOCK_PREDICTION_ACCEPTANCE で採用率を決める)。
+
+    pip install hypercorn
+    python bench_predictions.py
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# 直接のPythonスクリプト実行を行うために、custome_packagesをパスに追加する
+custome_package_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(custome_package_path))
+
+from custom_openai import OpenAIChatClient, PredictedOutput  # noqa: E402
+from mock_openai_server import run_mock_server  # noqa: E402
+
+REWRITES = 10
+TOKENS = 512
+SERVER_ENV = {
+    "MOCK_TOKENS": str(TOKENS),
+    "MOCK_CHUNK_SIZE": "8",
+    "MOCK_TOKENS_PER_SECOND": "400",
+    "MOCK_FIRST_TOKEN_LATENCY": "0.1",
+}
+SOURCE = "def handler(event):\n    return event\n" * (TOKENS * 4 // 36)
+
+
+async def run_mode(name: str, acceptance: str | None) -> None:
+    env = dict(SERVER_ENV)
+    if acceptance is not None:
+        env["MOCK_PREDICTION_ACCEPTANCE"] = acceptance
+    with run_mock_server(env=env) as base_url:
+        client = OpenAIChatClient(
+            model_id="mock-model", api_key="mock", base_url=base_url
+        )
+        durations = []
+        for _ in range(REWRITES):
+            started = time.perf_counter()
+            kwargs = (
+                {} if acceptance is None else {"prediction": PredictedOutput(SOURCE)}
+            )
+            async for _ in client.get_streaming_response(
+                f"Rename handler to on_event, reply with the file only:\n{SOURCE}",
+                **kwargs,
+            ):
+                pass
+            durations.append(time.perf_counter() - started)
+        await client.client.close()
+    stats = client.prediction_stats()
+    print(
+        f"{name:<22} {statistics.mean(durations) * 1000:7.1f}ms/rewrite  "
+        f"acceptance ratio {stats.acceptance_ratio:5.1%}  "
+        f"accepted {stats.accepted_tokens} / rejected {stats.rejected_tokens} tokens"
+    )
+
+
+async def main() -> None:
+    await run_mode("no prediction", None)
+    await run_mode("good prediction (0.9)", "0.9")
+    await run_mode("poor prediction (0.2)", "0.2")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
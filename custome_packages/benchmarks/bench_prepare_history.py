@@ -0,0 +1,107 @@
+"""
+チャット履歴のリクエスト変換 (_prepare_chat_history_for_request) のターンごとのコスト計測
+
+ツール呼び出しを含むエージェントセッション (1ターン = ユーザー発言 + ツール呼び出し + ツール結果 + 応答)
+を200ターンまで伸ばしながら、各ターンの _prepare_options の時間を計測する。
+メッセージ単位のメモがない場合 (毎回キャッシュを消す) は履歴の長さに比例して増えるが、
+メモがある場合は新しいメッセージだけを変換するのでほぼ一定になる。
+
+    python bench_prepare_history.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# 直接のPythonスクリプト実行を行うために、custome_packagesをパスに追加する
+custome_package_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(custome_package_path))
+
+from agent_framework import (  # noqa: E402
+    ChatMessage,
+    ChatOptions,
+    DataContent,
+    FunctionCallContent,
+    FunctionResultContent,
+    TextContent,
+)
+
+from custom_openai import OpenAIChatClient  # noqa: E402
+
+TURNS = 200
+REPORT_AT = (10, 50, 100, 150, 200)
+REPEATS = 20
+# 1x1 PNG
+IMAGE = (
+    "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk"
+    "+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+)
+
+
+def turn_messages(turn: int) -> list[ChatMessage]:
+    """1ターン分のメッセージ (画像付きの発言、ツール呼び出し、ツール結果、応答)"""
+    call_id = f"call_{turn}"
+    arguments = {
+        "query": f"search term {turn}",
+        "filters": {"tags": [f"tag{i}" for i in range(20)], "limit": 50},
+        "notes": "x" * 500,
+    }
+    return [
+        ChatMessage(
+            role="user",
+            contents=[
+                TextContent(text=f"question {turn} " * 20),
+                DataContent(uri=IMAGE),
+            ],
+        ),
+        ChatMessage(
+            role="assistant",
+            contents=[
+                FunctionCallContent(call_id=call_id, name="search", arguments=arguments)
+            ],
+        ),
+        ChatMessage(
+            role="tool",
+            contents=[
+                FunctionResultContent(
+                    call_id=call_id, result={"hits": [f"result {i}" for i in range(30)]}
+                )
+            ],
+        ),
+        ChatMessage(role="assistant", text=f"answer {turn} " * 40),
+    ]
+
+
+def measure(client: OpenAIChatClient, history: list[ChatMessage], memo: bool) -> float:
+    """1ターンの _prepare_options にかかる時間 (REPEATS回の最小値, マイクロ秒)"""
+    best = float("inf")
+    for _ in range(REPEATS):
+        if not memo:
+            client._parsed_messages.clear()
+        # 最後のユーザー発言だけが新しいメッセージ、というターンを再現する
+        client._parsed_messages.get_or_create(history[-1], None, list)
+        start = time.perf_counter()
+        client._prepare_options(history, ChatOptions())
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6
+
+
+def main() -> None:
+    client = OpenAIChatClient(model_id="mock-model", api_key="mock")
+    history: list[ChatMessage] = []
+    print(f"{'turn':>5} {'messages':>8} {'no memo':>10} {'memo':>10} {'speedup':>8}")
+    for turn in range(1, TURNS + 1):
+        history.extend(turn_messages(turn))
+        if turn in REPORT_AT:
+            without = measure(client, history, memo=False)
+            # メモありは、前のターンまでが変換済みの状態から計測する
+            client._prepare_options(history[:-1], ChatOptions())
+            with_memo = measure(client, history, memo=True)
+            print(
+                f"{turn:>5} {len(history):>8} {without:>8.0f}us {with_memo:>8.0f}us "
+                f"{without / with_memo:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+プロンプトキャッシュを意識したリクエストの構成 (PromptCaching) のベンチマーク
+
+長い指示とツールを持つエージェントが複数の会話を並行して進めるワークロードで、
+スタブサーバーのプロンプトキャッシュの模擬 (MOCK_PROMPT_CACHE_MACHINES) に対する
+キャッシュヒット率 (キャッシュから読まれた入力トークンの割合) を比較する。
+ツールは実行ごとに異なる順序で渡される (エージェントとランのツールのマージを想定)。
+PromptCaching なしではツールの順序が変わるとプレフィックスが変わり、順序が固定でも
+キーがないためリクエストがマシンに分散する。PromptCaching ありではツールが名前順に並び、
+会話ごとの prompt_cache_key で同じマシンに振り分けられる。
+
+    pip install hypercorn
+    python bench_prompt_caching.py
+"""
+
+import asyncio
+import random
+import sys
+from pathlib import Path
+
+# 直接のPythonスクリプト実行を行うために、custome_packagesをパスに追加する
+custome_package_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(custome_package_path))
+
+from agent_framework import ChatMessage, ai_function  # noqa: E402
+
+from custom_openai import OpenAIChatClient, PromptCaching  # noqa: E402
+from mock_openai_server import run_mock_server  # noqa: E402
+
+AGENTS = 3
+CONVERSATIONS = 8
+TURNS = 6
+SERVER_ENV = {
+    "MOCK_TOKENS": "32",
+    "MOCK_TOKENS_PER_SECOND": "0",
+    "MOCK_FIRST_TOKEN_LATENCY": "0.01",
+    "MOCK_PROMPT_CACHE_MACHINES": "8",
+}
+
+
+def make_tool(index: int):  # type: ignore[no-untyped-def]
+    def lookup(query: str, limit: int = 10) -> str:
+        return query
+
+    return ai_function(
+        lookup,
+        name=f"lookup_{index}",
+        description=f"Look up records in data source {index}. " * 8,
+    )
+
+
+TOOLS = [make_tool(index) for index in range(12)]
+
+
+async def run_mode(base_url: str, caching: PromptCaching | None, shuffle: bool) -> None:
+    client = OpenAIChatClient(
+        model_id="mock-model",
+        api_key="mock",
+        base_url=base_url,
+        prompt_caching=caching,
+    )
+    input_tokens = 0
+    cached_tokens = 0
+    rng = random.Random(0)
+
+    async def conversation(agent: int, number: int) -> None:
+        nonlocal input_tokens, cached_tokens
+        instructions = f"You are agent {agent}. " + "Follow the policy. " * 600
+        messages = [ChatMessage(role="system", text=instructions)]
+        for turn in range(TURNS):
+            messages.append(
+                ChatMessage(role="user", text=f"Conversation {number}, turn {turn}")
+            )
+            tools = list(TOOLS)
+            if shuffle:
+                rng.shuffle(tools)
+            if caching is None:
+                response = await client.get_response(messages, tools=tools)
+            else:
+                with caching.scope(agent=f"agent-{agent}"):
+                    response = await client.get_response(messages, tools=tools)
+            messages.extend(response.messages)
+            usage = response.usage_details
+            if usage is not None:
+                input_tokens += usage.input_token_count or 0
+                cached_tokens += usage.additional_counts.get("prompt/cached_tokens", 0)
+
+    await asyncio.gather(
+        *(
+            conversation(agent, number)
+            for agent in range(AGENTS)
+            for number in range(CONVERSATIONS)
+        )
+    )
+    await client.client.close()
+
+    name = "prompt caching" if caching is not None else "no prompt caching"
+    name += ", shuffled tools" if shuffle else ", fixed tools"
+    print(
+        f"{name:<33} hit ratio {cached_tokens / input_tokens:6.1%}  "
+        f"cached {cached_tokens}/{input_tokens} input tokens"
+    )
+    if caching is not None:
+        for (agent, model), stats in sorted(caching.stats().items()):
+            print(
+                f"  {agent} {model}: {stats.requests} requests  hit ratio {stats.hit_ratio:6.1%}  "
+                f"saved {stats.saved_tokens} tokens  prefix changes {stats.prefix_changes}"
+            )
+
+
+async def main() -> None:
+    for caching, shuffle in ((None, True), (None, False), (PromptCaching(), True)):
+        # Every mode starts with a cold cache
+        with run_mock_server(env=SERVER_ENV) as base_url:
+            await run_mode(base_url, caching, shuffle)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
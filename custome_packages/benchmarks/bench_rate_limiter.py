@@ -0,0 +1,114 @@
+"""
+OpenAIRateLimiter の効果を確認するベンチマーク
+
+TPM制限付きのスタブサーバー (MOCK_TPM) に対して、同じアカウントを使う2つのクライアントから
+制限を超える量のリクエストを流し、レートリミッターなし/ありで 429 の数と失敗数を比較する。
+リミッターなしでは SDK のリトライを使い切って失敗するリクエストが出るが、
+リミッターありでは呼び出し側が待つため 429 がほぼ発生しない。
+
+    pip install hypercorn
+    python bench_rate_limiter.py
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+# 直接のPythonスクリプト実行を行うために、custome_packagesをパスに追加する
+custome_package_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(custome_package_path))
+
+from custom_openai import OpenAIChatClient, OpenAIRateLimiter  # noqa: E402
+from mock_openai_server import run_mock_server  # noqa: E402
+
+TOKENS_PER_MINUTE = 12_000
+REQUESTS_PER_CLIENT = 300
+CONCURRENCY = 50
+SERVER_ENV = {
+    "MOCK_TOKENS": "16",
+    "MOCK_TPM": str(TOKENS_PER_MINUTE),
+    "MOCK_FIRST_TOKEN_LATENCY": "0.01",
+    "MOCK_TOKENS_PER_SECOND": "0",
+}
+
+
+async def run_mode(base_url: str, limiter: OpenAIRateLimiter | None) -> None:
+    status_429 = 0
+
+    async def count_429(response: httpx.Response) -> None:
+        nonlocal status_429
+        if response.status_code == 429:
+            status_429 += 1
+
+    async_client = AsyncOpenAI(
+        api_key="mock",
+        base_url=base_url,
+        http_client=DefaultAsyncHttpxClient(event_hooks={"response": [count_429]}),
+    )
+    # 同じアカウントを使う2つのクライアントで1つのリミッターを共有する
+    clients = [
+        OpenAIChatClient(
+            model_id="mock-model", async_client=async_client, rate_limiter=limiter
+        )
+        for _ in range(2)
+    ]
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    failures = 0
+
+    async def one_request(client: OpenAIChatClient, stream: bool) -> None:
+        nonlocal failures
+        async with semaphore:
+            try:
+                if stream:
+                    async for _ in client.get_streaming_response(
+                        "hello", max_tokens=16
+                    ):
+                        pass
+                else:
+                    await client.get_response("hello", max_tokens=16)
+            except Exception:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            one_request(client, stream=index % 2 == 0)
+            for client in clients
+            for index in range(REQUESTS_PER_CLIENT)
+        )
+    )
+    elapsed = time.perf_counter() - started
+    await async_client.close()
+
+    name = "limiter" if limiter else "none"
+    print(
+        f"{name:<8} requests {len(clients) * REQUESTS_PER_CLIENT}  "
+        f"429s {status_429:>4}  failures {failures:>4}  total {elapsed:6.2f}s"
+    )
+    if limiter:
+        stats = limiter.stats()
+        print(
+            f"         learned TPM {stats.tokens_per_minute}  waits {stats.waits}  "
+            f"corrected tokens {stats.corrections}"
+        )
+
+
+async def main() -> None:
+    # サーバー側のバケットを毎回満タンから始めるため、モードごとにサーバーを起動する
+    with run_mock_server(env=SERVER_ENV) as base_url:
+        await run_mode(base_url, None)
+    with run_mock_server(env=SERVER_ENV) as base_url:
+        await run_mode(
+            base_url,
+            OpenAIRateLimiter(
+                tokens_per_minute=TOKENS_PER_MINUTE, default_completion_tokens=16
+            ),
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
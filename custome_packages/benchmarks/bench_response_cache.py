@@ -0,0 +1,96 @@
+"""
+ResponseCache (完全一致のレスポンスキャッシュ) のベンチマーク
+
+評価の再実行を想定して、同じプロンプト集合 (temperature=0) を2回流し、
+1回目 (すべてミス) と2回目 (すべてヒット) の1リクエストあたりの時間とヒット率を、
+メモリ (LRU) とディスク (TTL) のバックエンド、非ストリーミングとストリーミングで比較する。
+temperature>0 のリクエストはキャッシュされない (bypassed) ことも確認する。
+
+    pip install hypercorn
+    python bench_response_cache.py
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 直接のPythonスクリプト実行を行うために、custome_packagesをパスに追加する
+custome_package_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(custome_package_path))
+
+from custom_openai import (  # noqa: E402
+    DiskResponseCacheBackend,
+    MemoryResponseCacheBackend,
+    OpenAIChatClient,
+    ResponseCache,
+    ResponseCacheBackend,
+)
+from mock_openai_server import run_mock_server  # noqa: E402
+
+PROMPTS = 200
+CONCURRENCY = 20
+SERVER_ENV = {
+    "MOCK_TOKENS": "64",
+    "MOCK_CHUNK_SIZE": "4",
+    "MOCK_TOKENS_PER_SECOND": "2000",
+    "MOCK_FIRST_TOKEN_LATENCY": "0.05",
+}
+
+
+async def run_pass(client: OpenAIChatClient, stream: bool, temperature: float) -> float:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def one_request(index: int) -> None:
+        async with semaphore:
+            prompt = f"Classify the sentiment of review {index}"
+            if stream:
+                async for _ in client.get_streaming_response(
+                    prompt, temperature=temperature
+                ):
+                    pass
+            else:
+                await client.get_response(prompt, temperature=temperature)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_request(index) for index in range(PROMPTS)))
+    return (time.perf_counter() - started) / PROMPTS
+
+
+async def run_mode(
+    base_url: str, name: str, backend: ResponseCacheBackend, stream: bool
+) -> None:
+    cache = ResponseCache(backend)
+    client = OpenAIChatClient(
+        model_id="mock-model", api_key="mock", base_url=base_url, response_cache=cache
+    )
+    cold = await run_pass(client, stream, temperature=0.0)
+    warm = await run_pass(client, stream, temperature=0.0)
+    await run_pass(client, stream, temperature=0.7)
+    await client.client.close()
+    stats = cache.stats()
+    mode = "stream" if stream else "response"
+    print(
+        f"{name:<7} {mode:<9} cold {cold * 1000:6.2f}ms/req  warm {warm * 1000:6.2f}ms/req  "
+        f"hit ratio {stats.hit_ratio:.0%}  stores {stats.stores}  bypassed {stats.bypassed}"
+    )
+
+
+async def main() -> None:
+    with (
+        run_mock_server(env=SERVER_ENV) as base_url,
+        tempfile.TemporaryDirectory() as directory,
+    ):
+        for stream in (False, True):
+            await run_mode(base_url, "memory", MemoryResponseCacheBackend(), stream)
+            await run_mode(
+                base_url,
+                "disk",
+                DiskResponseCacheBackend(Path(directory) / str(stream), ttl=3600),
+                stream,
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
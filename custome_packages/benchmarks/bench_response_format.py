@@ -0,0 +1,146 @@
+"""
+構造化出力 (response_format) のコンパイル済みスキーマのキャッシュのマイクロベンチマーク
+
+抽出サービスのような入れ子のスキーマのクラスを毎回同じ response_format として渡すリクエストについて、
+1リクエストごとの
+- chat: response_format の JSON schema の生成 (_prepare_options 全体)
+- responses: text.format の JSON schema の生成 (以前は responses.parse / stream が毎回生成していた)
+  と、応答の JSON の検証
+の時間を、キャッシュなし (毎回スキーマを生成する) / あり (クラスごとに1度だけ生成する) で比較する。
+
+    python bench_response_format.py
+"""
+
+import json
+import sys
+import timeit
+from pathlib import Path
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+# 直接のPythonスクリプト実行を行うために、custome_packagesをパスに追加する
+custome_package_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(custome_package_path))
+
+from agent_framework import ChatMessage, ChatOptions  # noqa: E402
+from openai.lib._parsing._responses import type_to_text_format_param  # noqa: E402
+
+from custom_openai import OpenAIChatClient, OpenAIResponsesClient  # noqa: E402
+from custom_openai._caching import response_formats  # noqa: E402
+
+NUMBER = 2000
+
+
+class Money(BaseModel):
+    amount: float
+    currency: str = Field(description="ISO 4217 currency code")
+
+
+class Party(BaseModel):
+    name: str
+    tax_id: str | None
+    address: str | None
+    role: Literal["buyer", "seller", "agent"]
+
+
+class LineItem(BaseModel):
+    description: str
+    quantity: float
+    unit_price: Money
+    total: Money
+    category: Literal["goods", "services", "fees", "other"]
+
+
+class Invoice(BaseModel):
+    invoice_number: str
+    issued_on: str = Field(description="ISO 8601 date")
+    due_on: str | None
+    parties: list[Party]
+    items: list[LineItem]
+    subtotal: Money
+    tax: Money | None
+    total: Money
+    notes: list[str]
+
+
+RESPONSE_TEXT = json.dumps(
+    {
+        "invoice_number": "INV-1",
+        "issued_on": "2025-01-01",
+        "due_on": None,
+        "parties": [
+            {"name": "A", "tax_id": None, "address": None, "role": "buyer"},
+            {"name": "B", "tax_id": "X1", "address": "Street 1", "role": "seller"},
+        ],
+        "items": [
+            {
+                "description": f"Item {index}",
+                "quantity": 1,
+                "unit_price": {"amount": 10, "currency": "EUR"},
+                "total": {"amount": 10, "currency": "EUR"},
+                "category": "goods",
+            }
+            for index in range(10)
+        ],
+        "subtotal": {"amount": 100, "currency": "EUR"},
+        "tax": None,
+        "total": {"amount": 100, "currency": "EUR"},
+        "notes": [],
+    }
+)
+
+
+def report(name: str, results: dict[str, float]) -> None:
+    baseline = results["no cache"]
+    for mode, elapsed in results.items():
+        print(
+            f"{name:<28} {mode:<9} {elapsed / NUMBER * 1e6:8.1f}us/request "
+            f"{baseline / elapsed:6.1f}x"
+        )
+
+
+def main() -> None:
+    messages = [ChatMessage(role="user", text="Extract the invoice")]
+    chat = OpenAIChatClient(model_id="mock-model", api_key="mock")
+    responses = OpenAIResponsesClient(model_id="mock-model", api_key="mock")
+
+    def chat_request() -> None:
+        chat._prepare_options(messages, ChatOptions(response_format=Invoice))
+
+    def chat_request_uncached() -> None:
+        response_formats.clear()
+        chat_request()
+
+    report(
+        "chat _prepare_options",
+        {
+            "no cache": timeit.timeit(chat_request_uncached, number=NUMBER),
+            "cached": timeit.timeit(chat_request, number=NUMBER),
+        },
+    )
+
+    def responses_request() -> None:
+        responses._prepare_options(messages, ChatOptions(response_format=Invoice))
+        response_formats.validator(Invoice)(RESPONSE_TEXT)
+
+    def responses_request_sdk() -> None:
+        # What responses.parse did on every call: generate the text format and validate the text
+        responses._prepare_options(messages, ChatOptions())
+        type_to_text_format_param(Invoice)
+        Invoice.model_validate_json(RESPONSE_TEXT)
+
+    report(
+        "responses prepare + validate",
+        {
+            "no cache": timeit.timeit(responses_request_sdk, number=NUMBER),
+            "cached": timeit.timeit(responses_request, number=NUMBER),
+        },
+    )
+    print(
+        f"response format cache: {response_formats.hits} hits, {response_formats.misses} misses"
+    )
+
+
+if __name__ == "__main__":
+    main()
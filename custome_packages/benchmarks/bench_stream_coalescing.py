@@ -0,0 +1,88 @@
+"""
+ストリーミングの差分の結合 (StreamCoalescing) のベンチマーク
+
+トークン単位のストリーム (1チャンク=1トークン) を STREAMS 本同時に流し、結合の窓
+(max_delay / max_chars) ごとに、ストリームあたりの更新 (ChatResponseUpdate) の数と削減率、
+最初のテキストが届くまでの時間を比較する。更新の数はおおよそ ストリームの時間 / max_delay まで減り、
+テキストは最大で max_delay (とイベントループの遅れ) だけ遅れて届く。
+
+    pip install hypercorn
+    python bench_stream_coalescing.py
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# 直接のPythonスクリプト実行を行うために、custome_packagesをパスに追加する
+custome_package_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(custome_package_path))
+
+from custom_openai import OpenAIChatClient, StreamCoalescing  # noqa: E402
+from mock_openai_server import run_mock_server  # noqa: E402
+
+STREAMS = 10
+SERVER_ENV = {
+    "MOCK_TOKENS": "512",
+    "MOCK_CHUNK_SIZE": "1",
+    "MOCK_TOKENS_PER_SECOND": "200",
+    "MOCK_FIRST_TOKEN_LATENCY": "0.2",
+}
+WINDOWS = [
+    None,
+    StreamCoalescing(max_delay=0.02, max_chars=64),
+    StreamCoalescing(max_delay=0.05, max_chars=256),
+    StreamCoalescing(max_delay=0.1, max_chars=1024),
+    StreamCoalescing(max_delay=0.25, max_chars=4096),
+]
+
+
+async def run_mode(base_url: str, coalescing: StreamCoalescing | None) -> float:
+    client = OpenAIChatClient(
+        model_id="mock-model",
+        api_key="mock",
+        base_url=base_url,
+        stream_coalescing=coalescing,
+    )
+
+    async def one_stream() -> tuple[int, float, float]:
+        updates = 0
+        first_text = 0.0
+        started = time.perf_counter()
+        async for update in client.get_streaming_response("Tell me a story"):
+            updates += 1
+            if not first_text and update.text:
+                first_text = time.perf_counter() - started
+        return updates, first_text, time.perf_counter() - started
+
+    results = await asyncio.gather(*(one_stream() for _ in range(STREAMS)))
+    await client.client.close()
+    updates = statistics.mean(result[0] for result in results)
+    first_text = statistics.mean(result[1] for result in results)
+    duration = statistics.mean(result[2] for result in results)
+    name = (
+        "none"
+        if coalescing is None
+        else f"{coalescing.max_delay * 1000:.0f}ms/{coalescing.max_chars}ch"
+    )
+    print(
+        f"{name:<12} {updates:6.1f} updates/stream  first text {first_text * 1000:6.1f}ms  "
+        f"stream {duration * 1000:7.1f}ms",
+        end="",
+    )
+    return updates
+
+
+async def main() -> None:
+    with run_mock_server(env=SERVER_ENV) as base_url:
+        baseline = None
+        for coalescing in WINDOWS:
+            updates = await run_mode(base_url, coalescing)
+            baseline = baseline or updates
+            print(f"  {baseline / updates:5.1f}x fewer updates")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""
+ツール定義 (JSON schema) のコンパイル済みキャッシュのマイクロベンチマーク
+
+50個の AIFunction を持つエージェントを想定して、1リクエストごとのツール変換
+(chat: _chat_to_tool_spec, responses: _tools_to_response_tools) の時間を
+- キャッシュなし (毎回 JSON schema を生成する)
+- ツール単位のキャッシュ (ツールセットの一部が変わった場合)
+- ツールリスト全体の再利用 (同じツールセットが再度渡された場合)
+で比較する。
+
+    python bench_tool_specs.py
+"""
+
+import sys
+import timeit
+from pathlib import Path
+from typing import Annotated, Literal
+
+from pydantic import BaseModel, Field
+
+# 直接のPythonスクリプト実行を行うために、custome_packagesをパスに追加する
+custome_package_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(custome_package_path))
+
+from agent_framework import AIFunction, ai_function  # noqa: E402
+
+from custom_openai import OpenAIChatClient, OpenAIResponsesClient  # noqa: E402
+
+TOOLS = 50
+NUMBER = 200
+
+
+class Address(BaseModel):
+    street: str
+    city: str
+    country: Annotated[str, Field(description="ISO country code")]
+
+
+class Filters(BaseModel):
+    tags: list[str] = []
+    limit: int = 10
+    order: Literal["asc", "desc"] = "asc"
+    address: Address | None = None
+
+
+def make_tool(index: int) -> AIFunction:
+    def tool(
+        query: Annotated[str, Field(description="What to search for")],
+        filters: Filters,
+        page: int = 1,
+    ) -> str:
+        return query
+
+    return ai_function(tool, name=f"tool_{index}", description=f"Tool number {index}")
+
+
+def bench(name: str, convert, tools: list[AIFunction], cache) -> None:
+    def uncached() -> None:
+        cache._specs.clear()
+        cache._last_key = ()
+        convert(tools)
+
+    changed = list(tools)
+    replacements = iter([make_tool(0) for _ in range(NUMBER)])
+
+    def per_tool() -> None:
+        # 毎回1つだけ新しいツールに入れ替わるツールセット
+        changed[0] = next(replacements)
+        convert(changed)
+
+    results = {
+        "no cache": timeit.timeit(uncached, number=NUMBER),
+        "per tool": timeit.timeit(per_tool, number=NUMBER),
+        "whole list": timeit.timeit(lambda: convert(tools), number=NUMBER),
+    }
+    baseline = results["no cache"]
+    for mode, elapsed in results.items():
+        print(
+            f"{name:<10} {mode:<11} {elapsed / NUMBER * 1e6:9.1f}us/request "
+            f"{baseline / elapsed:7.1f}x"
+        )
+
+
+def main() -> None:
+    tools = [make_tool(index) for index in range(TOOLS)]
+    chat = OpenAIChatClient(model_id="mock-model", api_key="mock")
+    responses = OpenAIResponsesClient(model_id="mock-model", api_key="mock")
+    print(f"{TOOLS} function tools")
+    bench("chat", chat._chat_to_tool_spec, tools, chat._tool_specs)
+    bench("responses", responses._tools_to_response_tools, tools, responses._tool_specs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,996 @@
+"""
+ベンチマーク用のローカルOpenAI互換スタブサーバー
+
+chat completions (SSEストリーミングを含む) を実際のAPIと同じ形式で返す。
+トークン数・チャンクサイズ・初回レイテンシ・トークンレートは環境変数で設定する。
+MOCK_RPM / MOCK_TPM を設定すると、x-ratelimit-* ヘッダーを返し、超過時は 429 を返す。
+MOCK_MAX_CONCURRENCY を設定すると、同時処理数を超えたリクエストに 503 を返す。
+MOCK_SLOW_PROBABILITY の確率で、初回レイテンシが MOCK_SLOW_LATENCY になる (遅いバックエンドの再現)。
+files (アップロード・削除) / batches API も備え、バッチは作成から MOCK_BATCH_LATENCY 秒後に完了する (最後のメッセージが空のリクエストは 400 になる)。
+MOCK_PROMPT_CACHE_MACHINES を設定すると、その台数のマシンのプロンプトキャッシュを模擬し、
+usage に cached_tokens を返す (プロンプトのトークン数は文字数/4 で見積もる)。
+prediction (Predicted Outputs) 付きのリクエストでは、予測のトークンの MOCK_PREDICTION_ACCEPTANCE の割合を
+採用したとして usage に accepted/rejected_prediction_tokens を返し、ストリーミングでは採用したトークンを待たずに送る。
+responses API (SSE では response.output_text.delta などのイベント) も返す。関数ツール付きのリクエストで、
+入力に関数の結果 (function_call_output) がまだなければ、引数を response.function_call_arguments.delta で流す関数呼び出しを返す。
+assistants API (アシスタント・スレッドの作成と、thread.run.* / thread.message.* イベントを流すランのストリーミング) も備える。
+
+    python mock_openai_server.py --port 8000          # HTTP/1.1 と h2c (prior knowledge) の両方を受け付ける
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from collections.abc import Awaitable, Callable, Iterator, MutableMapping
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+Scope = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[MutableMapping[str, Any]]]
+Send = Callable[[MutableMapping[str, Any]], Awaitable[None]]
+
+
+@dataclass
+class MockConfig:
+    """スタブサーバーの応答設定"""
+
+    tokens: int = 64
+    chunk_size: int = 1
+    first_token_latency: float = 0.05
+    tokens_per_second: float = 200.0
+    token_text: str = "tok "
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+    max_concurrency: int = 0
+    slow_probability: float = 0.0
+    slow_latency: float = 1.0
+    batch_latency: float = 1.0
+    prompt_cache_machines: int = 0
+    prediction_acceptance: float = 0.9
+    prompt_cache: "PromptCacheModel | None" = field(default=None, init=False)
+
+    def __post_init__(self) -> None:
+        if self.prompt_cache_machines:
+            self.prompt_cache = PromptCacheModel(self.prompt_cache_machines)
+
+    @classmethod
+    def from_env(cls) -> "MockConfig":
+        return cls(
+            requests_per_minute=int(
+                os.environ.get("MOCK_RPM", cls.requests_per_minute)
+            ),
+            tokens_per_minute=int(os.environ.get("MOCK_TPM", cls.tokens_per_minute)),
+            max_concurrency=int(
+                os.environ.get("MOCK_MAX_CONCURRENCY", cls.max_concurrency)
+            ),
+            slow_probability=float(
+                os.environ.get("MOCK_SLOW_PROBABILITY", cls.slow_probability)
+            ),
+            slow_latency=float(os.environ.get("MOCK_SLOW_LATENCY", cls.slow_latency)),
+            batch_latency=float(
+                os.environ.get("MOCK_BATCH_LATENCY", cls.batch_latency)
+            ),
+            prompt_cache_machines=int(
+                os.environ.get("MOCK_PROMPT_CACHE_MACHINES", cls.prompt_cache_machines)
+            ),
+            prediction_acceptance=float(
+                os.environ.get("MOCK_PREDICTION_ACCEPTANCE", cls.prediction_acceptance)
+            ),
+            tokens=int(os.environ.get("MOCK_TOKENS", cls.tokens)),
+            chunk_size=int(os.environ.get("MOCK_CHUNK_SIZE", cls.chunk_size)),
+            first_token_latency=float(
+                os.environ.get("MOCK_FIRST_TOKEN_LATENCY", cls.first_token_latency)
+            ),
+            tokens_per_second=float(
+                os.environ.get("MOCK_TOKENS_PER_SECOND", cls.tokens_per_second)
+            ),
+        )
+
+    def latency(self) -> float:
+        """初回レイテンシ (一定の確率で遅いバックエンドになる)"""
+        if self.slow_probability and random.random() < self.slow_probability:
+            return self.slow_latency
+        return self.first_token_latency
+
+    def chunks(self) -> Iterator[str]:
+        for start in range(0, self.tokens, self.chunk_size):
+            yield self.token_text * min(self.chunk_size, self.tokens - start)
+
+    @property
+    def chunk_interval(self) -> float:
+        if self.tokens_per_second <= 0:
+            return 0.0
+        return self.chunk_size / self.tokens_per_second
+
+
+class RateLimits:
+    """サーバー側のRPM/TPM制限 (1分あたりの量で連続的に回復するトークンバケット)"""
+
+    def __init__(self, config: MockConfig) -> None:
+        self.limits = {
+            "requests": config.requests_per_minute,
+            "tokens": config.tokens_per_minute,
+        }
+        self.remaining = {name: float(limit) for name, limit in self.limits.items()}
+        self.updated = time.monotonic()
+        self.rejected = 0
+
+    def take(self, tokens: int) -> tuple[bool, list[tuple[bytes, bytes]]]:
+        """リクエストを受け付けられるか判定し、x-ratelimit-* ヘッダーを返す"""
+        now = time.monotonic()
+        for name, limit in self.limits.items():
+            if limit:
+                self.remaining[name] = min(
+                    limit, self.remaining[name] + (now - self.updated) * limit / 60
+                )
+        self.updated = now
+        amounts = {"requests": 1, "tokens": tokens}
+        accepted = all(
+            not limit or self.remaining[name] >= amounts[name]
+            for name, limit in self.limits.items()
+        )
+        headers: list[tuple[bytes, bytes]] = []
+        for name, limit in self.limits.items():
+            if not limit:
+                continue
+            if accepted:
+                self.remaining[name] -= amounts[name]
+            remaining = max(int(self.remaining[name]), 0)
+            reset = (limit - self.remaining[name]) * 60 / limit
+            headers += [
+                (f"x-ratelimit-limit-{name}".encode(), str(limit).encode()),
+                (f"x-ratelimit-remaining-{name}".encode(), str(remaining).encode()),
+                (f"x-ratelimit-reset-{name}".encode(), f"{reset:.3f}s".encode()),
+            ]
+        if not accepted:
+            self.rejected += 1
+        return accepted, headers
+
+
+class PromptCacheModel:
+    """プロンプトキャッシュの模擬
+
+    リクエストは prompt_cache_key と先頭 256 文字で決まるマシンに振り分けられる。
+    キーがないリクエストは、混雑した共有プレフィックスのように、ランダムなマシンに溢れる。
+    各マシンは最近のプロンプトを覚えていて、1024 トークン以上の共通プレフィックスを
+    128 トークン単位でキャッシュヒットとして返す。
+    """
+
+    MIN_TOKENS = 1024
+    BLOCK_TOKENS = 128
+    REMEMBERED_PROMPTS = 64
+
+    def __init__(self, machines: int) -> None:
+        self.machines: list[list[str]] = [[] for _ in range(machines)]
+
+    @staticmethod
+    def prompt(request: dict[str, Any]) -> str:
+        """キャッシュされるプロンプト (ツール定義、指示、メッセージの順に並べたもの)"""
+        return json.dumps(
+            [
+                request.get("tools"),
+                request.get("instructions"),
+                request.get("messages") or request.get("input"),
+            ],
+            separators=(",", ":"),
+        )
+
+    def cached_tokens(self, request: dict[str, Any], prompt: str) -> int:
+        key = request.get("prompt_cache_key")
+        if key is None:
+            machine = self.machines[random.randrange(len(self.machines))]
+        else:
+            machine = self.machines[hash((key, prompt[:256])) % len(self.machines)]
+        common = max(
+            (len(os.path.commonprefix([prompt, seen])) for seen in machine), default=0
+        )
+        machine.append(prompt)
+        del machine[: -self.REMEMBERED_PROMPTS]
+        tokens = common // 4 // self.BLOCK_TOKENS * self.BLOCK_TOKENS
+        return tokens if tokens >= self.MIN_TOKENS else 0
+
+
+def _prediction_tokens(config: MockConfig, request: dict[str, Any]) -> tuple[int, int]:
+    """予測のうち採用・不採用にしたトークン数"""
+    content = (request.get("prediction") or {}).get("content")
+    if not content:
+        return 0, 0
+    if not isinstance(content, str):
+        content = "".join(part.get("text", "") for part in content)
+    predicted = len(content) // 4
+    accepted = int(min(predicted, config.tokens) * config.prediction_acceptance)
+    return accepted, predicted - accepted
+
+
+def _usage(config: MockConfig, request: dict[str, Any] | None = None) -> dict[str, Any]:
+    prompt_tokens = 10
+    details: dict[str, Any] = {}
+    if config.prompt_cache is not None and request is not None:
+        prompt = PromptCacheModel.prompt(request)
+        prompt_tokens = len(prompt) // 4
+        details["prompt_tokens_details"] = {
+            "cached_tokens": config.prompt_cache.cached_tokens(request, prompt)
+        }
+    if request is not None and request.get("prediction"):
+        accepted, rejected = _prediction_tokens(config, request)
+        details["completion_tokens_details"] = {
+            "accepted_prediction_tokens": accepted,
+            "rejected_prediction_tokens": rejected,
+        }
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": config.tokens,
+        "total_tokens": prompt_tokens + config.tokens,
+        **details,
+    }
+
+
+async def _read_body(receive: Receive) -> dict[str, Any]:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    return json.loads(body) if body else {}
+
+
+async def _send_json(
+    send: Send,
+    payload: dict[str, Any],
+    status: int = 200,
+    headers: list[tuple[bytes, bytes]] | None = None,
+) -> None:
+    data = json.dumps(payload).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), *(headers or [])],
+        }
+    )
+    await send({"type": "http.response.body", "body": data})
+
+
+async def _start_sse(send: Send) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/event-stream")],
+        }
+    )
+
+
+async def _send_event(send: Send, payload: Any, event: str | None = None) -> None:
+    data = payload if isinstance(payload, str) else json.dumps(payload)
+    prefix = f"event: {event}\n" if event else ""
+    await send(
+        {
+            "type": "http.response.body",
+            "body": f"{prefix}data: {data}\n\n".encode(),
+            "more_body": True,
+        }
+    )
+
+
+async def _end_sse(send: Send) -> None:
+    await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def _chat_completion(request: dict[str, Any], config: MockConfig) -> dict[str, Any]:
+    return {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "mock-model"),
+        "system_fingerprint": "fp_mock",
+        "choices": [
+            {
+                "index": 0,
+                "message": {
+                    "role": "assistant",
+                    "content": "".join(config.chunks()),
+                },
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": _usage(config, request),
+    }
+
+
+async def chat_completions(
+    request: dict[str, Any], send: Send, config: MockConfig
+) -> None:
+    created = int(time.time())
+    model = request.get("model", "mock-model")
+    await asyncio.sleep(config.latency())
+    if not request.get("stream"):
+        await _send_json(send, _chat_completion(request, config))
+        return
+
+    def chunk(
+        delta: dict[str, Any], finish_reason: str | None = None
+    ) -> dict[str, Any]:
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "system_fingerprint": "fp_mock",
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+
+    # The accepted tokens of a prediction are not generated
+    interval = config.chunk_interval * (
+        1 - _prediction_tokens(config, request)[0] / max(config.tokens, 1)
+    )
+    await _start_sse(send)
+    await _send_event(send, chunk({"role": "assistant", "content": ""}))
+    for text in config.chunks():
+        await _send_event(send, chunk({"content": text}))
+        if interval:
+            await asyncio.sleep(interval)
+    await _send_event(send, chunk({}, "stop"))
+    if (request.get("stream_options") or {}).get("include_usage"):
+        usage_chunk = chunk({})
+        usage_chunk["choices"] = []
+        usage_chunk["usage"] = _usage(config, request)
+        await _send_event(send, usage_chunk)
+    await _send_event(send, "[DONE]")
+    await _end_sse(send)
+
+
+def _responses_usage(
+    config: MockConfig, request: dict[str, Any] | None = None
+) -> dict[str, Any]:
+    usage = _usage(config, request)
+    return {
+        "input_tokens": usage["prompt_tokens"],
+        "input_tokens_details": {
+            "cached_tokens": usage.get("prompt_tokens_details", {}).get(
+                "cached_tokens", 0
+            )
+        },
+        "output_tokens": usage["completion_tokens"],
+        "output_tokens_details": {"reasoning_tokens": 0},
+        "total_tokens": usage["total_tokens"],
+    }
+
+
+def _function_to_call(request: dict[str, Any]) -> str | None:
+    """関数呼び出しを返すときの関数名 (関数の結果をまだ受け取っていない場合のみ)"""
+    functions = [
+        tool["name"]
+        for tool in request.get("tools") or []
+        if tool.get("type") == "function"
+    ]
+    if not functions or request.get("tool_choice") == "none":
+        return None
+    items = request.get("input")
+    if isinstance(items, list) and any(
+        isinstance(item, dict) and item.get("type") == "function_call_output"
+        for item in items
+    ):
+        return None
+    return functions[0]
+
+
+def _response_object(
+    request: dict[str, Any],
+    response_id: str,
+    status: str,
+    output: list[dict[str, Any]],
+    usage: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    return {
+        "id": response_id,
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": request.get("model", "mock-model"),
+        "status": status,
+        "output": output,
+        "parallel_tool_calls": True,
+        "tool_choice": request.get("tool_choice", "auto"),
+        "tools": request.get("tools") or [],
+        "instructions": request.get("instructions"),
+        "previous_response_id": request.get("previous_response_id"),
+        "usage": usage,
+    }
+
+
+async def responses(request: dict[str, Any], send: Send, config: MockConfig) -> None:
+    response_id = f"resp_{uuid.uuid4().hex}"
+    item_id = f"msg_{uuid.uuid4().hex}"
+    function = _function_to_call(request)
+    if function is None:
+        text = "".join(config.chunks())
+        item: dict[str, Any] = {
+            "id": item_id,
+            "type": "message",
+            "role": "assistant",
+            "status": "completed",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }
+    else:
+        # The arguments are one string property with the configured tokens
+        deltas = [
+            '{"text": "',
+            *(json.dumps(text)[1:-1] for text in config.chunks()),
+            '"}',
+        ]
+        item = {
+            "id": f"fc_{uuid.uuid4().hex}",
+            "type": "function_call",
+            "call_id": f"call_{uuid.uuid4().hex}",
+            "name": function,
+            "arguments": "".join(deltas),
+            "status": "completed",
+        }
+    await asyncio.sleep(config.latency())
+    if not request.get("stream"):
+        await _send_json(
+            send,
+            _response_object(
+                request,
+                response_id,
+                "completed",
+                [item],
+                _responses_usage(config, request),
+            ),
+        )
+        return
+
+    sequence_number = 0
+
+    async def event(event_type: str, **payload: Any) -> None:
+        nonlocal sequence_number
+        await _send_event(
+            send,
+            {"type": event_type, "sequence_number": sequence_number, **payload},
+            event=event_type,
+        )
+        sequence_number += 1
+
+    await _start_sse(send)
+    await event(
+        "response.created",
+        response=_response_object(request, response_id, "in_progress", []),
+    )
+    if item["type"] == "message":
+        await event(
+            "response.output_item.added",
+            output_index=0,
+            item={**item, "status": "in_progress", "content": []},
+        )
+        location = {"item_id": item_id, "output_index": 0, "content_index": 0}
+        await event(
+            "response.content_part.added",
+            **location,
+            part={"type": "output_text", "text": "", "annotations": []},
+        )
+        for text in config.chunks():
+            await event(
+                "response.output_text.delta", **location, delta=text, logprobs=[]
+            )
+            if config.chunk_interval:
+                await asyncio.sleep(config.chunk_interval)
+        await event(
+            "response.output_text.done",
+            **location,
+            text=item["content"][0]["text"],
+            logprobs=[],
+        )
+        await event("response.content_part.done", **location, part=item["content"][0])
+    else:
+        await event(
+            "response.output_item.added",
+            output_index=0,
+            item={**item, "status": "in_progress", "arguments": ""},
+        )
+        location = {"item_id": item["id"], "output_index": 0}
+        for delta in deltas:
+            await event(
+                "response.function_call_arguments.delta", **location, delta=delta
+            )
+            if config.chunk_interval:
+                await asyncio.sleep(config.chunk_interval)
+        await event(
+            "response.function_call_arguments.done",
+            **location,
+            arguments=item["arguments"],
+        )
+    await event("response.output_item.done", output_index=0, item=item)
+    await event(
+        "response.completed",
+        response=_response_object(
+            request,
+            response_id,
+            "completed",
+            [item],
+            _responses_usage(config, request),
+        ),
+    )
+    await _end_sse(send)
+
+
+ROUTES: dict[str, Callable[[dict[str, Any], Send, MockConfig], Awaitable[None]]] = {
+    "/v1/chat/completions": chat_completions,
+    "/v1/responses": responses,
+}
+
+
+def _multipart_fields(body: bytes, content_type: str) -> dict[str, bytes]:
+    """multipart/form-data の各フィールドの値を返す"""
+    boundary = content_type.split("boundary=", 1)[1].strip('"').encode()
+    fields: dict[str, bytes] = {}
+    for part in body.split(b"--" + boundary)[1:-1]:
+        headers, _, value = part.strip(b"\r\n").partition(b"\r\n\r\n")
+        name = headers.split(b'name="', 1)[1].split(b'"', 1)[0].decode()
+        fields[name] = value
+    return fields
+
+
+def _text(message: dict[str, Any]) -> str:
+    """メッセージのテキスト (content は文字列またはパーツのリスト)"""
+    content = message.get("content") or ""
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") for part in content)
+
+
+class BatchStore:
+    """files / batches API のスタブ (ファイルとバッチはメモリ上に保持する)"""
+
+    def __init__(self, config: MockConfig) -> None:
+        self.config = config
+        self.files: dict[str, tuple[str, bytes]] = {}
+        self.batches: dict[str, dict[str, Any]] = {}
+
+    def _file_object(self, file_id: str) -> dict[str, Any]:
+        filename, data = self.files[file_id]
+        return {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(data),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": "batch",
+            "status": "processed",
+        }
+
+    def _add_file(self, filename: str, data: bytes) -> str:
+        file_id = f"file-{uuid.uuid4().hex}"
+        self.files[file_id] = (filename, data)
+        return file_id
+
+    def _refresh(self, batch: dict[str, Any]) -> None:
+        """作成から batch_latency 秒経ったバッチを実行して完了させる"""
+        if batch["status"] != "in_progress":
+            return
+        if time.time() - batch["created_at"] < self.config.batch_latency:
+            return
+        output: list[str] = []
+        errors: list[str] = []
+        for line in self.files[batch["input_file_id"]][1].splitlines():
+            request = json.loads(line)
+            body = request["body"]
+            result: dict[str, Any] = {
+                "id": f"batch_req_{uuid.uuid4().hex}",
+                "custom_id": request["custom_id"],
+                "error": None,
+            }
+            if body.get("messages") and _text(body["messages"][-1]):
+                result["response"] = {
+                    "status_code": 200,
+                    "request_id": uuid.uuid4().hex,
+                    "body": _chat_completion(body, self.config),
+                }
+                output.append(json.dumps(result))
+            else:
+                result["response"] = {
+                    "status_code": 400,
+                    "request_id": uuid.uuid4().hex,
+                    "body": {"error": {"message": "The last message has no content"}},
+                }
+                errors.append(json.dumps(result))
+        batch["status"] = "completed"
+        batch["completed_at"] = int(time.time())
+        batch["request_counts"] = {
+            "total": len(output) + len(errors),
+            "completed": len(output),
+            "failed": len(errors),
+        }
+        if output:
+            batch["output_file_id"] = self._add_file(
+                "output.jsonl", "\n".join(output).encode() + b"\n"
+            )
+        if errors:
+            batch["error_file_id"] = self._add_file(
+                "errors.jsonl", "\n".join(errors).encode() + b"\n"
+            )
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        method, parts = scope["method"], scope["path"].strip("/").split("/")[1:]
+        headers = dict(scope["headers"])
+        match method, parts:
+            case "POST", ["files"]:
+                fields = _multipart_fields(
+                    body, headers.get(b"content-type", b"").decode()
+                )
+                file_id = self._add_file("input.jsonl", fields["file"])
+                await _send_json(send, self._file_object(file_id))
+            case "GET", ["files", file_id, "content"] if file_id in self.files:
+                await send(
+                    {
+                        "type": "http.response.start",
+                        "status": 200,
+                        "headers": [(b"content-type", b"application/octet-stream")],
+                    }
+                )
+                await send(
+                    {"type": "http.response.body", "body": self.files[file_id][1]}
+                )
+            case "DELETE", ["files", file_id] if file_id in self.files:
+                del self.files[file_id]
+                await _send_json(
+                    send, {"id": file_id, "object": "file", "deleted": True}
+                )
+            case "POST", ["batches"]:
+                request = json.loads(body)
+                batch_id = f"batch_{uuid.uuid4().hex}"
+                self.batches[batch_id] = {
+                    "id": batch_id,
+                    "object": "batch",
+                    "endpoint": request["endpoint"],
+                    "input_file_id": request["input_file_id"],
+                    "completion_window": request["completion_window"],
+                    "metadata": request.get("metadata"),
+                    "status": "in_progress",
+                    "created_at": time.time(),
+                    "output_file_id": None,
+                    "error_file_id": None,
+                }
+                await _send_json(send, self._public(self.batches[batch_id]))
+            case "GET", ["batches", batch_id] if batch_id in self.batches:
+                self._refresh(self.batches[batch_id])
+                await _send_json(send, self._public(self.batches[batch_id]))
+            case "POST", ["batches", batch_id, "cancel"] if batch_id in self.batches:
+                batch = self.batches[batch_id]
+                if batch["status"] == "in_progress":
+                    batch["status"] = "cancelled"
+                await _send_json(send, self._public(batch))
+            case _:
+                await _send_json(send, {"error": {"message": "not found"}}, status=404)
+
+    @staticmethod
+    def _public(batch: dict[str, Any]) -> dict[str, Any]:
+        return {**batch, "created_at": int(batch["created_at"])}
+
+
+class AssistantsStore:
+    """assistants API のスタブ (アシスタント・スレッド・ランはメモリ上に保持する)
+
+    ランは常にストリーミングで作成され、テキストのメッセージを返して完了する。
+    """
+
+    def __init__(self, config: MockConfig) -> None:
+        self.config = config
+        self.assistants: dict[str, dict[str, Any]] = {}
+        self.threads: dict[str, list[dict[str, Any]]] = {}
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request = await _read_body(receive)
+        method, parts = scope["method"], scope["path"].strip("/").split("/")[1:]
+        match method, parts:
+            case "POST", ["assistants"]:
+                assistant_id = f"asst_{uuid.uuid4().hex}"
+                self.assistants[assistant_id] = {
+                    "id": assistant_id,
+                    "object": "assistant",
+                    "created_at": int(time.time()),
+                    "model": request.get("model", "mock-model"),
+                    "name": request.get("name"),
+                    "description": None,
+                    "instructions": request.get("instructions"),
+                    "tools": request.get("tools") or [],
+                    "metadata": {},
+                }
+                await _send_json(send, self.assistants[assistant_id])
+            case "DELETE", ["assistants", assistant_id] if (
+                assistant_id in self.assistants
+            ):
+                del self.assistants[assistant_id]
+                await _send_json(
+                    send,
+                    {
+                        "id": assistant_id,
+                        "object": "assistant.deleted",
+                        "deleted": True,
+                    },
+                )
+            case "POST", ["threads"]:
+                thread_id = f"thread_{uuid.uuid4().hex}"
+                self.threads[thread_id] = []
+                await _send_json(
+                    send,
+                    {
+                        "id": thread_id,
+                        "object": "thread",
+                        "created_at": int(time.time()),
+                        "metadata": request.get("metadata") or {},
+                        "tool_resources": request.get("tool_resources"),
+                    },
+                )
+            case "GET", ["threads", thread_id, "runs"] if thread_id in self.threads:
+                runs = self.threads[thread_id][::-1]
+                await _send_json(
+                    send,
+                    {
+                        "object": "list",
+                        "data": runs,
+                        "first_id": runs[0]["id"] if runs else None,
+                        "last_id": runs[-1]["id"] if runs else None,
+                        "has_more": False,
+                    },
+                )
+            case "POST", ["threads", thread_id, "runs"] if thread_id in self.threads:
+                await self._stream_run(thread_id, request, send)
+            case "POST", ["threads", thread_id, "runs", run_id, "cancel"] if (
+                thread_id in self.threads
+            ):
+                run = next(
+                    (run for run in self.threads[thread_id] if run["id"] == run_id),
+                    None,
+                )
+                if run is None:
+                    await _send_json(
+                        send, {"error": {"message": "not found"}}, status=404
+                    )
+                    return
+                run["status"] = "cancelled"
+                await _send_json(send, run)
+            case _:
+                await _send_json(send, {"error": {"message": "not found"}}, status=404)
+
+    async def _stream_run(
+        self, thread_id: str, request: dict[str, Any], send: Send
+    ) -> None:
+        config = self.config
+        created = int(time.time())
+        run: dict[str, Any] = {
+            "id": f"run_{uuid.uuid4().hex}",
+            "object": "thread.run",
+            "created_at": created,
+            "thread_id": thread_id,
+            "assistant_id": request.get("assistant_id"),
+            "status": "queued",
+            "model": request.get("model", "mock-model"),
+            "instructions": request.get("instructions") or "",
+            "tools": request.get("tools") or [],
+            "parallel_tool_calls": True,
+            "metadata": {},
+            "usage": None,
+        }
+        self.threads[thread_id].append(run)
+        message_id = f"msg_{uuid.uuid4().hex}"
+        message: dict[str, Any] = {
+            "id": message_id,
+            "object": "thread.message",
+            "created_at": created,
+            "thread_id": thread_id,
+            "run_id": run["id"],
+            "assistant_id": run["assistant_id"],
+            "role": "assistant",
+            "status": "in_progress",
+            "content": [],
+            "attachments": [],
+            "metadata": {},
+        }
+        step: dict[str, Any] = {
+            "id": f"step_{uuid.uuid4().hex}",
+            "object": "thread.run.step",
+            "created_at": created,
+            "run_id": run["id"],
+            "thread_id": thread_id,
+            "assistant_id": run["assistant_id"],
+            "type": "message_creation",
+            "status": "in_progress",
+            "step_details": {
+                "type": "message_creation",
+                "message_creation": {"message_id": message_id},
+            },
+        }
+
+        await _start_sse(send)
+        await _send_event(send, run, event="thread.run.created")
+        await _send_event(send, run, event="thread.run.queued")
+        await asyncio.sleep(config.latency())
+        run["status"] = "in_progress"
+        await _send_event(send, run, event="thread.run.in_progress")
+        await _send_event(send, step, event="thread.run.step.created")
+        await _send_event(send, step, event="thread.run.step.in_progress")
+        await _send_event(send, message, event="thread.message.created")
+        await _send_event(send, message, event="thread.message.in_progress")
+        for text in config.chunks():
+            await _send_event(
+                send,
+                {
+                    "id": message_id,
+                    "object": "thread.message.delta",
+                    "delta": {
+                        "content": [
+                            {
+                                "index": 0,
+                                "type": "text",
+                                "text": {"value": text, "annotations": []},
+                            }
+                        ]
+                    },
+                },
+                event="thread.message.delta",
+            )
+            if config.chunk_interval:
+                await asyncio.sleep(config.chunk_interval)
+        text = "".join(config.chunks())
+        message["status"] = "completed"
+        message["content"] = [
+            {"type": "text", "text": {"value": text, "annotations": []}}
+        ]
+        await _send_event(send, message, event="thread.message.completed")
+        step["status"] = "completed"
+        await _send_event(send, step, event="thread.run.step.completed")
+        usage = _usage(config, request)
+        run["status"] = "completed"
+        run["usage"] = {
+            "prompt_tokens": usage["prompt_tokens"],
+            "completion_tokens": usage["completion_tokens"],
+            "total_tokens": usage["total_tokens"],
+        }
+        await _send_event(send, run, event="thread.run.completed")
+        await _send_event(send, "[DONE]", event="done")
+        await _end_sse(send)
+
+
+def _with_headers(send: Send, headers: list[tuple[bytes, bytes]]) -> Send:
+    """レスポンス開始メッセージにヘッダーを追加するsendを返す"""
+
+    async def send_with_headers(message: MutableMapping[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            message = {**message, "headers": [*message["headers"], *headers]}
+        await send(message)
+
+    return send_with_headers
+
+
+def create_app(config: MockConfig | None = None) -> Callable[..., Awaitable[None]]:
+    """ASGIアプリを作成する"""
+    config = config or MockConfig.from_env()
+    rate_limits = RateLimits(config)
+    batches = BatchStore(config)
+    assistants = AssistantsStore(config)
+    active = 0
+
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        nonlocal active
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["path"].startswith(("/v1/files", "/v1/batches")):
+            await batches.handle(scope, receive, send)
+            return
+        if scope["path"].startswith(("/v1/assistants", "/v1/threads")):
+            await assistants.handle(scope, receive, send)
+            return
+        handler = ROUTES.get(scope["path"])
+        request = await _read_body(receive)
+        if handler is None:
+            await _send_json(send, {"error": {"message": "not found"}}, status=404)
+            return
+        if config.requests_per_minute or config.tokens_per_minute:
+            accepted, headers = rate_limits.take(_usage(config)["total_tokens"])
+            if not accepted:
+                await _send_json(
+                    send,
+                    {
+                        "error": {
+                            "message": "Rate limit reached",
+                            "type": "requests",
+                            "code": "rate_limit_exceeded",
+                        }
+                    },
+                    status=429,
+                    headers=headers,
+                )
+                return
+            send = _with_headers(send, headers)
+        if config.max_concurrency and active >= config.max_concurrency:
+            await _send_json(
+                send,
+                {
+                    "error": {
+                        "message": "The server is overloaded",
+                        "type": "server_error",
+                    }
+                },
+                status=503,
+            )
+            return
+        active += 1
+        try:
+            await handler(request, send, config)
+        finally:
+            active -= 1
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def run_mock_server(
+    port: int | None = None, env: dict[str, str] | None = None
+) -> Iterator[str]:
+    """別プロセスでスタブサーバーを起動し、base_urlを返す"""
+    port = port or free_port()
+    process = subprocess.Popen(
+        [sys.executable, __file__, "--port", str(port)],
+        env={**os.environ, **(env or {})},
+    )
+    try:
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.05)
+        else:
+            raise RuntimeError("mock server did not start")
+        yield f"http://127.0.0.1:{port}/v1"
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main() -> None:
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    hypercorn_config = Config()
+    hypercorn_config.bind = [f"127.0.0.1:{args.port}"]
+    hypercorn_config.backlog = 4096
+    hypercorn_config.h2_max_concurrent_streams = 1000
+    hypercorn_config.loglevel = "WARNING"
+    asyncio.run(serve(create_app(), hypercorn_config))  # type: ignore[arg-type]
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,201 @@
 # Copyright (c) Microsoft. All rights reserved.
 
+import importlib
+from typing import TYPE_CHECKING, Any
 
-from ._assistants_client import *  # noqa: F403
-from ._chat_client import *  # noqa: F403
-from ._exceptions import *  # noqa: F403
-from ._responses_client import *  # noqa: F403
-from ._shared import *  # noqa: F403
+# The client modules pull in the OpenAI SDK types and the agent framework,
+# so they are only imported when one of their names is first used.
+_IMPORTS: dict[str, str] = {
+    "AdaptiveConcurrencyLimiter": "_concurrency",
+    "AdaptiveConcurrencyStats": "_concurrency",
+    "BucketHistogram": "_latency_metrics",
+    "CachedApiKeyProvider": "_credentials",
+    "CachedApiKeyStats": "_credentials",
+    "CassetteStats": "_transports",
+    "CassetteTransport": "_transports",
+    "ConcurrencyPermit": "_concurrency",
+    "ContentFilterResultSeverity": "_exceptions",
+    "ContextBudget": "_context_budget",
+    "ContextBudgetStats": "_context_budget",
+    "ContextTrim": "_context_budget",
+    "ContextTrimStrategy": "_context_budget",
+    "DiskResponseCacheBackend": "_response_cache",
+    "DropOldToolResultsFirst": "_context_budget",
+    "DropOldest": "_context_budget",
+    "HTTP2MultiplexTransport": "_transports",
+    "HTTP2TransportStats": "_transports",
+    "HedgingPolicy": "_hedging",
+    "HedgingStats": "_hedging",
+    "KeepSystemAndLastN": "_context_budget",
+    "LatencyMetrics": "_latency_metrics",
+    "LatencyStats": "_latency_metrics",
+    "LeanStreaming": "_streaming",
+    "MediaUploadCache": "_media_uploads",
+    "MediaUploadStats": "_media_uploads",
+    "MemoryResponseCacheBackend": "_response_cache",
+    "OpenAIAssistantsClient": "_assistants_client",
+    "OpenAIBatchResult": "_batch",
+    "OpenAIChatClient": "_chat_client",
+    "OpenAIClientRegistry": "_client_registry",
+    "OpenAIClientRegistryStats": "_client_registry",
+    "OpenAIContentFilterException": "_exceptions",
+    "OpenAIEndpoint": "_endpoint_pool",
+    "OpenAIEndpointPool": "_endpoint_pool",
+    "OpenAIEndpointStats": "_endpoint_pool",
+    "OpenAIRateLimiter": "_rate_limits",
+    "OpenAIRateLimiterStats": "_rate_limits",
+    "OpenAIResponsesClient": "_responses_client",
+    "OpenAISettings": "_shared",
+    "PartialJsonParser": "_partial_json",
+    "PredictedOutput": "_predictions",
+    "PredictionStats": "_predictions",
+    "PromptCacheStats": "_prompt_caching",
+    "PromptCaching": "_prompt_caching",
+    "RateLimitReservation": "_rate_limits",
+    "RequestCoalescer": "_coalescing",
+    "RequestCoalescerStats": "_coalescing",
+    "RequestTiming": "_latency_metrics",
+    "ResponseCache": "_response_cache",
+    "ResponseCacheBackend": "_response_cache",
+    "ResponseCacheStats": "_response_cache",
+    "StreamCoalescing": "_streaming",
+    "estimate_tokens": "_context_budget",
+    "get_shared_client_registry": "_client_registry",
+    "get_shared_rate_limiter": "_rate_limits",
+    "partial_model": "_partial_json",
+}
+
+__all__ = [
+    "AdaptiveConcurrencyLimiter",
+    "AdaptiveConcurrencyStats",
+    "BucketHistogram",
+    "CachedApiKeyProvider",
+    "CachedApiKeyStats",
+    "CassetteStats",
+    "CassetteTransport",
+    "ConcurrencyPermit",
+    "ContentFilterResultSeverity",
+    "ContextBudget",
+    "ContextBudgetStats",
+    "ContextTrim",
+    "ContextTrimStrategy",
+    "DiskResponseCacheBackend",
+    "DropOldToolResultsFirst",
+    "DropOldest",
+    "HTTP2MultiplexTransport",
+    "HTTP2TransportStats",
+    "HedgingPolicy",
+    "HedgingStats",
+    "KeepSystemAndLastN",
+    "LatencyMetrics",
+    "LatencyStats",
+    "LeanStreaming",
+    "MediaUploadCache",
+    "MediaUploadStats",
+    "MemoryResponseCacheBackend",
+    "OpenAIAssistantsClient",
+    "OpenAIBatchResult",
+    "OpenAIChatClient",
+    "OpenAIClientRegistry",
+    "OpenAIClientRegistryStats",
+    "OpenAIContentFilterException",
+    "OpenAIEndpoint",
+    "OpenAIEndpointPool",
+    "OpenAIEndpointStats",
+    "OpenAIRateLimiter",
+    "OpenAIRateLimiterStats",
+    "OpenAIResponsesClient",
+    "OpenAISettings",
+    "PartialJsonParser",
+    "PredictedOutput",
+    "PredictionStats",
+    "PromptCacheStats",
+    "PromptCaching",
+    "RateLimitReservation",
+    "RequestCoalescer",
+    "RequestCoalescerStats",
+    "RequestTiming",
+    "ResponseCache",
+    "ResponseCacheBackend",
+    "ResponseCacheStats",
+    "StreamCoalescing",
+    "estimate_tokens",
+    "get_shared_client_registry",
+    "get_shared_rate_limiter",
+    "partial_model",
+]
+
+
+def __getattr__(name: str) -> Any:
+    if name in _IMPORTS:
+        value = getattr(importlib.import_module(f".{_IMPORTS[name]}", __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"Module `custom_openai` has no attribute {name}.")
+
+
+def __dir__() -> list[str]:
+    return list(_IMPORTS.keys())
+
+
+if TYPE_CHECKING:
+    from ._assistants_client import OpenAIAssistantsClient
+    from ._batch import OpenAIBatchResult
+    from ._chat_client import OpenAIChatClient
+    from ._client_registry import (
+        OpenAIClientRegistry,
+        OpenAIClientRegistryStats,
+        get_shared_client_registry,
+    )
+    from ._coalescing import RequestCoalescer, RequestCoalescerStats
+    from ._concurrency import (
+        AdaptiveConcurrencyLimiter,
+        AdaptiveConcurrencyStats,
+        ConcurrencyPermit,
+    )
+    from ._context_budget import (
+        ContextBudget,
+        ContextBudgetStats,
+        ContextTrim,
+        ContextTrimStrategy,
+        DropOldest,
+        DropOldToolResultsFirst,
+        KeepSystemAndLastN,
+        estimate_tokens,
+    )
+    from ._credentials import CachedApiKeyProvider, CachedApiKeyStats
+    from ._endpoint_pool import OpenAIEndpoint, OpenAIEndpointPool, OpenAIEndpointStats
+    from ._exceptions import ContentFilterResultSeverity, OpenAIContentFilterException
+    from ._hedging import HedgingPolicy, HedgingStats
+    from ._latency_metrics import (
+        BucketHistogram,
+        LatencyMetrics,
+        LatencyStats,
+        RequestTiming,
+    )
+    from ._media_uploads import MediaUploadCache, MediaUploadStats
+    from ._partial_json import PartialJsonParser, partial_model
+    from ._predictions import PredictedOutput, PredictionStats
+    from ._prompt_caching import PromptCacheStats, PromptCaching
+    from ._rate_limits import (
+        OpenAIRateLimiter,
+        OpenAIRateLimiterStats,
+        RateLimitReservation,
+        get_shared_rate_limiter,
+    )
+    from ._response_cache import (
+        DiskResponseCacheBackend,
+        MemoryResponseCacheBackend,
+        ResponseCache,
+        ResponseCacheBackend,
+        ResponseCacheStats,
+    )
+    from ._responses_client import OpenAIResponsesClient
+    from ._shared import OpenAISettings
+    from ._streaming import LeanStreaming, StreamCoalescing
+    from ._transports import (
+        CassetteStats,
+        CassetteTransport,
+        HTTP2MultiplexTransport,
+        HTTP2TransportStats,
+    )
@@ -10,7 +10,8 @@ from collections.abc import (
     MutableMapping,
     MutableSequence,
 )
-from typing import Any
+from functools import cached_property
+from typing import TYPE_CHECKING, Any
 
 from openai import AsyncOpenAI
 from openai.types.beta.threads import (
@@ -55,6 +56,15 @@ from agent_framework.exceptions import ServiceInitializationError
 from agent_framework.observability import use_observability
 from ._shared import OpenAIConfigMixin, OpenAISettings
 
+if TYPE_CHECKING:
+    # The feature modules are only imported when their feature is configured
+    from ._caching import ToolSpecCache
+    from ._client_registry import OpenAIClientRegistry
+    from ._concurrency import AdaptiveConcurrencyLimiter
+    from ._latency_metrics import LatencyMetrics, RequestTiming
+    from ._streaming import StreamCoalescing
+    from ._transports import CassetteTransport
+
 if sys.version_info >= (3, 11):
     from typing import Self  # pragma: no cover
 else:
@@ -63,6 +73,9 @@ else:
 
 __all__ = ["OpenAIAssistantsClient"]
 
+# The path of the API, appended to the base URL to name the endpoint in the latency metrics
+_ENDPOINT_PATH = "threads/runs"
+
 
 @use_function_invocation
 @use_observability
@@ -82,6 +95,13 @@ class OpenAIAssistantsClient(OpenAIConfigMixin, BaseChatClient):
         base_url: str | None = None,
         default_headers: Mapping[str, str] | None = None,
         async_client: AsyncOpenAI | None = None,
+        client_registry: "OpenAIClientRegistry | None" = None,
+        http2: bool | None = None,
+        http2_max_concurrent_streams: int | None = None,
+        cassette: "CassetteTransport | None" = None,
+        concurrency_limiter: "AdaptiveConcurrencyLimiter | None" = None,
+        stream_coalescing: "StreamCoalescing | None" = None,
+        latency_metrics: "LatencyMetrics | None" = None,
         env_file_path: str | None = None,
         env_file_encoding: str | None = None,
         **kwargs: Any,
@@ -106,6 +126,22 @@ class OpenAIAssistantsClient(OpenAIConfigMixin, BaseChatClient):
             default_headers: The default headers mapping of string keys to
                 string values for HTTP requests.
             async_client: An existing client to use.
+            client_registry: A registry to share a pooled AsyncOpenAI client with other
+                clients using the same endpoint, credentials and headers,
+                for example ``get_shared_client_registry()``. Ignored when async_client is set.
+            http2: Whether to multiplex requests over HTTP/2 connections, requires the 'h2' package.
+                Ignored when async_client is set. Can also be set via environment variable OPENAI_HTTP2.
+            http2_max_concurrent_streams: The maximum number of concurrent streams per HTTP/2 connection,
+                up to 100. Can also be set via environment variable OPENAI_HTTP2_MAX_CONCURRENT_STREAMS.
+            cassette: A transport that records the exchanges with the service to a file, or replays them
+                offline at the recorded or an accelerated pace, see CassetteTransport. Ignored when
+                async_client is set.
+            concurrency_limiter: An adaptive (AIMD) limiter of the number of concurrent calls, raised on
+                success and cut on 429/503 responses or rising latency. Can be shared between clients.
+            stream_coalescing: Merges the streamed text deltas into fewer updates, flushed after a delay or
+                a number of characters, and immediately on tool calls, usage and the finish reason.
+            latency_metrics: Records the time to first token, inter-token gaps, duration, throughput and
+                preparation time of the requests per agent, model and endpoint, see LatencyMetrics.
             env_file_path: Use the environment settings file as a fallback
                 to environment variables.
             env_file_encoding: The encoding of the environment settings file.
@@ -133,6 +169,8 @@ class OpenAIAssistantsClient(OpenAIConfigMixin, BaseChatClient):
                 base_url=base_url,
                 org_id=org_id,
                 chat_model_id=model_id,
+                http2=http2,
+                http2_max_concurrent_streams=http2_max_concurrent_streams,
                 env_file_path=env_file_path,
                 env_file_encoding=env_file_encoding,
             )
@@ -157,6 +195,13 @@ class OpenAIAssistantsClient(OpenAIConfigMixin, BaseChatClient):
             org_id=openai_settings.org_id,
             default_headers=default_headers,
             client=async_client,
+            client_registry=client_registry,
+            http2=openai_settings.http2,
+            http2_max_concurrent_streams=openai_settings.http2_max_concurrent_streams,
+            cassette=cassette,
+            concurrency_limiter=concurrency_limiter,
+            stream_coalescing=stream_coalescing,
+            latency_metrics=latency_metrics,
             base_url=openai_settings.base_url,
         )
         self.assistant_id: str | None = assistant_id
@@ -178,11 +223,12 @@ class OpenAIAssistantsClient(OpenAIConfigMixin, BaseChatClient):
         await self.close()
 
     async def close(self) -> None:
-        """Clean up any assistants we created."""
+        """Clean up any assistants we created and release a pooled client."""
         if self._should_delete_assistant and self.assistant_id is not None:
             await self.client.beta.assistants.delete(self.assistant_id)
             object.__setattr__(self, "assistant_id", None)
             object.__setattr__(self, "_should_delete_assistant", False)
+        await super().close()
 
     async def _inner_get_response(
         self,
@@ -191,9 +237,16 @@ class OpenAIAssistantsClient(OpenAIConfigMixin, BaseChatClient):
         chat_options: ChatOptions,
         **kwargs: Any,
     ) -> ChatResponse:
+        timing = self._start_timing(_ENDPOINT_PATH, streaming=False)
         return await ChatResponse.from_chat_response_generator(
-            updates=self._inner_get_streaming_response(
-                messages=messages, chat_options=chat_options, **kwargs
+            updates=self._timed_updates(
+                timing,
+                self._stream_run(
+                    messages=messages,
+                    chat_options=chat_options,
+                    timing=timing,
+                    **kwargs,
+                ),
             ),
             output_format_type=chat_options.response_format,
         )
@@ -205,10 +258,35 @@ class OpenAIAssistantsClient(OpenAIConfigMixin, BaseChatClient):
         chat_options: ChatOptions,
         **kwargs: Any,
     ) -> AsyncIterable[ChatResponseUpdate]:
+        timing = self._start_timing(_ENDPOINT_PATH, streaming=True)
+        async for update in self._coalesced_updates(
+            self._timed_updates(
+                timing,
+                self._stream_run(
+                    messages=messages,
+                    chat_options=chat_options,
+                    timing=timing,
+                    **kwargs,
+                ),
+            )
+        ):
+            yield update
+
+    async def _stream_run(
+        self,
+        *,
+        messages: MutableSequence[ChatMessage],
+        chat_options: ChatOptions,
+        timing: "RequestTiming | None" = None,
+        **kwargs: Any,
+    ) -> AsyncIterable[ChatResponseUpdate]:
+        """Run the assistant on the thread, streaming the updates of the run."""
         # Extract necessary state from messages and options
         run_options, tool_results = self._prepare_options(
             messages, chat_options, **kwargs
         )
+        if timing is not None:
+            timing.prepared(run_options.get("model"))
 
         # Get the thread ID
         thread_id: str | None = (
@@ -225,14 +303,17 @@ class OpenAIAssistantsClient(OpenAIConfigMixin, BaseChatClient):
         # Determine which assistant to use and create if needed
         assistant_id = await self._get_assistant_id_or_create()
 
-        # Create the streaming response
-        stream, thread_id = await self._create_assistant_stream(
-            thread_id, assistant_id, run_options, tool_results
-        )
+        async with self._concurrency_slot() as permit:
+            # Create the streaming response
+            stream, thread_id = await self._create_assistant_stream(
+                thread_id, assistant_id, run_options, tool_results
+            )
 
-        # Process and yield each update from the stream
-        async for update in self._process_stream_events(stream, thread_id):
-            yield update
+            # Process and yield each update from the stream
+            async for update in self._process_stream_events(stream, thread_id):
+                if permit is not None:
+                    permit.responded()
+                yield update
 
     async def _get_assistant_id_or_create(self) -> str:
         """Determine which assistant to use and create if needed.
@@ -437,6 +518,13 @@ class OpenAIAssistantsClient(OpenAIConfigMixin, BaseChatClient):
 
         return contents
 
+    @cached_property
+    def _tool_specs(self) -> "ToolSpecCache[dict[str, Any]]":
+        """The compiled specs of the function tools, so their JSON schemas are not rebuilt on every run."""
+        from ._caching import ToolSpecCache
+
+        return ToolSpecCache(lambda tool: tool.to_json_schema_spec())
+
     def _prepare_options(
         self,
         messages: MutableSequence[ChatMessage],
@@ -464,7 +552,7 @@ class OpenAIAssistantsClient(OpenAIConfigMixin, BaseChatClient):
                 ):
                     for tool in chat_options.tools:
                         if isinstance(tool, AIFunction):
-                            tool_definitions.append(tool.to_json_schema_spec())  # type: ignore[reportUnknownArgumentType]
+                            tool_definitions.append(self._tool_specs.get(tool))
                         elif isinstance(tool, HostedCodeInterpreterTool):
                             tool_definitions.append({"type": "code_interpreter"})
                         elif isinstance(tool, HostedFileSearchTool):
@@ -0,0 +1,207 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Literal
+
+from openai import AsyncOpenAI
+
+from agent_framework._logging import get_logger
+from agent_framework._types import ChatResponse
+
+logger = get_logger("agent_framework.openai")
+
+__all__ = ["OpenAIBatchResult"]
+
+# The batch API accepts at most 50,000 requests and 200 MB per input file
+MAX_BATCH_REQUESTS = 50_000
+MAX_BATCH_BYTES = 190 * 1024 * 1024
+
+_FINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+@dataclass
+class OpenAIBatchResult:
+    """The result of one request of a batch job.
+
+    Attributes:
+        custom_id: The id the request was submitted with.
+        response: The response, None when the request failed.
+        error: The error returned for the request, None when it succeeded.
+        batch_id: The id of the batch job the request was part of.
+    """
+
+    custom_id: str
+    response: ChatResponse | None = None
+    error: dict[str, Any] | None = None
+    batch_id: str | None = None
+
+
+@dataclass
+class BatchShard:
+    """One JSONL input file of a batch run."""
+
+    path: Path
+    custom_ids: list[str] = field(default_factory=list)
+    size: int = 0
+
+
+class BatchShardWriter:
+    """Writes request lines into JSONL files of at most max_requests lines and max_bytes bytes."""
+
+    def __init__(self, directory: Path, max_requests: int, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_requests = max_requests
+        self.max_bytes = max_bytes
+        self._shard: BatchShard | None = None
+        self._file: Any = None
+        self._seen: set[str] = set()
+        self._count = 0
+
+    def add(self, custom_id: str, body: dict[str, Any]) -> BatchShard | None:
+        """Write a request, returns the previous shard when this request started a new one."""
+        line = (
+            json.dumps(
+                {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": body,
+                },
+                separators=(",", ":"),
+            )
+            + "\n"
+        ).encode()
+        closed = None
+        if self._shard is not None and (
+            len(self._shard.custom_ids) >= self.max_requests
+            or self._shard.size + len(line) > self.max_bytes
+        ):
+            closed = self.close()
+        if self._shard is None:
+            path = self.directory / f"batch-{self._count:05d}.jsonl"
+            self._count += 1
+            self._shard = BatchShard(path=path)
+            self._file = path.open("wb")
+            self._seen = set()
+        if custom_id in self._seen:
+            raise ValueError(f"Duplicate custom_id in batch: {custom_id}")
+        self._seen.add(custom_id)
+        self._file.write(line)
+        self._shard.custom_ids.append(custom_id)
+        self._shard.size += len(line)
+        return closed
+
+    def close(self) -> BatchShard | None:
+        """Close the current shard and return it."""
+        shard, self._shard = self._shard, None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        return shard
+
+
+class BatchJob:
+    """Uploads one shard, submits it as a batch job, polls it and reads back its results."""
+
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        shard: BatchShard,
+        *,
+        completion_window: Literal["24h"],
+        metadata: dict[str, str] | None,
+        poll_interval: float,
+        max_poll_interval: float,
+    ) -> None:
+        self.client = client
+        self.shard = shard
+        self.completion_window = completion_window
+        self.metadata = metadata
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.batch_id: str | None = None
+
+    async def run(
+        self,
+    ) -> AsyncIterator[tuple[str, dict[str, Any] | None, dict[str, Any] | None]]:
+        """Run the job, yielding (custom_id, response body, error) for every request of the shard."""
+        with self.shard.path.open("rb") as file:
+            input_file = await self.client.files.create(
+                file=(self.shard.path.name, file), purpose="batch"
+            )
+        batch = await self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window=self.completion_window,
+            metadata=self.metadata,
+        )
+        self.batch_id = batch.id
+        logger.info(
+            "Submitted batch %s with %d requests",
+            batch.id,
+            len(self.shard.custom_ids),
+        )
+        try:
+            interval = self.poll_interval
+            while batch.status not in _FINAL_STATUSES:
+                await asyncio.sleep(interval)
+                interval = min(interval * 2, self.max_poll_interval)
+                batch = await self.client.batches.retrieve(batch.id)
+        except asyncio.CancelledError:
+            await self._cancel()
+            raise
+        logger.info("Batch %s finished with status %s", batch.id, batch.status)
+
+        seen: set[str] = set()
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            async with self.client.files.with_streaming_response.content(
+                file_id
+            ) as response:
+                async for line in response.iter_lines():
+                    if not line:
+                        continue
+                    result = json.loads(line)
+                    custom_id = result["custom_id"]
+                    seen.add(custom_id)
+                    output = result.get("response") or {}
+                    if result.get("error") or output.get("status_code") != 200:
+                        yield (
+                            custom_id,
+                            None,
+                            result.get("error")
+                            or (output.get("body") or {}).get("error")
+                            or {"status_code": output.get("status_code")},
+                        )
+                    else:
+                        yield custom_id, output["body"], None
+
+        # Requests without a result, the batch failed validation, expired or was cancelled
+        if len(seen) < len(self.shard.custom_ids):
+            messages = (
+                [error.message for error in (batch.errors.data or [])]
+                if batch.errors
+                else []
+            )
+            error = {
+                "code": f"batch_{batch.status}",
+                "message": "; ".join(filter(None, messages))
+                or f"The batch ended with status {batch.status} before running the request.",
+            }
+            for custom_id in self.shard.custom_ids:
+                if custom_id not in seen:
+                    yield custom_id, None, error
+
+    async def _cancel(self) -> None:
+        if self.batch_id is None:
+            return
+        try:
+            await self.client.batches.cancel(self.batch_id)
+            logger.info("Cancelled batch %s", self.batch_id)
+        except Exception as ex:
+            logger.warning("Failed to cancel batch %s: %s", self.batch_id, ex)
@@ -0,0 +1,224 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import weakref
+from collections.abc import Callable, Hashable, Sequence
+from typing import Any, Generic, TypeVar
+
+from agent_framework._tools import AIFunction
+from openai.lib._parsing._completions import type_to_response_format_param
+from openai.lib._pydantic import is_basemodel_type
+from pydantic import TypeAdapter
+
+TValue = TypeVar("TValue")
+
+
+class IdentityCache(Generic[TValue]):
+    """Caches a value derived from an object, for as long as the object lives and its fingerprint is unchanged.
+
+    Entries are keyed on the identity of the object and dropped when it is garbage collected, so the
+    cache never keeps the object alive. The fingerprint is a cheap summary of the parts of the object
+    the value depends on, a different fingerprint recomputes the value. Objects that cannot be weakly
+    referenced are not cached.
+    """
+
+    def __init__(self, maxsize: int | None = None) -> None:
+        """Initialize an IdentityCache.
+
+        Args:
+            maxsize: The maximum number of entries, the oldest entries are dropped first. None for no limit.
+        """
+        self.maxsize = maxsize
+        self._entries: dict[int, tuple[weakref.ref[Any], Hashable, TValue]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_create(
+        self, obj: Any, fingerprint: Hashable, factory: Callable[[], TValue]
+    ) -> TValue:
+        """Get the cached value for the object, creating it with factory when missing or stale."""
+        key = id(obj)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0]() is obj and entry[1] == fingerprint:
+            self.hits += 1
+            return entry[2]
+        self.misses += 1
+        value = factory()
+        try:
+            ref = weakref.ref(obj, self._remover(key))
+        except TypeError:
+            return value
+        self._entries.pop(key, None)
+        self._entries[key] = (ref, fingerprint, value)
+        if self.maxsize is not None and len(self._entries) > self.maxsize:
+            del self._entries[next(iter(self._entries))]
+        return value
+
+    def _remover(self, key: int) -> Callable[["weakref.ref[Any]"], None]:
+        cache_ref = weakref.ref(self)
+
+        def remove(ref: "weakref.ref[Any]") -> None:
+            cache = cache_ref()
+            # The id may already be reused by a newer object with its own entry
+            if (
+                cache is not None
+                and (entry := cache._entries.get(key)) is not None
+                and entry[0] is ref
+            ):
+                del cache._entries[key]
+
+        return remove
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _function_fingerprint(tool: AIFunction[Any, Any]) -> tuple[Any, ...]:
+    """A cheap summary of the parts of a function tool its wire-format spec depends on."""
+    return (tool.name, tool.description, tool.input_model)
+
+
+class ToolSpecCache(Generic[TValue]):
+    """Caches the compiled wire-format specs of function tools.
+
+    Building the JSON schema of a function tool is the expensive part of preparing the tools of a
+    request, so each function tool is compiled once and compiled again only when its name,
+    description or input model changes. When the same function tools are passed again, the spec
+    list of the previous request is reused as a whole. Hosted and dict tools are cheap and are
+    converted by the caller on every request.
+    """
+
+    def __init__(self, compile: Callable[[AIFunction[Any, Any]], TValue]) -> None:
+        """Initialize a ToolSpecCache.
+
+        Args:
+            compile: Builds the wire-format spec of a function tool.
+        """
+        self._compile = compile
+        self._specs: IdentityCache[TValue] = IdentityCache()
+        # Keeps the tools of the previous request alive, so their ids cannot be reused
+        self._last_key: tuple[Any, ...] = ()
+        self._last_specs: list[TValue] = []
+        self.list_hits = 0
+
+    def get(self, tool: AIFunction[Any, Any]) -> TValue:
+        """Get the spec of a function tool, compiling it when missing or stale."""
+        return self._specs.get_or_create(
+            tool, _function_fingerprint(tool), lambda: self._compile(tool)
+        )
+
+    def get_all(self, tools: Sequence[Any]) -> list[TValue] | None:
+        """Get the specs of the tools when all of them are function tools, otherwise None."""
+        if not tools or not all(isinstance(tool, AIFunction) for tool in tools):
+            return None
+        key = tuple(
+            part for tool in tools for part in (tool, *_function_fingerprint(tool))
+        )
+        if len(key) == len(self._last_key) and all(
+            new is old for new, old in zip(key, self._last_key)
+        ):
+            self.list_hits += 1
+        else:
+            self._last_specs = [self.get(tool) for tool in tools]
+            self._last_key = key
+        # A new list, so a request cannot change the cached one
+        return list(self._last_specs)
+
+    @property
+    def hits(self) -> int:
+        """The number of function tools whose spec was reused, not counting whole-list reuse."""
+        return self._specs.hits
+
+    @property
+    def misses(self) -> int:
+        """The number of function tools that were compiled."""
+        return self._specs.misses
+
+
+def _schema_fingerprint(response_format: type) -> int:
+    """Changes when a pydantic model is rebuilt, for example once its forward references resolve."""
+    return id(getattr(response_format, "__pydantic_core_schema__", None))
+
+
+class ResponseFormatCache:
+    """Caches the compiled structured output payloads and validators of response format types.
+
+    Generating the strict JSON schema of a response format is the expensive part of preparing a
+    structured output request, and it only depends on the type, so the payload of each type is
+    compiled once and shared by all clients. The types are weakly referenced, and a pydantic model
+    that is rebuilt is compiled again. The payloads are shared between requests and must not be
+    modified.
+    """
+
+    def __init__(self) -> None:
+        """Initialize a ResponseFormatCache."""
+        self._response_formats: IdentityCache[dict[str, Any]] = IdentityCache()
+        self._text_formats: IdentityCache[dict[str, Any]] = IdentityCache()
+        self._validators: IdentityCache[Callable[[str], Any]] = IdentityCache()
+
+    def response_format(self, response_format: type) -> dict[str, Any]:
+        """Get the ``response_format`` payload of the chat completions API for a type."""
+        return self._response_formats.get_or_create(
+            response_format,
+            _schema_fingerprint(response_format),
+            lambda: type_to_response_format_param(response_format),  # type: ignore[arg-type, return-value]
+        )
+
+    def text_format(self, response_format: type) -> dict[str, Any]:
+        """Get the ``text.format`` payload of the Responses API for a type."""
+
+        def compile() -> dict[str, Any]:
+            json_schema = self.response_format(response_format)["json_schema"]
+            return {
+                "type": "json_schema",
+                "strict": True,
+                "name": json_schema["name"],
+                "schema": json_schema["schema"],
+            }
+
+        return self._text_formats.get_or_create(
+            response_format, _schema_fingerprint(response_format), compile
+        )
+
+    def validator(self, response_format: type) -> Callable[[str], Any]:
+        """Get the function that validates the JSON text of a response into the type."""
+
+        def compile() -> Callable[[str], Any]:
+            if is_basemodel_type(response_format):
+                return response_format.model_validate_json
+            return TypeAdapter(response_format).validate_json
+
+        return self._validators.get_or_create(
+            response_format, _schema_fingerprint(response_format), compile
+        )
+
+    def clear(self) -> None:
+        """Drop all compiled payloads and validators."""
+        self._response_formats.clear()
+        self._text_formats.clear()
+        self._validators.clear()
+
+    @property
+    def hits(self) -> int:
+        """The number of payloads and validators that were reused."""
+        return (
+            self._response_formats.hits
+            + self._text_formats.hits
+            + self._validators.hits
+        )
+
+    @property
+    def misses(self) -> int:
+        """The number of payloads and validators that were compiled."""
+        return (
+            self._response_formats.misses
+            + self._text_formats.misses
+            + self._validators.misses
+        )
+
+
+# The payloads only depend on the type, so all clients share them
+response_formats = ResponseFormatCache()
@@ -1,25 +1,33 @@
 # Copyright (c) Microsoft. All rights reserved.
 
+import asyncio
 import json
 import sys
+import tempfile
 from collections.abc import (
     AsyncIterable,
     Awaitable,
     Callable,
+    Iterable,
     Mapping,
     MutableMapping,
     MutableSequence,
     Sequence,
 )
+from copy import copy
 from datetime import datetime
+from functools import cached_property, partial
 from itertools import chain
-from typing import Any, TypeVar
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Literal, TypeVar
 
 from openai import AsyncOpenAI, BadRequestError
-from openai.lib._parsing._completions import type_to_response_format_param
 from openai.types import CompletionUsage
 from openai.types.chat.chat_completion import ChatCompletion, Choice
-from openai.types.chat.chat_completion_chunk import ChatCompletionChunk
+from openai.types.chat.chat_completion_chunk import (
+    ChatCompletionChunk,
+    ChoiceDeltaToolCall,
+)
 from openai.types.chat.chat_completion_chunk import Choice as ChunkChoice
 from openai.types.chat.chat_completion_message_custom_tool_call import (
     ChatCompletionMessageCustomToolCall,
@@ -62,6 +70,26 @@ from agent_framework.exceptions import (
 from agent_framework.observability import use_observability
 from ._exceptions import OpenAIContentFilterException
 from ._shared import OpenAIBase, OpenAIConfigMixin, OpenAISettings
+from ._tool_calls import StreamingToolCallAssembler
+
+if TYPE_CHECKING:
+    # The feature modules are only imported when their feature is configured
+    from ._batch import OpenAIBatchResult
+    from ._caching import IdentityCache, ToolSpecCache
+    from ._client_registry import OpenAIClientRegistry
+    from ._coalescing import RequestCoalescer
+    from ._concurrency import AdaptiveConcurrencyLimiter
+    from ._context_budget import ContextBudget
+    from ._endpoint_pool import OpenAIEndpointPool
+    from ._hedging import HedgingPolicy
+    from ._latency_metrics import LatencyMetrics
+    from ._media_uploads import MediaUploadCache
+    from ._predictions import PredictionStats
+    from ._prompt_caching import PromptCaching
+    from ._rate_limits import OpenAIRateLimiter
+    from ._response_cache import ResponseCache
+    from ._streaming import LeanStreaming, StreamCoalescing
+    from ._transports import CassetteTransport
 
 if sys.version_info >= (3, 12):
     from typing import override  # type: ignore # pragma: no cover
@@ -72,11 +100,31 @@ __all__ = ["OpenAIChatClient"]
 
 logger = get_logger("agent_framework.openai")
 
+# The top-level media types chat completions accept by file id, as files
+_FILE_ID_MEDIA_TYPES = ("application",)
+# The path of the API, appended to the base URL to name the endpoint in the latency metrics
+_ENDPOINT_PATH = "chat/completions"
+
+
+def _message_fingerprint(
+    message: ChatMessage, media_generation: int = 0
+) -> tuple[Any, ...]:
+    """A cheap summary of the parts of a message its parsed wire dicts depend on."""
+    return (
+        media_generation,
+        message.role.value if isinstance(message.role, Role) else message.role,
+        # The items themselves, so a property changed in place is noticed too
+        tuple((message.additional_properties or {}).items()),
+        *map(id, message.contents),
+    )
+
 
 # region Base Client
 class OpenAIBaseChatClient(OpenAIBase, BaseChatClient):
     """OpenAI Chat completion class."""
 
+    _lean_streaming: "LeanStreaming | None" = None
+
     async def _inner_get_response(
         self,
         *,
@@ -84,11 +132,31 @@ class OpenAIBaseChatClient(OpenAIBase, BaseChatClient):
         chat_options: ChatOptions,
         **kwargs: Any,
     ) -> ChatResponse:
-        options_dict = self._prepare_options(messages, chat_options)
+        timing = self._start_timing(_ENDPOINT_PATH, streaming=False)
+        with self._timed_preparation(timing):
+            # Only the media of the messages left after trimming to the context budget is uploaded
+            fitted_messages = self._fit_context(messages, chat_options)
+            await self._upload_media(fitted_messages, _FILE_ID_MEDIA_TYPES)
+            options_dict = self._prepare_options(
+                fitted_messages, chat_options, prediction=kwargs.get("prediction")
+            )
+            if timing is not None:
+                timing.prepared(options_dict["model"])
         try:
-            return self._create_chat_response(
-                await self.client.chat.completions.create(stream=False, **options_dict),
-                chat_options,
+            return await self._timed_response(
+                timing,
+                self._coalesced(
+                    options_dict,
+                    chat_options,
+                    lambda: self._cached(
+                        options_dict,
+                        chat_options,
+                        lambda: self._hedged(
+                            options_dict,
+                            lambda: self._get_response_once(options_dict, chat_options),
+                        ),
+                    ),
+                ),
             )
         except BadRequestError as ex:
             if ex.code == "content_filter":
@@ -106,6 +174,31 @@ class OpenAIBaseChatClient(OpenAIBase, BaseChatClient):
                 inner_exception=ex,
             ) from ex
 
+    async def _get_response_once(
+        self, options_dict: dict[str, Any], chat_options: ChatOptions
+    ) -> ChatResponse:
+        """Send one non-streaming request, hedging may call this twice for one response."""
+        async with (
+            self._rate_limited(options_dict) as reservation,
+            self._concurrency_slot() as permit,
+        ):
+            response = self._create_chat_response(
+                await self._send(
+                    self.client.chat.completions,
+                    reservation,
+                    permit=permit,
+                    stream=False,
+                    **options_dict,
+                ),
+                chat_options,
+            )
+            if reservation is not None:
+                reservation.settle(response.usage_details)
+            self._record_prompt_cache(options_dict, response.usage_details)
+            if "prediction" in options_dict:
+                self._prediction_stats.record(response.usage_details)
+            return response
+
     async def _inner_get_streaming_response(
         self,
         *,
@@ -113,15 +206,51 @@ class OpenAIBaseChatClient(OpenAIBase, BaseChatClient):
         chat_options: ChatOptions,
         **kwargs: Any,
     ) -> AsyncIterable[ChatResponseUpdate]:
-        options_dict = self._prepare_options(messages, chat_options)
-        options_dict["stream_options"] = {"include_usage": True}
+        timing = self._start_timing(_ENDPOINT_PATH, streaming=True)
+        with self._timed_preparation(timing):
+            # Only the media of the messages left after trimming to the context budget is uploaded
+            fitted_messages = self._fit_context(messages, chat_options)
+            await self._upload_media(fitted_messages, _FILE_ID_MEDIA_TYPES)
+            options_dict = self._prepare_options(
+                fitted_messages, chat_options, prediction=kwargs.get("prediction")
+            )
+            options_dict["stream_options"] = {"include_usage": True}
+            if timing is not None:
+                timing.prepared(options_dict["model"])
+        async for update in self._coalesced_updates(
+            self._timed_updates(
+                timing,
+                self._cached_stream(
+                    options_dict,
+                    chat_options,
+                    lambda: self._stream_once(options_dict, chat_options),
+                ),
+            )
+        ):
+            yield update
+
+    async def _stream_once(
+        self, options_dict: dict[str, Any], chat_options: ChatOptions
+    ) -> AsyncIterable[ChatResponseUpdate]:
+        """Send one streaming request, or subscribe to an identical one in flight."""
+        tool_calls = StreamingToolCallAssembler()
         try:
-            async for chunk in await self.client.chat.completions.create(
-                stream=True, **options_dict
-            ):
+            chunks = self._coalesced_stream(
+                options_dict, chat_options, lambda: self._stream_chunks(options_dict)
+            )
+            if self._lean_streaming is not None:
+                async for update in self._lean_updates(
+                    chunks, tool_calls, self._lean_streaming
+                ):
+                    yield update
+                return
+            async for chunk in chunks:
                 if len(chunk.choices) == 0 and chunk.usage is None:
                     continue
-                yield self._create_chat_response_update(chunk)
+                yield self._create_chat_response_update(chunk, tool_calls)
+            # The stream ended without a finish reason
+            if pending := tool_calls.finish_all():
+                yield ChatResponseUpdate(role=Role.ASSISTANT, contents=pending)
         except BadRequestError as ex:
             if ex.code == "content_filter":
                 raise OpenAIContentFilterException(
@@ -138,17 +267,271 @@ class OpenAIBaseChatClient(OpenAIBase, BaseChatClient):
                 inner_exception=ex,
             ) from ex
 
+    async def _lean_updates(
+        self,
+        chunks: AsyncIterable[ChatCompletionChunk],
+        tool_calls: StreamingToolCallAssembler,
+        lean: "LeanStreaming",
+    ) -> AsyncIterable[ChatResponseUpdate]:
+        """Turn the chunks of a stream into updates in the lean streaming mode."""
+        text: list[str] = []
+        text_chars = 0
+        created: int | None = None
+        created_at: str | None = None
+        chunk: ChatCompletionChunk | None = None
+        async for chunk in chunks:
+            if chunk.created != created:
+                # All chunks of a stream carry the creation time of the response
+                created = chunk.created
+                created_at = datetime.fromtimestamp(created).strftime(
+                    "%Y-%m-%dT%H:%M:%S.%fZ"
+                )
+            raw_representation = chunk if lean.raw_representation else None
+            contents: list[Contents] = []
+            finish_reason: FinishReason | None = None
+            if chunk.usage:
+                contents.append(
+                    UsageContent(
+                        details=self._usage_details_from_openai(chunk.usage),
+                        raw_representation=raw_representation,
+                    )
+                )
+            for choice in chunk.choices:
+                delta = choice.delta
+                if piece := delta.content or delta.refusal:
+                    text.append(piece)
+                    text_chars += len(piece)
+                if delta.tool_calls:
+                    for tool in delta.tool_calls:
+                        if tool.function and (
+                            call := tool_calls.add(
+                                tool.index,
+                                tool.function.arguments,
+                                call_id=tool.id,
+                                name=tool.function.name,
+                                raw_representation=raw_representation,
+                            )
+                        ):
+                            contents.append(call)
+                if choice.finish_reason:
+                    finish_reason = FinishReason(value=choice.finish_reason)
+                    contents.extend(tool_calls.finish_all())
+            if (
+                not contents
+                and finish_reason is None
+                and text_chars < lean.max_text_chars
+            ):
+                continue
+            if text:
+                contents.insert(0, TextContent(text="".join(text)))
+                text.clear()
+                text_chars = 0
+            yield ChatResponseUpdate(
+                created_at=created_at,
+                contents=contents,
+                role=Role.ASSISTANT,
+                model_id=chunk.model,
+                finish_reason=finish_reason,
+                raw_representation=raw_representation,
+                response_id=chunk.id,
+                message_id=chunk.id,
+            )
+        pending: list[Contents] = list(tool_calls.finish_all())
+        if text:
+            pending.insert(0, TextContent(text="".join(text)))
+        if pending and chunk is not None:
+            yield ChatResponseUpdate(
+                created_at=created_at,
+                contents=pending,
+                role=Role.ASSISTANT,
+                model_id=chunk.model,
+                response_id=chunk.id,
+                message_id=chunk.id,
+            )
+
+    async def _stream_chunks(
+        self, options_dict: dict[str, Any]
+    ) -> AsyncIterable[ChatCompletionChunk]:
+        """Send one streaming request, yielding its raw chunks."""
+        async with (
+            self._rate_limited(options_dict) as reservation,
+            self._concurrency_slot() as permit,
+        ):
+            async for chunk in await self._send(
+                self.client.chat.completions,
+                reservation,
+                permit=permit,
+                stream=True,
+                **options_dict,
+            ):
+                if chunk.usage is not None:
+                    usage = self._usage_details_from_openai(chunk.usage)
+                    if reservation is not None:
+                        reservation.settle(usage)
+                    self._record_prompt_cache(options_dict, usage)
+                    if "prediction" in options_dict:
+                        self._prediction_stats.record(usage)
+                yield chunk
+
+    # region batch
+
+    async def get_batch_responses(
+        self,
+        requests: Iterable[
+            tuple[str, str | ChatMessage | list[str] | list[ChatMessage]]
+        ],
+        *,
+        chat_options: ChatOptions | None = None,
+        directory: str | Path | None = None,
+        max_requests_per_batch: int | None = None,
+        max_bytes_per_batch: int | None = None,
+        completion_window: Literal["24h"] = "24h",
+        metadata: dict[str, str] | None = None,
+        poll_interval: float = 10.0,
+        max_poll_interval: float = 300.0,
+    ) -> "AsyncIterable[OpenAIBatchResult]":
+        """Run many requests through the Batch API, at a lower price and outside the rate limits.
+
+        The requests are prepared the same way as for get_response and written into JSONL files
+        of at most max_requests_per_batch requests and max_bytes_per_batch bytes. Each file is
+        submitted as a batch job as soon as it is written, and the jobs are polled with an
+        exponential backoff. The results are yielded as the jobs finish, in no particular order,
+        correlated to the requests by their custom_id. When the iteration is stopped early,
+        the jobs that are still running are cancelled.
+
+        Args:
+            requests: Pairs of a unique custom_id and the messages of the request.
+
+        Keyword Args:
+            chat_options: The chat options shared by all requests.
+            directory: The directory the JSONL files are written to and kept in,
+                by default a temporary directory that is removed afterwards.
+            max_requests_per_batch: The maximum number of requests of one batch job,
+                by default the Batch API limit of 50,000.
+            max_bytes_per_batch: The maximum size of the input file of one batch job,
+                by default 190 MB, below the Batch API limit of 200 MB.
+            completion_window: The time frame within which the batch jobs should be processed.
+            metadata: Metadata set on every batch job.
+            poll_interval: The initial number of seconds between polls of a batch job.
+            max_poll_interval: The maximum number of seconds between polls of a batch job.
+
+        Yields:
+            The result of every request, with the response or the error returned for it.
+
+        Examples:
+            .. code-block:: python
+
+                from custom_openai import OpenAIChatClient
+
+                client = OpenAIChatClient(model_id="gpt-4o-mini")
+                requests = ((row.id, f"Classify: {row.text}") for row in rows)
+                async for result in client.get_batch_responses(requests):
+                    if result.response is not None:
+                        save(result.custom_id, result.response.text)
+        """
+        from ._batch import (
+            MAX_BATCH_BYTES,
+            MAX_BATCH_REQUESTS,
+            BatchJob,
+            BatchShard,
+            BatchShardWriter,
+            OpenAIBatchResult,
+        )
+
+        chat_options = copy(chat_options) if chat_options else ChatOptions()
+        self._prepare_tool_choice(chat_options=chat_options)
+        temporary = None
+        if directory is None:
+            temporary = tempfile.TemporaryDirectory(prefix="openai-batch-")
+            directory = temporary.name
+        writer = BatchShardWriter(
+            Path(directory),
+            max_requests_per_batch or MAX_BATCH_REQUESTS,
+            max_bytes_per_batch or MAX_BATCH_BYTES,
+        )
+        # Bounded, so results are not read ahead of the caller
+        results: asyncio.Queue[OpenAIBatchResult | Exception | None] = asyncio.Queue(
+            maxsize=1000
+        )
+        tasks: list[asyncio.Task[None]] = []
+
+        async def run(shard: BatchShard) -> None:
+            job = BatchJob(
+                self.client,
+                shard,
+                completion_window=completion_window,
+                metadata=metadata,
+                poll_interval=poll_interval,
+                max_poll_interval=max_poll_interval,
+            )
+            try:
+                async for custom_id, body, error in job.run():
+                    response = (
+                        self._create_chat_response(
+                            ChatCompletion.model_validate(body), chat_options
+                        )
+                        if body is not None
+                        else None
+                    )
+                    await results.put(
+                        OpenAIBatchResult(
+                            custom_id=custom_id,
+                            response=response,
+                            error=error,
+                            batch_id=job.batch_id,
+                        )
+                    )
+            except Exception as ex:
+                await results.put(ex)
+            await results.put(None)
+
+        try:
+            for custom_id, messages in requests:
+                options_dict = self._prepare_options(
+                    self._fit_context(
+                        self.prepare_messages(messages, chat_options), chat_options
+                    ),
+                    chat_options,
+                )
+                if shard := writer.add(custom_id, options_dict):
+                    tasks.append(asyncio.create_task(run(shard)))
+                    # Let the finished shard start uploading
+                    await asyncio.sleep(0)
+            if shard := writer.close():
+                tasks.append(asyncio.create_task(run(shard)))
+            running = len(tasks)
+            while running:
+                item = await results.get()
+                if item is None:
+                    running -= 1
+                elif isinstance(item, Exception):
+                    raise ServiceResponseException(
+                        f"{type(self)} batch job failed: {item}",
+                        inner_exception=item,
+                    ) from item
+                else:
+                    yield item
+        finally:
+            writer.close()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if temporary is not None:
+                temporary.cleanup()
+
     # region content creation
 
     def _chat_to_tool_spec(
         self, tools: Sequence[ToolProtocol | MutableMapping[str, Any]]
     ) -> list[dict[str, Any]]:
+        if (cached := self._tool_specs.get_all(tools)) is not None:
+            return cached
         chat_tools: list[dict[str, Any]] = []
         for tool in tools:
             if isinstance(tool, ToolProtocol):
                 match tool:
                     case AIFunction():
-                        chat_tools.append(tool.to_json_schema_spec())
+                        chat_tools.append(self._tool_specs.get(tool))
                     case _:
                         logger.debug(
                             "Unsupported tool passed (type: %s), ignoring", type(tool)
@@ -157,6 +540,13 @@ class OpenAIBaseChatClient(OpenAIBase, BaseChatClient):
                 chat_tools.append(tool if isinstance(tool, dict) else dict(tool))
         return chat_tools
 
+    @cached_property
+    def _tool_specs(self) -> "ToolSpecCache[dict[str, Any]]":
+        """The compiled specs of the function tools, so their JSON schemas are not rebuilt on every request."""
+        from ._caching import ToolSpecCache
+
+        return ToolSpecCache(lambda tool: tool.to_json_schema_spec())
+
     def _process_web_search_tool(
         self, tools: Sequence[ToolProtocol | MutableMapping[str, Any]]
     ) -> dict[str, Any] | None:
@@ -180,7 +570,10 @@ class OpenAIBaseChatClient(OpenAIBase, BaseChatClient):
         return None
 
     def _prepare_options(
-        self, messages: MutableSequence[ChatMessage], chat_options: ChatOptions
+        self,
+        messages: Sequence[ChatMessage],
+        chat_options: ChatOptions,
+        prediction: Any = None,
     ) -> dict[str, Any]:
         # Preprocess web search tool if it exists
         options_dict = chat_options.to_dict(
@@ -215,13 +608,23 @@ class OpenAIBaseChatClient(OpenAIBase, BaseChatClient):
             and isinstance(chat_options.response_format, type)
             and issubclass(chat_options.response_format, BaseModel)
         ):
-            options_dict["response_format"] = type_to_response_format_param(
+            from ._caching import response_formats
+
+            options_dict["response_format"] = response_formats.response_format(
                 chat_options.response_format
             )
         if additional_properties := options_dict.pop("additional_properties", None):
             for key, value in additional_properties.items():
                 if value is not None:
                     options_dict[key] = value
+        if prediction is None and chat_options.additional_properties:
+            # Read from the options, their dict form drops a PredictedOutput
+            prediction = chat_options.additional_properties.get("prediction")
+        if prediction is not None:
+            from ._predictions import _prediction_param
+
+            options_dict["prediction"] = _prediction_param(prediction)
+        self._apply_prompt_caching(options_dict)
         return options_dict
 
     def _create_chat_response(
@@ -261,8 +664,15 @@ class OpenAIBaseChatClient(OpenAIBase, BaseChatClient):
     def _create_chat_response_update(
         self,
         chunk: ChatCompletionChunk,
+        tool_calls: StreamingToolCallAssembler | None = None,
     ) -> ChatResponseUpdate:
-        """Create a streaming chat message content object from a choice."""
+        """Create a streaming chat message content object from a choice.
+
+        Args:
+            chunk: The streamed chunk.
+            tool_calls: Assembles the tool call fragments of the stream, each call is emitted once
+                when its arguments are complete. Without it, every fragment is emitted as it arrives.
+        """
         chunk_metadata = self._get_metadata_from_streaming_chat_response(chunk)
         if chunk.usage:
             return ChatResponseUpdate(
@@ -282,9 +692,11 @@ class OpenAIBaseChatClient(OpenAIBase, BaseChatClient):
         finish_reason: FinishReason | None = None
         for choice in chunk.choices:
             chunk_metadata.update(self._get_metadata_from_chat_choice(choice))
-            contents.extend(self._get_tool_calls_from_chat_choice(choice))
+            contents.extend(self._get_tool_calls_from_chat_choice(choice, tool_calls))
             if choice.finish_reason:
                 finish_reason = FinishReason(value=choice.finish_reason)
+                if tool_calls is not None:
+                    contents.extend(tool_calls.finish_all())
 
             if text_content := self._parse_text_from_choice(choice):
                 contents.append(text_content)
@@ -360,7 +772,9 @@ class OpenAIBaseChatClient(OpenAIBase, BaseChatClient):
         }
 
     def _get_tool_calls_from_chat_choice(
-        self, choice: Choice | ChunkChoice
+        self,
+        choice: Choice | ChunkChoice,
+        tool_calls: StreamingToolCallAssembler | None = None,
     ) -> list[Contents]:
         """Get tool calls from a chat choice."""
         resp: list[Contents] = []
@@ -372,6 +786,16 @@ class OpenAIBaseChatClient(OpenAIBase, BaseChatClient):
                     and tool.function
                 ):
                     # ignoring tool.custom
+                    if tool_calls is not None and isinstance(tool, ChoiceDeltaToolCall):
+                        if call := tool_calls.add(
+                            tool.index,
+                            tool.function.arguments,
+                            call_id=tool.id,
+                            name=tool.function.name,
+                            raw_representation=tool.function,
+                        ):
+                            resp.append(call)
+                        continue
                     fcc = FunctionCallContent(
                         call_id=tool.id if tool.id else "",
                         name=tool.function.name if tool.function.name else "",
@@ -409,12 +833,47 @@ class OpenAIBaseChatClient(OpenAIBase, BaseChatClient):
         Returns:
             prepared_chat_history (Any): The prepared chat history for a request.
         """
+        # Uploading or evicting a media payload changes how the messages that contain it are sent
+        media_generation = (
+            self._media_uploads.generation if self._media_uploads is not None else 0
+        )
         list_of_list = [
-            self._openai_chat_message_parser(message) for message in chat_messages
+            self._parsed_messages.get_or_create(
+                message,
+                _message_fingerprint(message, media_generation),
+                partial(self._openai_chat_message_parser, message),
+            )
+            for message in chat_messages
         ]
         # Flatten the list of lists into a single list
         return list(chain.from_iterable(list_of_list))
 
+    @cached_property
+    def _prediction_stats(self) -> "PredictionStats":
+        """The counters of the requests sent with a prediction."""
+        from ._predictions import PredictionStats
+
+        return PredictionStats()
+
+    def prediction_stats(self) -> "PredictionStats":
+        """Get a snapshot of the counters of the requests sent with a prediction (Predicted Outputs)."""
+        from ._predictions import PredictionStats
+
+        stats = self._prediction_stats
+        return PredictionStats(
+            requests=stats.requests,
+            accepted_tokens=stats.accepted_tokens,
+            rejected_tokens=stats.rejected_tokens,
+            completion_tokens=stats.completion_tokens,
+        )
+
+    @cached_property
+    def _parsed_messages(self) -> "IdentityCache[list[dict[str, Any]]]":
+        """The parsed wire dicts of the messages of previous turns, so each turn only parses new messages."""
+        from ._caching import IdentityCache
+
+        return IdentityCache()
+
     # region Parsers
 
     def _openai_chat_message_parser(self, message: ChatMessage) -> list[dict[str, Any]]:
@@ -522,9 +981,12 @@ class OpenAIBaseChatClient(OpenAIBase, BaseChatClient):
                     and content.additional_properties
                     else None
                 )
-                file_obj = {"file_data": content.uri}
-                if filename:
-                    file_obj["filename"] = filename
+                if file_id := self._uploaded_file_id(content):
+                    file_obj = {"file_id": file_id}
+                else:
+                    file_obj = {"file_data": content.uri}
+                    if filename:
+                        file_obj["filename"] = filename
                 return {
                     "type": "file",
                     "file": file_obj,
@@ -562,6 +1024,22 @@ class OpenAIChatClient(OpenAIConfigMixin, OpenAIBaseChatClient):
         org_id: str | None = None,
         default_headers: Mapping[str, str] | None = None,
         async_client: AsyncOpenAI | None = None,
+        client_registry: "OpenAIClientRegistry | None" = None,
+        http2: bool | None = None,
+        http2_max_concurrent_streams: int | None = None,
+        cassette: "CassetteTransport | None" = None,
+        concurrency_limiter: "AdaptiveConcurrencyLimiter | None" = None,
+        endpoint_pool: "OpenAIEndpointPool | None" = None,
+        rate_limiter: "OpenAIRateLimiter | None" = None,
+        hedging: "HedgingPolicy | None" = None,
+        response_cache: "ResponseCache | None" = None,
+        request_coalescer: "RequestCoalescer | None" = None,
+        stream_coalescing: "StreamCoalescing | None" = None,
+        prompt_caching: "PromptCaching | None" = None,
+        context_budget: "ContextBudget | None" = None,
+        media_uploads: "MediaUploadCache | None" = None,
+        latency_metrics: "LatencyMetrics | None" = None,
+        lean_streaming: "LeanStreaming | None" = None,
         instruction_role: str | None = None,
         base_url: str | None = None,
         env_file_path: str | None = None,
@@ -579,6 +1057,42 @@ class OpenAIChatClient(OpenAIConfigMixin, OpenAIBaseChatClient):
             default_headers: The default headers mapping of string keys to
                 string values for HTTP requests.
             async_client: An existing client to use.
+            client_registry: A registry to share a pooled AsyncOpenAI client with other
+                clients using the same endpoint, credentials and headers,
+                for example ``get_shared_client_registry()``. Ignored when async_client is set.
+            http2: Whether to multiplex requests over HTTP/2 connections, requires the 'h2' package.
+                Ignored when async_client is set. Can also be set via environment variable OPENAI_HTTP2.
+            http2_max_concurrent_streams: The maximum number of concurrent streams per HTTP/2 connection,
+                up to 100. Can also be set via environment variable OPENAI_HTTP2_MAX_CONCURRENT_STREAMS.
+            cassette: A transport that records the exchanges with the service to a file, or replays them
+                offline at the recorded or an accelerated pace, see CassetteTransport. Ignored when
+                async_client is set.
+            concurrency_limiter: An adaptive (AIMD) limiter of the number of concurrent calls, raised on
+                success and cut on 429/503 responses or rising latency. Can be shared between clients.
+            endpoint_pool: A pool of endpoints serving the same models to balance the requests over,
+                with latency and error based routing and failover. Ignored when async_client is set.
+            rate_limiter: A limiter for the requests and tokens per minute of the account, requests wait
+                for capacity instead of failing with rate limit errors. Share it between clients of the
+                same account, for example with ``get_shared_rate_limiter(api_key)``.
+            hedging: A policy that sends a second attempt for non-streaming calls that have not completed
+                by a latency percentile deadline, the first to finish wins. Streaming calls are not hedged.
+            response_cache: An exact-match cache of the responses, keyed on the prepared request. Only
+                requests at temperature 0 without tools are cached by default, streaming calls replay hits.
+            request_coalescer: Shares one call between identical requests in flight at the same time, for
+                example the same prompt fanned out by a workflow. Streams are teed to all of their requests.
+            stream_coalescing: Merges the streamed text deltas into fewer updates, flushed after a delay or
+                a number of characters, and immediately on tool calls, usage and the finish reason.
+            prompt_caching: Keeps the prefix of the requests stable for the service's prompt cache, sets a
+                prompt_cache_key per tenant and conversation, and aggregates the cached tokens per agent and
+                model, see PromptCaching.
+            context_budget: Keeps the messages and tools of the requests within a token budget, trimming
+                the messages with its strategy and reporting what was trimmed, see ContextBudget.
+            media_uploads: Uploads the images and documents attached as data to the Files API once, and
+                sends them by file id on every later turn, see MediaUploadCache.
+            latency_metrics: Records the time to first token, inter-token gaps, duration, throughput and
+                preparation time of the requests per agent, model and endpoint, see LatencyMetrics.
+            lean_streaming: Turns stream chunks into updates with less work per chunk, coalescing text
+                deltas and dropping the raw chunks and per-chunk metadata, see LeanStreaming.
             instruction_role: The role to use for 'instruction' messages, for example,
                 "system" or "developer". If not provided, the default is "system".
             base_url: The base URL to use. If provided will override
@@ -610,6 +1124,8 @@ class OpenAIChatClient(OpenAIConfigMixin, OpenAIBaseChatClient):
                 base_url=base_url,
                 org_id=org_id,
                 chat_model_id=model_id,
+                http2=http2,
+                http2_max_concurrent_streams=http2_max_concurrent_streams,
                 env_file_path=env_file_path,
                 env_file_encoding=env_file_encoding,
             )
@@ -618,7 +1134,11 @@ class OpenAIChatClient(OpenAIConfigMixin, OpenAIBaseChatClient):
                 "Failed to create OpenAI settings.", ex
             ) from ex
 
-        if not async_client and not openai_settings.api_key:
+        if (
+            not async_client
+            and not openai_settings.api_key
+            and not (endpoint_pool and endpoint_pool.primary_api_key)
+        ):
             raise ServiceInitializationError(
                 "OpenAI API key is required. Set via 'api_key' parameter or 'OPENAI_API_KEY' environment variable."
             )
@@ -635,5 +1155,21 @@ class OpenAIChatClient(OpenAIConfigMixin, OpenAIBaseChatClient):
             org_id=openai_settings.org_id,
             default_headers=default_headers,
             client=async_client,
+            client_registry=client_registry,
+            http2=openai_settings.http2,
+            http2_max_concurrent_streams=openai_settings.http2_max_concurrent_streams,
+            cassette=cassette,
+            concurrency_limiter=concurrency_limiter,
+            endpoint_pool=endpoint_pool,
+            rate_limiter=rate_limiter,
+            hedging=hedging,
+            response_cache=response_cache,
+            request_coalescer=request_coalescer,
+            stream_coalescing=stream_coalescing,
+            prompt_caching=prompt_caching,
+            context_budget=context_budget,
+            media_uploads=media_uploads,
+            latency_metrics=latency_metrics,
             instruction_role=instruction_role,
         )
+        self._lean_streaming = lean_streaming
@@ -0,0 +1,297 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import asyncio
+import hashlib
+import threading
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from agent_framework._logging import get_logger
+from ._transports import (
+    HTTP2_MAX_STREAMS_PER_CONNECTION,
+    HTTP2MultiplexTransport,
+    _http2_client_args,
+)
+
+logger = get_logger("agent_framework.openai")
+
+__all__ = [
+    "OpenAIClientRegistry",
+    "OpenAIClientRegistryStats",
+    "get_shared_client_registry",
+]
+
+
+@dataclass
+class OpenAIClientRegistryStats:
+    """A snapshot of the state of an OpenAIClientRegistry.
+
+    Attributes:
+        pools: The number of distinct AsyncOpenAI clients (and httpx pools) currently alive.
+        references: The number of chat clients currently holding a pooled AsyncOpenAI client.
+        created: The total number of AsyncOpenAI clients created by the registry.
+        reused: The total number of acquisitions served by an existing AsyncOpenAI client.
+        released: The total number of AsyncOpenAI clients closed because nobody referenced them anymore.
+        open_connections: The number of open connections across all pools, best effort.
+    """
+
+    pools: int = 0
+    references: int = 0
+    created: int = 0
+    reused: int = 0
+    released: int = 0
+    open_connections: int = 0
+
+    @property
+    def reuse_ratio(self) -> float:
+        """The share of acquisitions that reused an existing pool."""
+        total = self.created + self.reused
+        return self.reused / total if total else 0.0
+
+
+@dataclass
+class _PoolEntry:
+    client: AsyncOpenAI
+    references: int = 0
+
+
+_RegistryKey = tuple[str, str, str, tuple[tuple[str, str], ...], int | None]
+
+
+class OpenAIClientRegistry:
+    """A keyed, reference-counted registry of AsyncOpenAI clients.
+
+    Clients that talk to the same endpoint with the same credentials and headers share one
+    AsyncOpenAI instance, and therefore one httpx connection pool, instead of each building their own.
+    The shared client is closed when the last chat client referencing it is closed or garbage collected.
+
+    Examples:
+        .. code-block:: python
+
+            import httpx
+
+            from custom_openai import OpenAIChatClient, OpenAIClientRegistry, get_shared_client_registry
+
+            # Use the process-wide registry
+            client = OpenAIChatClient(model_id="gpt-4o", client_registry=get_shared_client_registry())
+
+            # Or a dedicated registry with custom pool limits
+            registry = OpenAIClientRegistry(limits=httpx.Limits(max_connections=200, max_keepalive_connections=50))
+            client = OpenAIChatClient(model_id="gpt-4o", client_registry=registry)
+            print(registry.stats())
+    """
+
+    def __init__(
+        self,
+        *,
+        limits: httpx.Limits | None = None,
+        http_client_factory: Callable[..., httpx.AsyncClient] | None = None,
+    ) -> None:
+        """Initialize an OpenAIClientRegistry.
+
+        Keyword Args:
+            limits: The connection pool limits used for every httpx client created by this registry.
+                When not set, the OpenAI SDK defaults are used.
+            http_client_factory: A factory used to create the httpx client of a new pool, it receives the
+                keyword arguments for ``DefaultAsyncHttpxClient``. Defaults to ``DefaultAsyncHttpxClient``.
+        """
+        self.limits = limits
+        self._http_client_factory = http_client_factory or DefaultAsyncHttpxClient
+        self._entries: dict[_RegistryKey, _PoolEntry] = {}
+        self._lock = threading.Lock()
+        self._stats = OpenAIClientRegistryStats()
+        # Keeps the closes scheduled by release_nowait referenced until they finish
+        self._closes: set[asyncio.Task[None]] = set()
+
+    @staticmethod
+    def _api_key_identity(api_key: str | Callable[[], str | Awaitable[str]]) -> str:
+        """Get an identity for the api key that does not keep the secret itself in the key."""
+        if callable(api_key):
+            return f"callable:{id(api_key)}"
+        return "sha256:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+    def _make_key(
+        self,
+        api_key: str | Callable[[], str | Awaitable[str]],
+        org_id: str | None,
+        base_url: str | None,
+        default_headers: Mapping[str, str] | None,
+        http2_streams: int | None,
+    ) -> _RegistryKey:
+        return (
+            str(base_url or ""),
+            org_id or "",
+            self._api_key_identity(api_key),
+            tuple(sorted((default_headers or {}).items())),
+            http2_streams,
+        )
+
+    def _create_client(
+        self,
+        api_key: str | Callable[[], str | Awaitable[str]],
+        org_id: str | None,
+        base_url: str | None,
+        default_headers: Mapping[str, str] | None,
+        http2_streams: int | None,
+    ) -> AsyncOpenAI:
+        http_args: dict[str, Any] = {}
+        if http2_streams is not None:
+            http_args.update(_http2_client_args(http2_streams, self.limits))
+        elif self.limits is not None:
+            http_args["limits"] = self.limits
+        args: dict[str, Any] = {
+            "api_key": api_key,
+            "default_headers": default_headers,
+            "http_client": self._http_client_factory(**http_args),
+        }
+        if org_id:
+            args["organization"] = org_id
+        if base_url:
+            args["base_url"] = base_url
+        return AsyncOpenAI(**args)
+
+    def acquire(
+        self,
+        *,
+        api_key: str | Callable[[], str | Awaitable[str]],
+        org_id: str | None = None,
+        base_url: str | None = None,
+        default_headers: Mapping[str, str] | None = None,
+        http2: bool = False,
+        http2_max_concurrent_streams: int | None = None,
+    ) -> AsyncOpenAI:
+        """Get a shared AsyncOpenAI client for the given connection settings.
+
+        Every call must be balanced by a call to ``release`` (or ``release_nowait``).
+
+        Keyword Args:
+            api_key: The API key, or a callable returning it. Callables are keyed on identity.
+            org_id: The OpenAI organization ID.
+            base_url: The base URL of the service.
+            default_headers: The default headers sent with each request.
+            http2: Whether the pool should multiplex requests over HTTP/2 connections.
+            http2_max_concurrent_streams: The maximum number of streams per HTTP/2 connection.
+
+        Returns:
+            The shared AsyncOpenAI client.
+        """
+        http2_streams = (
+            (http2_max_concurrent_streams or HTTP2_MAX_STREAMS_PER_CONNECTION)
+            if http2
+            else None
+        )
+        key = self._make_key(api_key, org_id, base_url, default_headers, http2_streams)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _PoolEntry(
+                    client=self._create_client(
+                        api_key, org_id, base_url, default_headers, http2_streams
+                    )
+                )
+                self._entries[key] = entry
+                self._stats.created += 1
+                logger.debug(
+                    "Created pooled OpenAI client for %s",
+                    base_url or "default endpoint",
+                )
+            else:
+                self._stats.reused += 1
+            entry.references += 1
+            return entry.client
+
+    def _decrement(self, client: AsyncOpenAI) -> AsyncOpenAI | None:
+        """Drop a reference to the client, returning it if it should now be closed."""
+        with self._lock:
+            for key, entry in self._entries.items():
+                if entry.client is client:
+                    entry.references -= 1
+                    if entry.references > 0:
+                        return None
+                    del self._entries[key]
+                    self._stats.released += 1
+                    return client
+        return None
+
+    async def release(self, client: AsyncOpenAI) -> None:
+        """Release a client obtained from ``acquire``, closing it when it is no longer referenced.
+
+        Args:
+            client: The client to release.
+        """
+        if (to_close := self._decrement(client)) is not None:
+            await to_close.close()
+
+    def release_nowait(self, client: AsyncOpenAI) -> None:
+        """Release a client from synchronous code, such as a finalizer.
+
+        When the client is no longer referenced, closing it is scheduled on the running event loop if there is one,
+        otherwise the connections are left for the garbage collector.
+
+        Args:
+            client: The client to release.
+        """
+        if (to_close := self._decrement(client)) is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(to_close.close())
+        self._closes.add(task)
+        task.add_done_callback(self._closes.discard)
+
+    def stats(self) -> OpenAIClientRegistryStats:
+        """Get a snapshot of the registry statistics, including the current open connection count."""
+        with self._lock:
+            open_connections = sum(
+                _count_connections(entry.client) for entry in self._entries.values()
+            )
+            return OpenAIClientRegistryStats(
+                pools=len(self._entries),
+                references=sum(entry.references for entry in self._entries.values()),
+                created=self._stats.created,
+                reused=self._stats.reused,
+                released=self._stats.released,
+                open_connections=open_connections,
+            )
+
+    async def aclose(self) -> None:
+        """Close all pooled clients, regardless of outstanding references.
+
+        Also waits for the closes scheduled by ``release_nowait``.
+        """
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            await entry.client.close()
+        if self._closes:
+            await asyncio.gather(*self._closes)
+
+
+def _count_connections(client: AsyncOpenAI) -> int:
+    """Count the open connections of the client's httpx pool, 0 when the transport does not expose them."""
+    transport = getattr(getattr(client, "_client", None), "_transport", None)
+    if isinstance(transport, HTTP2MultiplexTransport):
+        return transport.stats().connections
+    pool = getattr(transport, "_pool", None)
+    connections = getattr(pool, "connections", None)
+    return len(connections) if connections is not None else 0
+
+
+_shared_registry: OpenAIClientRegistry | None = None
+_shared_registry_lock = threading.Lock()
+
+
+def get_shared_client_registry() -> OpenAIClientRegistry:
+    """Get the process-wide OpenAIClientRegistry, creating it on first use."""
+    global _shared_registry
+    with _shared_registry_lock:
+        if _shared_registry is None:
+            _shared_registry = OpenAIClientRegistry()
+        return _shared_registry
@@ -0,0 +1,232 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import asyncio
+from collections.abc import AsyncIterable, AsyncIterator, Awaitable, Callable, Mapping
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from ._response_cache import _request_key
+
+__all__ = ["RequestCoalescer", "RequestCoalescerStats"]
+
+TResult = TypeVar("TResult")
+
+# Marks the end of a teed stream in the buffer of a subscriber
+_END = object()
+
+
+@dataclass
+class RequestCoalescerStats:
+    """Counters of a RequestCoalescer.
+
+    Attributes:
+        calls: The number of non-streaming calls sent to the service.
+        coalesced_calls: The number of non-streaming requests that shared the call of an identical request.
+        streams: The number of streaming calls sent to the service.
+        coalesced_streams: The number of streaming requests that subscribed to the stream of an identical request.
+        full_buffers: The number of times a stream waited for a subscriber whose buffer was full.
+    """
+
+    calls: int = 0
+    coalesced_calls: int = 0
+    streams: int = 0
+    coalesced_streams: int = 0
+    full_buffers: int = 0
+
+    @property
+    def coalesced_ratio(self) -> float:
+        """The fraction of requests that did not need a call of their own."""
+        requests = (
+            self.calls + self.coalesced_calls + self.streams + self.coalesced_streams
+        )
+        return (
+            (self.coalesced_calls + self.coalesced_streams) / requests
+            if requests
+            else 0.0
+        )
+
+
+class _Failure:
+    """The exception a teed stream failed with, delivered to every subscriber."""
+
+    __slots__ = ("exception",)
+
+    def __init__(self, exception: BaseException) -> None:
+        self.exception = exception
+
+
+class _Call:
+    """A non-streaming call in flight and the number of requests waiting for it."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Future[Any]") -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class _Stream:
+    """A streaming call in flight and the buffers of its subscribers."""
+
+    __slots__ = ("task", "subscribers")
+
+    def __init__(self) -> None:
+        self.task: asyncio.Task[None] | None = None
+        self.subscribers: list[asyncio.Queue[Any]] = []
+
+
+class RequestCoalescer:
+    """Shares one call to the service between identical requests that are in flight at the same time.
+
+    Requests are identical when their prepared options, as sent to the service, and their endpoint
+    and structured output type are equal. A non-streaming request waits for the call of an identical
+    request that is in flight and gets its own copy of the response. A streaming request subscribes to
+    the stream of an identical request that has not delivered its first chunk yet, the raw chunks are
+    then teed to all subscribers, each through a buffer of at most ``max_buffered_chunks`` chunks. A
+    subscriber with a full buffer holds back the stream, so all subscribers get every chunk. The call
+    is cancelled when all of its requests are cancelled, and its error is raised to all of them.
+
+    Unlike the response cache, requests are coalesced whatever their temperature, only use a
+    coalescer when identical concurrent requests can share one answer.
+
+    Examples:
+        .. code-block:: python
+
+            from custom_openai import OpenAIChatClient, RequestCoalescer
+
+            coalescer = RequestCoalescer()
+            client = OpenAIChatClient(model_id="gpt-4o-mini", request_coalescer=coalescer)
+            await asyncio.gather(*(client.get_response("Summarize: ...") for _ in range(8)))
+            print(coalescer.stats().coalesced_ratio)
+    """
+
+    def __init__(self, *, max_buffered_chunks: int = 256) -> None:
+        """Initialize a RequestCoalescer.
+
+        Keyword Args:
+            max_buffered_chunks: The maximum number of chunks buffered for one subscriber of a stream.
+        """
+        if max_buffered_chunks < 1:
+            raise ValueError("max_buffered_chunks must be at least 1")
+        self.max_buffered_chunks = max_buffered_chunks
+        self._calls: dict[str, _Call] = {}
+        self._streams: dict[str, _Stream] = {}
+        self._stats = RequestCoalescerStats()
+
+    @staticmethod
+    def key(options_dict: Mapping[str, Any], *scope: Any) -> str:
+        """Get the key of a prepared request.
+
+        Args:
+            options_dict: The prepared options of the request, as sent to the service.
+            scope: Other values the response depends on, for example the endpoint and response format.
+        """
+        return _request_key(options_dict, *scope)
+
+    @property
+    def in_flight(self) -> int:
+        """The number of calls in flight that new requests can still share."""
+        return len(self._calls) + len(self._streams)
+
+    async def run(self, key: str, call: Callable[[], Awaitable[TResult]]) -> TResult:
+        """Run a non-streaming call, or wait for the identical call in flight.
+
+        Args:
+            key: The key of the request.
+            call: Makes the call, only called when no identical call is in flight.
+        """
+        flight = self._calls.get(key)
+        if flight is None:
+            flight = self._calls[key] = _Call(asyncio.ensure_future(call()))
+            flight.task.add_done_callback(
+                lambda _, flight=flight: self._forget(self._calls, key, flight)
+            )
+            self._stats.calls += 1
+        else:
+            self._stats.coalesced_calls += 1
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    async def stream(
+        self, key: str, source: Callable[[], AsyncIterable[TResult]]
+    ) -> AsyncIterator[TResult]:
+        """Iterate a streaming call, or subscribe to the identical stream in flight.
+
+        Args:
+            key: The key of the request.
+            source: Opens the stream, only called when no identical stream can be subscribed to.
+        """
+        flight = self._streams.get(key)
+        if flight is None:
+            flight = self._streams[key] = _Stream()
+            flight.task = asyncio.create_task(self._tee(key, flight, source))
+            self._stats.streams += 1
+        else:
+            self._stats.coalesced_streams += 1
+        buffer: asyncio.Queue[Any] = asyncio.Queue(self.max_buffered_chunks)
+        flight.subscribers.append(buffer)
+        try:
+            while True:
+                item = await buffer.get()
+                if item is _END:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.exception
+                yield item
+        finally:
+            flight.subscribers.remove(buffer)
+            # Wake up the tee when it waits for room in this buffer
+            while not buffer.empty():
+                buffer.get_nowait()
+            if not flight.subscribers and flight.task is not None:
+                flight.task.cancel()
+
+    async def _tee(
+        self,
+        key: str,
+        flight: _Stream,
+        source: Callable[[], AsyncIterable[TResult]],
+    ) -> None:
+        """Copy the chunks of a stream into the buffers of its subscribers."""
+        end: Any = _END
+        started = False
+        iterator = aiter(source())
+        try:
+            async for chunk in iterator:
+                if not started:
+                    # Later requests would miss the chunks delivered so far, they start their own stream
+                    self._forget(self._streams, key, flight)
+                    started = True
+                for buffer in tuple(flight.subscribers):
+                    if buffer.full():
+                        self._stats.full_buffers += 1
+                    await buffer.put(chunk)
+        except Exception as ex:
+            end = _Failure(ex)
+        finally:
+            self._forget(self._streams, key, flight)
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        for buffer in tuple(flight.subscribers):
+            await buffer.put(end)
+
+    @staticmethod
+    def _forget(flights: dict[str, Any], key: str, flight: Any) -> None:
+        if flights.get(key) is flight:
+            del flights[key]
+
+    def stats(self) -> RequestCoalescerStats:
+        """Get a snapshot of the counters."""
+        return RequestCoalescerStats(
+            calls=self._stats.calls,
+            coalesced_calls=self._stats.coalesced_calls,
+            streams=self._stats.streams,
+            coalesced_streams=self._stats.coalesced_streams,
+            full_buffers=self._stats.full_buffers,
+        )
@@ -0,0 +1,301 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import asyncio
+import threading
+import time
+import weakref
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Collection, Iterable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import openai
+
+from agent_framework._logging import get_logger
+
+if TYPE_CHECKING:
+    from opentelemetry.metrics import CallbackOptions, Observation
+
+logger = get_logger("agent_framework.openai")
+
+__all__ = [
+    "AdaptiveConcurrencyLimiter",
+    "AdaptiveConcurrencyStats",
+    "ConcurrencyPermit",
+]
+
+DEFAULT_OVERLOAD_STATUS_CODES = frozenset({429, 503})
+
+
+@dataclass
+class AdaptiveConcurrencyStats:
+    """A snapshot of an AdaptiveConcurrencyLimiter.
+
+    Attributes:
+        limit: The current concurrency limit.
+        in_flight: The number of calls currently holding a slot.
+        queue_depth: The number of calls waiting for a slot.
+        latency_ms: The recent (fast EWMA) latency to the first response.
+        baseline_latency_ms: The long term (slow EWMA) latency to the first response.
+        successes: The number of calls that completed successfully.
+        overloads: The number of calls that failed with an overload status or a timeout.
+        decreases: The number of times the limit was cut.
+    """
+
+    limit: float
+    in_flight: int
+    queue_depth: int
+    latency_ms: float | None
+    baseline_latency_ms: float | None
+    successes: int
+    overloads: int
+    decreases: int
+
+
+class ConcurrencyPermit:
+    """A slot of an AdaptiveConcurrencyLimiter, held for the duration of one call."""
+
+    def __init__(self, limiter: "AdaptiveConcurrencyLimiter", epoch: int) -> None:
+        self._limiter = limiter
+        self._epoch = epoch
+        self._started = limiter._clock()
+        self.latency: float | None = None
+
+    def responded(self) -> None:
+        """Record the latency to the first response, call it once the response headers or first event arrived."""
+        if self.latency is None:
+            self.latency = self._limiter._clock() - self._started
+
+
+class AdaptiveConcurrencyLimiter:
+    """Limits concurrent calls with an additive increase, multiplicative decrease (AIMD) limit.
+
+    Every successful call while the limiter is busy raises the limit by ``1 / limit``, so by about
+    one per round of calls. A call failing with an overload status (429, 503) or a timeout, or a
+    latency to the first response above ``latency_tolerance`` times the long term baseline, multiplies
+    the limit by ``backoff``. Only calls started after the last cut can cut it again, so a single
+    burst of failures counts as one congestion event.
+
+    Calls beyond the limit wait in a FIFO queue. The current limit and queue depth are exported as the
+    OpenTelemetry gauges ``openai.client.concurrency.limit`` and ``openai.client.concurrency.queue_depth``,
+    and are available from ``stats()``.
+
+    Examples:
+        .. code-block:: python
+
+            from custom_openai import AdaptiveConcurrencyLimiter, OpenAIChatClient
+
+            limiter = AdaptiveConcurrencyLimiter(initial_limit=16, max_limit=256)
+            client = OpenAIChatClient(model_id="gpt-4o", concurrency_limiter=limiter)
+    """
+
+    def __init__(
+        self,
+        *,
+        initial_limit: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 500,
+        backoff: float = 0.5,
+        latency_tolerance: float | None = 2.0,
+        smoothing: float = 0.2,
+        overload_status_codes: Collection[int] = DEFAULT_OVERLOAD_STATUS_CODES,
+        name: str = "openai",
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize an AdaptiveConcurrencyLimiter.
+
+        Keyword Args:
+            initial_limit: The concurrency limit to start with.
+            min_limit: The lowest the limit is cut to.
+            max_limit: The highest the limit grows to.
+            backoff: The factor the limit is multiplied with on overload, between 0 and 1.
+            latency_tolerance: How many times the baseline latency a call may take before it counts
+                as overload, None to only react to errors.
+            smoothing: The weight of the newest sample in the recent latency EWMA, the baseline
+                uses a tenth of it.
+            overload_status_codes: The response status codes that cut the limit.
+            name: The name of the limiter in the exported metrics.
+            clock: The monotonic clock to use, mainly for testing.
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError(
+                "The limits must satisfy 1 <= min_limit <= initial_limit <= max_limit"
+            )
+        if not 0 < backoff < 1:
+            raise ValueError("backoff must be between 0 and 1")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self.overload_status_codes = frozenset(overload_status_codes)
+        self.name = name
+        self._clock = clock
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._epoch = 0
+        self._latency: float | None = None
+        self._baseline: float | None = None
+        self._successes = 0
+        self._overloads = 0
+        self._decreases = 0
+        _register_metrics(self)
+
+    @property
+    def limit(self) -> int:
+        """The current number of calls allowed to run concurrently."""
+        return int(self._limit)
+
+    async def _acquire(self) -> ConcurrencyPermit:
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            return ConcurrencyPermit(self, self._epoch)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before the cancellation, pass it on
+                self._release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        return ConcurrencyPermit(self, self._epoch)
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
+
+    def _decrease(self, permit: ConcurrencyPermit, reason: str) -> None:
+        if permit._epoch < self._epoch:
+            # Started before the last cut, its failure is part of the same congestion event
+            return
+        self._epoch += 1
+        self._decreases += 1
+        self._limit = max(float(self.min_limit), self._limit * self.backoff)
+        logger.debug(
+            "Concurrency limit %s cut to %d (%s)", self.name, self.limit, reason
+        )
+
+    def _on_success(self, permit: ConcurrencyPermit) -> None:
+        self._successes += 1
+        latency = permit.latency
+        if latency is not None:
+            alpha = self.smoothing
+            if self._latency is None or self._baseline is None:
+                self._latency = self._baseline = latency
+            else:
+                self._latency = alpha * latency + (1 - alpha) * self._latency
+                self._baseline = (
+                    alpha / 10 * latency + (1 - alpha / 10) * self._baseline
+                )
+            if (
+                self.latency_tolerance is not None
+                and self._latency > self.latency_tolerance * self._baseline
+            ):
+                self._decrease(permit, "rising latency")
+                return
+        # Only grow a limit that is actually used
+        if self._in_flight >= self.limit or self._waiters:
+            self._limit = min(float(self.max_limit), self._limit + 1 / self._limit)
+
+    def _on_overload(self, permit: ConcurrencyPermit, reason: str) -> None:
+        self._overloads += 1
+        self._decrease(permit, reason)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[ConcurrencyPermit]:
+        """Wait for a slot and hold it for the duration of the block.
+
+        The outcome of the block adjusts the limit: success raises it, an overload status or a timeout
+        cuts it, other errors leave it unchanged.
+        """
+        permit = await self._acquire()
+        try:
+            yield permit
+        except openai.APITimeoutError:
+            self._on_overload(permit, "timeout")
+            raise
+        except openai.APIStatusError as ex:
+            if ex.status_code in self.overload_status_codes:
+                self._on_overload(permit, f"status {ex.status_code}")
+            raise
+        else:
+            permit.responded()
+            self._on_success(permit)
+        finally:
+            self._release()
+
+    def stats(self) -> AdaptiveConcurrencyStats:
+        """Get a snapshot of the limit, the queue and the counters."""
+        return AdaptiveConcurrencyStats(
+            limit=self._limit,
+            in_flight=self._in_flight,
+            queue_depth=len(self._waiters),
+            latency_ms=self._latency * 1000 if self._latency is not None else None,
+            baseline_latency_ms=self._baseline * 1000
+            if self._baseline is not None
+            else None,
+            successes=self._successes,
+            overloads=self._overloads,
+            decreases=self._decreases,
+        )
+
+
+# region Metrics
+
+_limiters: "weakref.WeakSet[AdaptiveConcurrencyLimiter]" = weakref.WeakSet()
+_metrics_lock = threading.Lock()
+_metrics_registered = False
+
+
+def _observe(
+    value: Callable[[AdaptiveConcurrencyLimiter], float],
+) -> Callable[["CallbackOptions"], Iterable["Observation"]]:
+    def callback(options: "CallbackOptions") -> Iterable["Observation"]:
+        from opentelemetry.metrics import Observation
+
+        return [
+            Observation(
+                value(limiter), {"openai.concurrency_limiter.name": limiter.name}
+            )
+            for limiter in list(_limiters)
+        ]
+
+    return callback
+
+
+def _register_metrics(limiter: AdaptiveConcurrencyLimiter) -> None:
+    """Add the limiter to the observable gauges, creating them on first use."""
+    global _metrics_registered
+    _limiters.add(limiter)
+    with _metrics_lock:
+        if _metrics_registered:
+            return
+        _metrics_registered = True
+    from agent_framework.observability import get_meter
+
+    meter = get_meter()
+    meter.create_observable_gauge(
+        "openai.client.concurrency.limit",
+        callbacks=[_observe(lambda limiter: limiter._limit)],
+        description="The current adaptive concurrency limit of OpenAI calls",
+    )
+    meter.create_observable_gauge(
+        "openai.client.concurrency.queue_depth",
+        callbacks=[_observe(lambda limiter: len(limiter._waiters))],
+        description="The number of OpenAI calls waiting for a concurrency slot",
+    )
+
+
+# endregion
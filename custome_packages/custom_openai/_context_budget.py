@@ -0,0 +1,455 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import json
+import math
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+from agent_framework._logging import get_logger
+from agent_framework._tools import AIFunction
+from agent_framework._types import (
+    BaseContent,
+    ChatMessage,
+    FunctionCallContent,
+    FunctionResultContent,
+    Role,
+    TextContent,
+    TextReasoningContent,
+)
+from agent_framework.exceptions import ServiceInvalidRequestError
+
+from ._caching import IdentityCache
+
+logger = get_logger("agent_framework.openai")
+
+__all__ = [
+    "ContextBudget",
+    "ContextBudgetStats",
+    "ContextTrim",
+    "ContextTrimStrategy",
+    "DropOldToolResultsFirst",
+    "DropOldest",
+    "KeepSystemAndLastN",
+    "estimate_tokens",
+]
+
+# The tokens of the role and separators of a message
+_MESSAGE_OVERHEAD_TOKENS = 4
+# A fixed estimate of the tokens of an image, file or other non-text content
+_MEDIA_TOKENS = 765
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens of a text, about four characters per token for English text."""
+    return math.ceil(len(text) / 4)
+
+
+def _role(message: ChatMessage) -> str:
+    return message.role.value if isinstance(message.role, Role) else message.role
+
+
+def _groups(messages: Sequence[ChatMessage], start: int = 0) -> list[range]:
+    """Split the messages into groups that are kept or dropped together.
+
+    A tool message belongs to the group of the message before it, so function calls are never
+    sent without their results, or results without their calls.
+    """
+    groups: list[range] = []
+    for index in range(start, len(messages)):
+        if groups and _role(messages[index]) == "tool":
+            groups[-1] = range(groups[-1].start, index + 1)
+        else:
+            groups.append(range(index, index + 1))
+    return groups
+
+
+def _pinned(messages: Sequence[ChatMessage]) -> int:
+    """The number of leading system messages, the instructions, which are never trimmed."""
+    count = 0
+    while count < len(messages) and _role(messages[count]) in ("system", "developer"):
+        count += 1
+    return count
+
+
+class ContextTrimStrategy(ABC):
+    """Chooses the messages to send when a conversation does not fit the context budget.
+
+    Implement it to pack the context in another way, for example by summarizing old turns.
+    """
+
+    @abstractmethod
+    def trim(
+        self,
+        messages: list[ChatMessage],
+        budget: int,
+        count: Callable[[ChatMessage], int],
+    ) -> list[ChatMessage]:
+        """Get the messages to send, using at most budget tokens when possible.
+
+        Args:
+            messages: The messages of the request, oldest first. Do not change them.
+            budget: The number of tokens the messages may use.
+            count: Counts the tokens of a message, cached per message.
+
+        Returns:
+            The messages to send, the originals or shorter replacements of them.
+        """
+
+
+class DropOldest(ContextTrimStrategy):
+    """Drops the oldest messages, after the instructions, until the conversation fits.
+
+    The last message and its tool results are always kept.
+    """
+
+    def trim(
+        self,
+        messages: list[ChatMessage],
+        budget: int,
+        count: Callable[[ChatMessage], int],
+    ) -> list[ChatMessage]:
+        pinned = _pinned(messages)
+        total = sum(map(count, messages[:pinned]))
+        # Keep the newest groups that fit, walking back from the last message
+        start = len(messages)
+        group = 0
+        for index in range(len(messages) - 1, pinned - 1, -1):
+            group += count(messages[index])
+            if index > pinned and _role(messages[index]) == "tool":
+                continue
+            if total + group > budget and start < len(messages):
+                break
+            total += group
+            group = 0
+            start = index
+        if start == pinned:
+            return messages
+        return messages[:pinned] + messages[start:]
+
+
+class KeepSystemAndLastN(ContextTrimStrategy):
+    """Keeps the system messages and the last messages of the conversation.
+
+    When the kept messages still do not fit, the then strategy trims them further.
+    """
+
+    def __init__(self, last: int, *, then: ContextTrimStrategy | None = None) -> None:
+        """Initialize a KeepSystemAndLastN.
+
+        Args:
+            last: The number of most recent messages to keep, extended to include the
+                function calls of the tool results among them.
+
+        Keyword Args:
+            then: The strategy applied to the kept messages when they do not fit, DropOldest by default.
+        """
+        if last < 1:
+            raise ValueError("last must be at least 1")
+        self.last = last
+        self.then = then or DropOldest()
+
+    def trim(
+        self,
+        messages: list[ChatMessage],
+        budget: int,
+        count: Callable[[ChatMessage], int],
+    ) -> list[ChatMessage]:
+        start = max(len(messages) - self.last, 0)
+        while start > 0 and _role(messages[start]) == "tool":
+            start -= 1
+        kept = [
+            message
+            for message in messages[:start]
+            if _role(message) in ("system", "developer")
+        ] + messages[start:]
+        if sum(map(count, kept)) > budget:
+            return self.then.trim(kept, budget, count)
+        return kept
+
+
+class DropOldToolResultsFirst(ContextTrimStrategy):
+    """Replaces the results of old function calls with a short placeholder, oldest first.
+
+    Tool results, like search hits or file contents, are often the largest and least relevant part of
+    old turns. The calls stay in the conversation, so the model still sees which tools it used. The
+    tool results of the last message are kept, and when the conversation still does not fit, the then
+    strategy trims it further. The replacements are reused for as long as the originals live, so the
+    trimmed turns stay identical across requests.
+    """
+
+    def __init__(
+        self,
+        *,
+        placeholder: str = "[result removed to fit the context window]",
+        then: ContextTrimStrategy | None = None,
+    ) -> None:
+        """Initialize a DropOldToolResultsFirst.
+
+        Keyword Args:
+            placeholder: The result sent instead of a removed one.
+            then: The strategy applied when the conversation still does not fit, DropOldest by default.
+        """
+        self.placeholder = placeholder
+        self.then = then or DropOldest()
+        self._replacements: IdentityCache[ChatMessage] = IdentityCache()
+
+    def _replacement(self, message: ChatMessage) -> ChatMessage:
+        return self._replacements.get_or_create(
+            message,
+            tuple(map(id, message.contents)),
+            lambda: ChatMessage(
+                role=message.role,
+                contents=[
+                    FunctionResultContent(
+                        call_id=content.call_id, result=self.placeholder
+                    )
+                    if isinstance(content, FunctionResultContent)
+                    else content
+                    for content in message.contents
+                ],
+                author_name=message.author_name,
+                message_id=message.message_id,
+            ),
+        )
+
+    def trim(
+        self,
+        messages: list[ChatMessage],
+        budget: int,
+        count: Callable[[ChatMessage], int],
+    ) -> list[ChatMessage]:
+        groups = _groups(messages, _pinned(messages))
+        total = sum(map(count, messages))
+        trimmed = list(messages)
+        for group in groups[:-1]:
+            if total <= budget:
+                break
+            for index in group:
+                message = messages[index]
+                if _role(message) != "tool":
+                    continue
+                trimmed[index] = self._replacement(message)
+                total += count(trimmed[index]) - count(message)
+        if total > budget:
+            return self.then.trim(trimmed, budget, count)
+        return trimmed
+
+
+@dataclass
+class ContextTrim:
+    """What a context budget trimmed from a request.
+
+    Attributes:
+        tokens_before: The estimated tokens of the messages and tools of the request.
+        tokens_after: The estimated tokens after trimming.
+        trimmed: The original messages that were not sent as they were, dropped or replaced.
+        replacements: The shorter messages sent instead of some of the trimmed ones.
+    """
+
+    tokens_before: int
+    tokens_after: int
+    trimmed: list[ChatMessage] = field(default_factory=list)
+    replacements: list[ChatMessage] = field(default_factory=list)
+
+
+@dataclass
+class ContextBudgetStats:
+    """Counters of a context budget.
+
+    Attributes:
+        requests: The number of requests checked against the budget.
+        trimmed_requests: The number of requests that had to be trimmed.
+        trimmed_messages: The number of messages dropped or replaced.
+        trimmed_tokens: The estimated number of tokens trimmed.
+        rejected_requests: The number of requests that did not fit even after trimming.
+        count_hits: The number of message token counts reused from previous requests.
+        count_misses: The number of messages whose tokens were counted.
+    """
+
+    requests: int = 0
+    trimmed_requests: int = 0
+    trimmed_messages: int = 0
+    trimmed_tokens: int = 0
+    rejected_requests: int = 0
+    count_hits: int = 0
+    count_misses: int = 0
+
+
+class ContextBudget:
+    """Keeps the requests of a client within a token budget before they are sent.
+
+    The tokens of every message are counted once, when it is first sent, and cached for as long as the
+    message lives, so a long thread only counts its new messages on each turn. The tool specs are
+    counted in the same way. When the messages and tools exceed the budget, the strategy trims the
+    messages, the instructions (the leading system messages) are kept. When they still do not fit,
+    a ServiceInvalidRequestError is raised without a round-trip to the service.
+
+    The default counter estimates four characters per token. Pass an exact one, for example
+    ``token_counter=lambda text: len(tiktoken.encoding_for_model("gpt-4o").encode(text))``
+    with the encoding created once, when the budget is close to the context window.
+
+    Examples:
+        .. code-block:: python
+
+            from custom_openai import ContextBudget, DropOldToolResultsFirst, OpenAIChatClient
+
+            budget = ContextBudget(
+                120_000,
+                strategy=DropOldToolResultsFirst(),
+                on_trim=lambda trim: print(f"trimmed {len(trim.trimmed)} messages"),
+            )
+            client = OpenAIChatClient(model_id="gpt-4o", context_budget=budget)
+    """
+
+    def __init__(
+        self,
+        max_input_tokens: int,
+        *,
+        strategy: ContextTrimStrategy | None = None,
+        token_counter: Callable[[str], int] | None = None,
+        on_trim: Callable[[ContextTrim], None] | None = None,
+    ) -> None:
+        """Initialize a ContextBudget.
+
+        Args:
+            max_input_tokens: The number of tokens the messages and tools of a request may use, the
+                context window of the model minus the tokens reserved for the output.
+
+        Keyword Args:
+            strategy: Chooses the messages to send when a request does not fit, DropOldest by default.
+            token_counter: Counts the tokens of a text, estimate_tokens by default.
+            on_trim: Called with what was trimmed, whenever a request is trimmed.
+        """
+        if max_input_tokens < 1:
+            raise ValueError("max_input_tokens must be at least 1")
+        self.max_input_tokens = max_input_tokens
+        self.strategy = strategy or DropOldest()
+        self.token_counter = token_counter or estimate_tokens
+        self.on_trim = on_trim
+        self._message_tokens: IdentityCache[int] = IdentityCache()
+        self._tool_tokens: IdentityCache[int] = IdentityCache()
+        self._stats = ContextBudgetStats()
+
+    def count_message(self, message: ChatMessage) -> int:
+        """Count the tokens of a message, cached for as long as the message and its contents are unchanged."""
+        return self._message_tokens.get_or_create(
+            message,
+            tuple(map(id, message.contents)),
+            lambda: self._count_message(message),
+        )
+
+    def _count_message(self, message: ChatMessage) -> int:
+        tokens = _MESSAGE_OVERHEAD_TOKENS
+        for content in message.contents:
+            if isinstance(content, TextContent):
+                tokens += self.token_counter(content.text)
+            elif isinstance(content, TextReasoningContent):
+                # Reasoning is not sent back to the model
+                continue
+            elif isinstance(content, FunctionCallContent):
+                arguments = content.arguments
+                if not isinstance(arguments, str):
+                    arguments = json.dumps(arguments, default=str)
+                tokens += self.token_counter(f"{content.name}{arguments}")
+            elif isinstance(content, FunctionResultContent):
+                result = content.result
+                if not isinstance(result, str):
+                    result = json.dumps(result, default=str)
+                tokens += self.token_counter(result)
+            elif isinstance(content, BaseContent):
+                tokens += _MEDIA_TOKENS
+        return tokens
+
+    def count_tools(self, tools: Sequence[Any] | None) -> int:
+        """Count the tokens of the specs of the tools, function tools are counted once."""
+        tokens = 0
+        for tool in tools or ():
+            if isinstance(tool, AIFunction):
+                tokens += self._tool_tokens.get_or_create(
+                    tool,
+                    (tool.name, tool.description, tool.input_model),
+                    lambda tool=tool: self.token_counter(  # type: ignore[misc]
+                        json.dumps(tool.to_json_schema_spec())
+                    ),
+                )
+            else:
+                tokens += self.token_counter(json.dumps(tool, default=repr))
+        return tokens
+
+    def fit(
+        self, messages: Sequence[ChatMessage], tools: Sequence[Any] | None = None
+    ) -> list[ChatMessage]:
+        """Get the messages of a request trimmed to the budget.
+
+        Args:
+            messages: The messages of the request, they are not changed.
+            tools: The tools of the request, their specs count against the budget.
+
+        Returns:
+            The messages to send.
+
+        Raises:
+            ServiceInvalidRequestError: The request does not fit the budget, even after trimming.
+        """
+        self._stats.requests += 1
+        messages = list(messages)
+        tool_tokens = self.count_tools(tools)
+        # The strategy counts the messages again, look them up once per request
+        counts = {id(message): self.count_message(message) for message in messages}
+
+        def count(message: ChatMessage) -> int:
+            tokens = counts.get(id(message))
+            if tokens is None:
+                tokens = counts[id(message)] = self.count_message(message)
+            return tokens
+
+        before = tool_tokens + sum(counts.values())
+        if before <= self.max_input_tokens:
+            return messages
+        fitted = self.strategy.trim(
+            messages, self.max_input_tokens - tool_tokens, count
+        )
+        after = tool_tokens + sum(map(count, fitted))
+        if after > self.max_input_tokens:
+            self._stats.rejected_requests += 1
+            raise ServiceInvalidRequestError(
+                f"The request needs about {after} tokens, more than the context budget of "
+                f"{self.max_input_tokens} tokens, even after trimming it from {before} tokens"
+            )
+        sent = {id(message) for message in fitted}
+        originals = {id(message) for message in messages}
+        trim = ContextTrim(
+            tokens_before=before,
+            tokens_after=after,
+            trimmed=[message for message in messages if id(message) not in sent],
+            replacements=[
+                message for message in fitted if id(message) not in originals
+            ],
+        )
+        self._stats.trimmed_requests += 1
+        self._stats.trimmed_messages += len(trim.trimmed)
+        self._stats.trimmed_tokens += before - after
+        logger.debug(
+            "Trimmed %d messages to fit the context budget, %d -> %d of %d tokens",
+            len(trim.trimmed),
+            before,
+            after,
+            self.max_input_tokens,
+        )
+        if self.on_trim is not None:
+            self.on_trim(trim)
+        return fitted
+
+    def stats(self) -> ContextBudgetStats:
+        """Get a snapshot of the counters."""
+        return ContextBudgetStats(
+            requests=self._stats.requests,
+            trimmed_requests=self._stats.trimmed_requests,
+            trimmed_messages=self._stats.trimmed_messages,
+            trimmed_tokens=self._stats.trimmed_tokens,
+            rejected_requests=self._stats.rejected_requests,
+            count_hits=self._message_tokens.hits,
+            count_misses=self._message_tokens.misses,
+        )
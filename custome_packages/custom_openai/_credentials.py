@@ -0,0 +1,140 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import asyncio
+import inspect
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from agent_framework._logging import get_logger
+
+logger = get_logger("agent_framework.openai")
+
+__all__ = ["CachedApiKeyProvider", "CachedApiKeyStats"]
+
+
+@dataclass
+class CachedApiKeyStats:
+    """Counters of a CachedApiKeyProvider.
+
+    Attributes:
+        hits: The number of calls served from the cached key.
+        misses: The number of calls that had to wait for a new key.
+        refreshes: The number of times the wrapped callable was called.
+        refresh_failures: The number of calls of the wrapped callable that raised.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    refreshes: int = 0
+    refresh_failures: int = 0
+
+
+class CachedApiKeyProvider:
+    """Caches the result of a callable API key, refreshing it in the background before it expires.
+
+    The OpenAI SDK calls a callable API key before every request. Wrapping a token broker call in this
+    provider keeps that lookup off the request path: the key is cached for ``ttl`` seconds, a background
+    refresh is started once fewer than ``refresh_ahead`` seconds are left, and concurrent callers
+    share a single in-flight refresh.
+
+    Examples:
+        .. code-block:: python
+
+            from custom_openai import CachedApiKeyProvider, OpenAIChatClient
+
+
+            async def get_token() -> str:
+                return await broker.fetch_token()
+
+
+            client = OpenAIChatClient(
+                model_id="gpt-4o",
+                api_key=CachedApiKeyProvider(get_token, ttl=600, refresh_ahead=60),
+            )
+    """
+
+    def __init__(
+        self,
+        get_api_key: Callable[[], str | Awaitable[str]],
+        *,
+        ttl: float = 300.0,
+        refresh_ahead: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize a CachedApiKeyProvider.
+
+        Args:
+            get_api_key: The callable returning the API key, sync or async.
+
+        Keyword Args:
+            ttl: The number of seconds a key is used for.
+            refresh_ahead: The number of seconds before expiry a background refresh is started.
+                Must be smaller than ttl.
+            clock: The monotonic clock to use, mainly for testing.
+        """
+        if ttl <= 0:
+            raise ValueError("ttl must be positive")
+        if not 0 <= refresh_ahead < ttl:
+            raise ValueError("refresh_ahead must be between 0 and ttl")
+        self._get_api_key = get_api_key
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self._clock = clock
+        self._api_key: str | None = None
+        self._expires_at = 0.0
+        self._refresh_task: asyncio.Task[str] | None = None
+        self._stats = CachedApiKeyStats()
+
+    async def __call__(self) -> str:
+        """Get the API key, from the cache when it has not expired."""
+        now = self._clock()
+        if self._api_key is not None and now < self._expires_at:
+            self._stats.hits += 1
+            if now >= self._expires_at - self.refresh_ahead:
+                self._start_refresh()
+            return self._api_key
+        self._stats.misses += 1
+        # Shield the shared refresh, so one cancelled caller does not cancel it for everyone
+        return await asyncio.shield(self._start_refresh())
+
+    def _start_refresh(self) -> "asyncio.Task[str]":
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.get_running_loop().create_task(self._refresh())
+        return self._refresh_task
+
+    async def _refresh(self) -> str:
+        self._stats.refreshes += 1
+        try:
+            api_key = self._get_api_key()
+            if inspect.isawaitable(api_key):
+                api_key = await api_key
+        except Exception:
+            self._stats.refresh_failures += 1
+            if self._api_key is not None and self._clock() < self._expires_at:
+                # Keep serving the current key, the next call will retry the refresh
+                logger.warning(
+                    "Refreshing the API key failed, using the cached key.",
+                    exc_info=True,
+                )
+                return self._api_key
+            raise
+        finally:
+            self._refresh_task = None
+        self._api_key = api_key
+        self._expires_at = self._clock() + self.ttl
+        return api_key
+
+    def invalidate(self) -> None:
+        """Drop the cached key, so the next call fetches a new one."""
+        self._api_key = None
+        self._expires_at = 0.0
+
+    def stats(self) -> CachedApiKeyStats:
+        """Get a snapshot of the cache counters."""
+        return CachedApiKeyStats(
+            hits=self._stats.hits,
+            misses=self._stats.misses,
+            refreshes=self._stats.refreshes,
+            refresh_failures=self._stats.refresh_failures,
+        )
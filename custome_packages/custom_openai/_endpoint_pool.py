@@ -0,0 +1,412 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import time
+from collections.abc import AsyncIterator, Callable, Collection, Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import cast
+
+import httpx
+
+from agent_framework._logging import get_logger
+from agent_framework.exceptions import ServiceInitializationError
+
+logger = get_logger("agent_framework.openai")
+
+__all__ = ["OpenAIEndpoint", "OpenAIEndpointPool", "OpenAIEndpointStats"]
+
+DEFAULT_FAILOVER_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+@dataclass
+class OpenAIEndpoint:
+    """An OpenAI compatible endpoint that serves the same models as the others in a pool.
+
+    Attributes:
+        base_url: The base URL of the endpoint, for example ``https://eu.gateway.example.com/v1``.
+        api_key: The API key for this endpoint, when it differs from the client's API key.
+        headers: Additional headers sent to this endpoint only.
+    """
+
+    base_url: str
+    api_key: str | None = None
+    headers: Mapping[str, str] | None = None
+
+
+@dataclass
+class OpenAIEndpointStats:
+    """A snapshot of the health of an endpoint in an OpenAIEndpointPool.
+
+    Attributes:
+        base_url: The base URL of the endpoint.
+        state: ``healthy``, ``ejected`` or ``probing``.
+        latency_ms: The EWMA of the time to response headers, None before the first response.
+        error_rate: The EWMA of the failure rate, between 0 and 1.
+        in_flight: The number of requests currently sent to the endpoint.
+        requests: The total number of requests sent to the endpoint.
+        failures: The total number of failed requests.
+        ejections: The number of consecutive times the endpoint was ejected.
+    """
+
+    base_url: str
+    state: str
+    latency_ms: float | None
+    error_rate: float
+    in_flight: int
+    requests: int
+    failures: int
+    ejections: int
+
+
+@dataclass(eq=False)
+class _EndpointState:
+    endpoint: OpenAIEndpoint
+    url: httpx.URL
+    latency: float | None = None
+    error_rate: float = 0.0
+    in_flight: int = 0
+    requests: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    ejections: int = 0
+    ejected_until: float = 0.0
+    probing: bool = False
+    extra_headers: dict[str, str] = field(default_factory=dict)
+
+
+class _TrackedByteStream(httpx.AsyncByteStream):
+    """Reports the outcome of a streamed response body back to the pool."""
+
+    def __init__(
+        self,
+        stream: httpx.AsyncByteStream,
+        on_close: Callable[[bool], None],
+    ) -> None:
+        self._stream = stream
+        self._on_close: Callable[[bool], None] | None = on_close
+        self._failed = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        except Exception:
+            self._failed = True
+            raise
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._on_close is not None:
+                on_close, self._on_close = self._on_close, None
+                on_close(self._failed)
+
+
+class OpenAIEndpointPool:
+    """Balances requests over several endpoints serving the same models.
+
+    Every request goes to the endpoint with the lowest score, computed from the EWMA of its latency
+    (time to response headers), its in-flight requests and the EWMA of its error rate.
+    An endpoint is ejected after ``eject_after`` consecutive failures and gets a single probe request
+    once the ejection period is over; the ejection period doubles each time the probe fails.
+
+    Connection errors, and responses with a status in ``failover_status_codes``, are retried on the
+    next best endpoint. This happens before the response is handed to the OpenAI SDK, so a streaming
+    call never fails over after tokens have been received.
+
+    Examples:
+        .. code-block:: python
+
+            from custom_openai import OpenAIChatClient, OpenAIEndpoint, OpenAIEndpointPool
+
+            pool = OpenAIEndpointPool([
+                "https://eu.gateway.example.com/v1",
+                OpenAIEndpoint("https://us.gateway.example.com/v1", api_key="sk-us-..."),
+            ])
+            client = OpenAIChatClient(model_id="gpt-4o", api_key="sk-...", endpoint_pool=pool)
+            print(pool.stats())
+    """
+
+    def __init__(
+        self,
+        endpoints: Sequence[OpenAIEndpoint | str],
+        *,
+        transport: httpx.AsyncBaseTransport | None = None,
+        smoothing: float = 0.3,
+        error_penalty: float = 10.0,
+        eject_after: int = 3,
+        ejection_duration: float = 10.0,
+        max_ejection_duration: float = 300.0,
+        failover_status_codes: Collection[int] = DEFAULT_FAILOVER_STATUS_CODES,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize an OpenAIEndpointPool.
+
+        Args:
+            endpoints: The endpoints, or their base URLs. The first one is used as the client's base URL.
+
+        Keyword Args:
+            transport: The transport used to send the requests, for example an HTTP2MultiplexTransport.
+                Defaults to a new ``httpx.AsyncHTTPTransport``.
+            smoothing: The weight of the newest sample in the latency and error rate EWMAs.
+            error_penalty: How strongly the error rate increases an endpoint's score.
+            eject_after: The number of consecutive failures after which an endpoint is ejected.
+            ejection_duration: The number of seconds an endpoint is ejected the first time.
+            max_ejection_duration: The upper bound of the doubling ejection period.
+            failover_status_codes: The response status codes that are retried on another endpoint.
+            clock: The monotonic clock to use, mainly for testing.
+        """
+        if not endpoints:
+            raise ServiceInitializationError(
+                "An endpoint pool needs at least one endpoint."
+            )
+        if not 0 < smoothing <= 1:
+            raise ServiceInitializationError("smoothing must be in (0, 1].")
+        self._states = [
+            self._create_state(
+                endpoint
+                if isinstance(endpoint, OpenAIEndpoint)
+                else OpenAIEndpoint(endpoint)
+            )
+            for endpoint in endpoints
+        ]
+        self._transport = transport or httpx.AsyncHTTPTransport()
+        self.smoothing = smoothing
+        self.error_penalty = error_penalty
+        self.eject_after = eject_after
+        self.ejection_duration = ejection_duration
+        self.max_ejection_duration = max_ejection_duration
+        self.failover_status_codes = frozenset(failover_status_codes)
+        self._clock = clock
+
+    @staticmethod
+    def _create_state(endpoint: OpenAIEndpoint) -> _EndpointState:
+        url = httpx.URL(endpoint.base_url)
+        if not url.raw_path.endswith(b"/"):
+            url = url.copy_with(raw_path=url.raw_path + b"/")
+        extra_headers = dict(endpoint.headers or {})
+        if endpoint.api_key:
+            extra_headers["Authorization"] = f"Bearer {endpoint.api_key}"
+        return _EndpointState(endpoint=endpoint, url=url, extra_headers=extra_headers)
+
+    @property
+    def primary_base_url(self) -> str:
+        """The base URL clients using this pool are configured with."""
+        return str(self._states[0].url)
+
+    @property
+    def primary_api_key(self) -> str | None:
+        """The API key of the first endpoint that has one."""
+        return next(
+            (s.endpoint.api_key for s in self._states if s.endpoint.api_key), None
+        )
+
+    # region Selection
+
+    def _is_available(self, state: _EndpointState, now: float) -> bool:
+        if state.ejected_until <= now:
+            # An ejected endpoint only gets one probe request at a time
+            return not state.probing
+        return False
+
+    def _score(self, state: _EndpointState) -> float:
+        # Unknown endpoints get a zero latency, so they are tried early
+        latency = state.latency or 0.0
+        return (
+            (latency + 1e-3)
+            * (state.in_flight + 1)
+            * (1 + self.error_penalty * state.error_rate)
+        )
+
+    def _select(self, tried: Collection[_EndpointState]) -> _EndpointState | None:
+        now = self._clock()
+        candidates = [
+            s for s in self._states if s not in tried and self._is_available(s, now)
+        ]
+        if not candidates:
+            if tried:
+                return None
+            # Everything is ejected: rather try the endpoint that comes back first than fail outright
+            return min(self._states, key=lambda s: s.ejected_until)
+        return min(candidates, key=self._score)
+
+    def _claim(self, state: _EndpointState) -> None:
+        if state.ejections:
+            state.probing = True
+        state.in_flight += 1
+        state.requests += 1
+
+    # endregion
+
+    # region Health
+
+    def _record_success(self, state: _EndpointState, latency: float | None) -> None:
+        alpha = self.smoothing
+        if latency is not None:
+            state.latency = (
+                latency
+                if state.latency is None
+                else alpha * latency + (1 - alpha) * state.latency
+            )
+        state.error_rate *= 1 - alpha
+        state.consecutive_failures = 0
+        if state.probing:
+            logger.info("Endpoint %s is healthy again", state.url)
+            state.probing = False
+            state.ejections = 0
+
+    def _record_failure(self, state: _EndpointState) -> None:
+        alpha = self.smoothing
+        state.error_rate = alpha + (1 - alpha) * state.error_rate
+        state.failures += 1
+        if state.ejected_until > self._clock():
+            # A request sent before the ejection failed as well, do not extend the ejection for it
+            return
+        state.consecutive_failures += 1
+        if state.probing or state.consecutive_failures >= self.eject_after:
+            duration = min(
+                self.ejection_duration * 2**state.ejections,
+                self.max_ejection_duration,
+            )
+            state.ejections += 1
+            state.ejected_until = self._clock() + duration
+            state.probing = False
+            state.consecutive_failures = 0
+            logger.warning("Ejected endpoint %s for %.1f seconds", state.url, duration)
+
+    def _finish(self, state: _EndpointState, failed: bool) -> None:
+        state.in_flight -= 1
+        if failed:
+            self._record_failure(state)
+
+    # endregion
+
+    def _rewrite(
+        self, request: httpx.Request, base_path: bytes, state: _EndpointState
+    ) -> httpx.Request:
+        raw_path = request.url.raw_path
+        relative = (
+            raw_path[len(base_path) :]
+            if raw_path.startswith(base_path)
+            else raw_path.lstrip(b"/")
+        )
+        headers = httpx.Headers(request.headers)
+        del headers["host"]
+        headers.update(state.extra_headers)
+        return httpx.Request(
+            request.method,
+            state.url.copy_with(raw_path=state.url.raw_path + relative),
+            headers=headers,
+            content=request.content,
+            extensions=request.extensions,
+        )
+
+    async def send(self, request: httpx.Request, base_path: bytes) -> httpx.Response:
+        """Send a request to the best endpoint, failing over to the others before any data is returned.
+
+        Args:
+            request: The request, addressed to the primary base URL.
+            base_path: The path of the primary base URL, replaced by the path of the chosen endpoint.
+
+        Returns:
+            The response of the first endpoint that did not fail.
+        """
+        await request.aread()
+        tried: list[_EndpointState] = []
+        last_error: httpx.TransportError | None = None
+        while (state := self._select(tried)) is not None:
+            tried.append(state)
+            self._claim(state)
+            started = self._clock()
+            try:
+                response = await self._transport.handle_async_request(
+                    self._rewrite(request, base_path, state)
+                )
+            except httpx.TransportError as ex:
+                self._finish(state, failed=True)
+                logger.warning(
+                    "Request to endpoint %s failed, failing over: %s", state.url, ex
+                )
+                last_error = ex
+                continue
+            if (
+                response.status_code in self.failover_status_codes
+                and self._select(tried) is not None
+            ):
+                await response.aclose()
+                self._finish(state, failed=True)
+                logger.warning(
+                    "Endpoint %s returned %d, failing over",
+                    state.url,
+                    response.status_code,
+                )
+                continue
+            failed_status = response.status_code in self.failover_status_codes
+            if not failed_status:
+                self._record_success(state, self._clock() - started)
+
+            def on_close(
+                stream_failed: bool,
+                state: _EndpointState = state,
+                failed_status: bool = failed_status,
+            ) -> None:
+                self._finish(state, failed=stream_failed or failed_status)
+
+            return httpx.Response(
+                status_code=response.status_code,
+                headers=response.headers,
+                stream=_TrackedByteStream(
+                    cast(httpx.AsyncByteStream, response.stream), on_close
+                ),
+                extensions=response.extensions,
+            )
+        if last_error is not None:
+            raise last_error
+        raise httpx.ConnectError("No endpoint available", request=request)
+
+    def create_transport(self, base_url: str | None = None) -> httpx.AsyncBaseTransport:
+        """Create an httpx transport that sends the requests of one client through this pool.
+
+        Closing the transport does not close the pool, so several clients can share one pool.
+
+        Args:
+            base_url: The base URL the client is configured with, defaults to the primary base URL.
+        """
+        return _EndpointPoolTransport(
+            self, httpx.URL(base_url or self.primary_base_url)
+        )
+
+    def stats(self) -> list[OpenAIEndpointStats]:
+        """Get a snapshot of the health of every endpoint."""
+        now = self._clock()
+        return [
+            OpenAIEndpointStats(
+                base_url=str(state.url),
+                state="probing"
+                if state.probing
+                else "ejected"
+                if state.ejected_until > now
+                else "healthy",
+                latency_ms=state.latency * 1000 if state.latency is not None else None,
+                error_rate=state.error_rate,
+                in_flight=state.in_flight,
+                requests=state.requests,
+                failures=state.failures,
+                ejections=state.ejections,
+            )
+            for state in self._states
+        ]
+
+    async def aclose(self) -> None:
+        """Close the underlying transport."""
+        await self._transport.aclose()
+
+
+class _EndpointPoolTransport(httpx.AsyncBaseTransport):
+    def __init__(self, pool: OpenAIEndpointPool, base_url: httpx.URL) -> None:
+        self._pool = pool
+        base_path = base_url.raw_path
+        self._base_path = base_path if base_path.endswith(b"/") else base_path + b"/"
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._pool.send(request, self._base_path)
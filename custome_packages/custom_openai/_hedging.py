@@ -0,0 +1,205 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import asyncio
+import math
+from collections import deque
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from agent_framework._logging import get_logger
+
+logger = get_logger("agent_framework.openai")
+
+__all__ = ["HedgingPolicy", "HedgingStats"]
+
+TResult = TypeVar("TResult")
+
+# The percentile is recomputed every this many samples instead of on every call
+_UPDATE_EVERY = 16
+
+
+@dataclass
+class HedgingStats:
+    """Counters of a HedgingPolicy.
+
+    Attributes:
+        requests: The number of calls that went through the policy.
+        hedged: The number of calls for which a second attempt was started.
+        hedge_wins: The number of hedged calls the second attempt finished first.
+        budget_exhausted: The number of calls past the deadline that were not hedged because of the budget.
+        not_eligible: The number of calls sent once without the policy, because a second attempt would
+            store a second response or continue the conversation twice.
+        delay: The current hedging deadline in seconds.
+    """
+
+    requests: int = 0
+    hedged: int = 0
+    hedge_wins: int = 0
+    budget_exhausted: int = 0
+    not_eligible: int = 0
+    delay: float = 0.0
+
+    @property
+    def hedge_rate(self) -> float:
+        """The fraction of calls that were hedged."""
+        return self.hedged / self.requests if self.requests else 0.0
+
+    @property
+    def win_rate(self) -> float:
+        """The fraction of hedged calls won by the second attempt."""
+        return self.hedge_wins / self.hedged if self.hedged else 0.0
+
+
+class HedgingPolicy:
+    """Cuts the tail latency of non-streaming calls by sending a second attempt when the first is slow.
+
+    When the first attempt has not completed after the ``percentile`` latency of recent calls, a second
+    attempt is started. The first attempt to succeed wins and the other one is cancelled. At most
+    ``budget`` of the calls are hedged, so a slow service does not get twice the load. Calls that
+    store the response or continue a conversation on the service are never hedged.
+
+    Examples:
+        .. code-block:: python
+
+            from custom_openai import HedgingPolicy, OpenAIChatClient
+
+            hedging = HedgingPolicy(percentile=95, budget=0.05)
+            client = OpenAIChatClient(model_id="gpt-4o-mini", hedging=hedging)
+            ...
+            print(hedging.stats().hedge_rate, hedging.stats().win_rate)
+    """
+
+    def __init__(
+        self,
+        *,
+        percentile: float = 95.0,
+        budget: float = 0.1,
+        initial_delay: float = 2.0,
+        min_delay: float = 0.0,
+        window: int = 1000,
+        min_samples: int = 20,
+    ) -> None:
+        """Initialize a HedgingPolicy.
+
+        Keyword Args:
+            percentile: The latency percentile of recent calls after which a second attempt is sent.
+            budget: The maximum fraction of calls that are hedged.
+            initial_delay: The deadline in seconds used until min_samples latencies were recorded.
+            min_delay: The lower bound of the deadline in seconds.
+            window: The number of recent latencies the percentile is computed over.
+            min_samples: The number of latencies needed before the percentile is used.
+        """
+        if not 0 < percentile < 100:
+            raise ValueError("percentile must be between 0 and 100")
+        if not 0 <= budget <= 1:
+            raise ValueError("budget must be between 0 and 1")
+        self.percentile = percentile
+        self.budget = budget
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._delay = initial_delay
+        self._samples_since_update = _UPDATE_EVERY
+        self._stats = HedgingStats(delay=initial_delay)
+
+    def delay(self) -> float:
+        """The number of seconds after which a second attempt is sent."""
+        if len(self._latencies) < self.min_samples:
+            return self.initial_delay
+        if self._samples_since_update >= _UPDATE_EVERY:
+            ordered = sorted(self._latencies)
+            index = min(
+                len(ordered) - 1, math.ceil(len(ordered) * self.percentile / 100) - 1
+            )
+            self._delay = max(self.min_delay, ordered[index])
+            self._samples_since_update = 0
+        return self._delay
+
+    def _record(self, latency: float) -> None:
+        self._latencies.append(latency)
+        self._samples_since_update += 1
+
+    def eligible(self, options_dict: Mapping[str, Any]) -> bool:
+        """Whether a prepared request may be sent twice, counting the ones that may not.
+
+        Args:
+            options_dict: The prepared options of the request, as sent to the service.
+        """
+        if (
+            options_dict.get("store")
+            or options_dict.get("previous_response_id")
+            or options_dict.get("conversation")
+        ):
+            self._stats.not_eligible += 1
+            return False
+        return True
+
+    def _may_hedge(self) -> bool:
+        # Counts the call about to be hedged, so the budget is never exceeded
+        return self._stats.hedged + 1 <= self.budget * self._stats.requests
+
+    async def run(self, attempt: Callable[[], Awaitable[TResult]]) -> TResult:
+        """Run a call, sending a second attempt when the first one misses the deadline.
+
+        Args:
+            attempt: Starts one attempt of the call, it is called a second time to hedge.
+
+        Returns:
+            The result of the first attempt to succeed.
+        """
+        loop = asyncio.get_running_loop()
+        self._stats.requests += 1
+        started = loop.time()
+        primary = asyncio.ensure_future(attempt())
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.delay())
+        except BaseException:
+            primary.cancel()
+            raise
+        if done:
+            result = primary.result()
+            self._record(loop.time() - started)
+            return result
+        if not self._may_hedge():
+            self._stats.budget_exhausted += 1
+            result = await primary
+            self._record(loop.time() - started)
+            return result
+
+        self._stats.hedged += 1
+        logger.debug("Hedging a call after %.3f seconds", loop.time() - started)
+        hedge = asyncio.ensure_future(attempt())
+        pending = {primary, hedge}
+        error: BaseException | None = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._stats.hedge_wins += 1
+                        self._record(loop.time() - started)
+                        return task.result()
+                    # Keep waiting for the other attempt, it may still succeed
+                    error = error or task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise error  # type: ignore[misc]
+
+    def stats(self) -> HedgingStats:
+        """Get a snapshot of the counters and the current deadline."""
+        return HedgingStats(
+            requests=self._stats.requests,
+            hedged=self._stats.hedged,
+            hedge_wins=self._stats.hedge_wins,
+            budget_exhausted=self._stats.budget_exhausted,
+            not_eligible=self._stats.not_eligible,
+            delay=self._delay
+            if len(self._latencies) >= self.min_samples
+            else self.initial_delay,
+        )
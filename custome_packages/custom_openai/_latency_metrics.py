@@ -0,0 +1,533 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import asyncio
+import threading
+import time
+from bisect import bisect_right
+from collections.abc import AsyncIterable, Awaitable, Iterator, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, TypeVar
+
+from agent_framework import observability
+from agent_framework._types import (
+    ChatResponse,
+    ChatResponseUpdate,
+    UsageContent,
+    UsageDetails,
+)
+
+if TYPE_CHECKING:
+    from opentelemetry.metrics import Histogram
+
+__all__ = ["BucketHistogram", "LatencyMetrics", "LatencyStats", "RequestTiming"]
+
+TResponse = TypeVar("TResponse", bound=ChatResponse)
+
+DEFAULT_TTFT_BUCKETS: tuple[float, ...] = (
+    0.05,
+    0.1,
+    0.2,
+    0.3,
+    0.5,
+    0.75,
+    1.0,
+    1.5,
+    2.0,
+    3.0,
+    5.0,
+    10.0,
+    20.0,
+    40.0,
+)
+DEFAULT_GAP_BUCKETS: tuple[float, ...] = (
+    0.001,
+    0.002,
+    0.005,
+    0.01,
+    0.02,
+    0.03,
+    0.05,
+    0.075,
+    0.1,
+    0.2,
+    0.5,
+    1.0,
+    2.0,
+)
+DEFAULT_DURATION_BUCKETS: tuple[float, ...] = (
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.0,
+    4.0,
+    8.0,
+    15.0,
+    30.0,
+    60.0,
+    120.0,
+    300.0,
+)
+DEFAULT_PREPARATION_BUCKETS: tuple[float, ...] = (
+    0.0001,
+    0.0002,
+    0.0005,
+    0.001,
+    0.002,
+    0.005,
+    0.01,
+    0.02,
+    0.05,
+    0.1,
+    0.2,
+    0.5,
+)
+DEFAULT_THROUGHPUT_BUCKETS: tuple[float, ...] = (
+    5.0,
+    10.0,
+    20.0,
+    30.0,
+    50.0,
+    75.0,
+    100.0,
+    150.0,
+    200.0,
+    300.0,
+    500.0,
+    1000.0,
+)
+
+_scope: ContextVar[str | None] = ContextVar("latency_metrics_agent", default=None)
+
+
+class BucketHistogram:
+    """A histogram with fixed buckets, recording a value only increments a counter.
+
+    ``counts[i]`` is the number of values up to ``boundaries[i]``, above ``boundaries[i - 1]``, and the
+    last count is the number of values above the last boundary.
+    """
+
+    __slots__ = ("boundaries", "counts", "count", "sum", "max")
+
+    def __init__(self, boundaries: Sequence[float]) -> None:
+        """Initialize a BucketHistogram.
+
+        Args:
+            boundaries: The increasing upper bounds of the buckets.
+        """
+        self.boundaries = tuple(boundaries)
+        self.counts = [0] * (len(self.boundaries) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, value: float) -> None:
+        """Count a value."""
+        self.counts[bisect_right(self.boundaries, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float | None:
+        """The mean of the values, None before the first one."""
+        return self.sum / self.count if self.count else None
+
+    def percentile(self, percent: float) -> float | None:
+        """Estimate a percentile of the values by interpolating within its bucket, None before the first one."""
+        if not self.count:
+            return None
+        rank = self.count * percent / 100
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.boundaries[index - 1] if index else 0.0
+                upper = (
+                    min(self.boundaries[index], self.max)
+                    if index < len(self.boundaries)
+                    else self.max
+                )
+                return lower + (upper - lower) * max(rank - seen, 0) / count
+            seen += count
+        return self.max
+
+    def copy(self) -> "BucketHistogram":
+        """Get a copy of the histogram."""
+        histogram = BucketHistogram(self.boundaries)
+        histogram.counts = list(self.counts)
+        histogram.count = self.count
+        histogram.sum = self.sum
+        histogram.max = self.max
+        return histogram
+
+
+@dataclass
+class LatencyStats:
+    """The timings of the requests of an agent to a model on an endpoint.
+
+    The times are in seconds.
+
+    Attributes:
+        requests: The number of requests.
+        streaming_requests: The number of those that were streamed.
+        failures: The number of requests that failed.
+        cancelled: The number of requests that were cancelled, or streams that were closed before their end.
+        output_tokens: The number of output tokens the service reported.
+        time_to_first_token: The time from the start of a call to its first streamed content.
+        inter_token_gap: The time between consecutive streamed contents.
+        duration: The time from the start of a call to its end.
+        tokens_per_second: The output tokens per second of generation, after the first content of a stream.
+        preparation: The time spent preparing a request before it is sent, like converting the
+            messages and tools and uploading media.
+    """
+
+    requests: int
+    streaming_requests: int
+    failures: int
+    cancelled: int
+    output_tokens: int
+    time_to_first_token: BucketHistogram
+    inter_token_gap: BucketHistogram
+    duration: BucketHistogram
+    tokens_per_second: BucketHistogram
+    preparation: BucketHistogram
+
+    def copy(self) -> "LatencyStats":
+        """Get a copy of the stats."""
+        return LatencyStats(
+            requests=self.requests,
+            streaming_requests=self.streaming_requests,
+            failures=self.failures,
+            cancelled=self.cancelled,
+            output_tokens=self.output_tokens,
+            time_to_first_token=self.time_to_first_token.copy(),
+            inter_token_gap=self.inter_token_gap.copy(),
+            duration=self.duration.copy(),
+            tokens_per_second=self.tokens_per_second.copy(),
+            preparation=self.preparation.copy(),
+        )
+
+
+class _Series:
+    __slots__ = ("stats", "attributes")
+
+    def __init__(self, stats: LatencyStats, attributes: dict[str, str]) -> None:
+        self.stats = stats
+        # Built once, so exporting a request does not allocate them
+        self.attributes = attributes
+
+
+class LatencyMetrics:
+    """Records the time to first token, inter-token gaps, duration, throughput and preparation time of requests.
+
+    The timings are kept per agent, model and endpoint in histograms with fixed buckets, so recording
+    a streamed chunk only increments counters. Read them with ``stats``. When observability is enabled,
+    with ``setup_observability``, the time to first token, the mean inter-token gap, the preparation
+    time and the throughput of each request are also recorded to OpenTelemetry histograms next to the
+    operation duration the chat clients already record.
+
+    The requests are attributed to the agent of the current ``scope``, and the endpoint is the base
+    URL of the client followed by the API. Share one instance between clients to aggregate them.
+
+    Examples:
+        .. code-block:: python
+
+            from custom_openai import LatencyMetrics, OpenAIChatClient
+
+            metrics = LatencyMetrics()
+            client = OpenAIChatClient(model_id="gpt-4o-mini", latency_metrics=metrics)
+            with metrics.scope(agent="support"):
+                async for update in client.get_streaming_response("Hello"):
+                    ...
+            for (agent, model, endpoint), stats in metrics.stats().items():
+                print(agent, model, stats.time_to_first_token.percentile(95))
+    """
+
+    def __init__(
+        self,
+        *,
+        ttft_buckets: Sequence[float] = DEFAULT_TTFT_BUCKETS,
+        gap_buckets: Sequence[float] = DEFAULT_GAP_BUCKETS,
+        duration_buckets: Sequence[float] = DEFAULT_DURATION_BUCKETS,
+        preparation_buckets: Sequence[float] = DEFAULT_PREPARATION_BUCKETS,
+        throughput_buckets: Sequence[float] = DEFAULT_THROUGHPUT_BUCKETS,
+    ) -> None:
+        """Initialize a LatencyMetrics.
+
+        Keyword Args:
+            ttft_buckets: The bucket boundaries of the time to first token, in seconds.
+            gap_buckets: The bucket boundaries of the inter-token gaps, in seconds.
+            duration_buckets: The bucket boundaries of the durations, in seconds.
+            preparation_buckets: The bucket boundaries of the preparation times, in seconds.
+            throughput_buckets: The bucket boundaries of the output tokens per second.
+        """
+        self._buckets = (
+            tuple(ttft_buckets),
+            tuple(gap_buckets),
+            tuple(duration_buckets),
+            tuple(throughput_buckets),
+            tuple(preparation_buckets),
+        )
+        self._series: dict[tuple[str | None, str, str], _Series] = {}
+
+    @contextmanager
+    def scope(self, *, agent: str | None) -> Iterator[None]:
+        """Attribute the requests made in this context to an agent."""
+        token = _scope.set(agent)
+        try:
+            yield
+        finally:
+            _scope.reset(token)
+
+    def start(self, model: str, endpoint: str, *, streaming: bool) -> "RequestTiming":
+        """Start timing a request, from the start of the call."""
+        return RequestTiming(self, _scope.get(), model, endpoint, streaming)
+
+    def _series_for(self, agent: str | None, model: str, endpoint: str) -> _Series:
+        key = (agent, model, endpoint)
+        series = self._series.get(key)
+        if series is None:
+            ttft, gap, duration, throughput, preparation = self._buckets
+            attributes = {"gen_ai.request.model": model, "server.address": endpoint}
+            if agent is not None:
+                attributes["gen_ai.agent.name"] = agent
+            series = self._series[key] = _Series(
+                LatencyStats(
+                    requests=0,
+                    streaming_requests=0,
+                    failures=0,
+                    cancelled=0,
+                    output_tokens=0,
+                    time_to_first_token=BucketHistogram(ttft),
+                    inter_token_gap=BucketHistogram(gap),
+                    duration=BucketHistogram(duration),
+                    tokens_per_second=BucketHistogram(throughput),
+                    preparation=BucketHistogram(preparation),
+                ),
+                attributes,
+            )
+        return series
+
+    def stats(self) -> dict[tuple[str | None, str, str], LatencyStats]:
+        """Get a snapshot of the timings, keyed by agent, model and endpoint."""
+        return {key: series.stats.copy() for key, series in self._series.items()}
+
+    def reset(self) -> None:
+        """Drop all recorded timings."""
+        self._series.clear()
+
+
+class RequestTiming:
+    """The timing of one request, created by ``LatencyMetrics.start``."""
+
+    __slots__ = (
+        "_metrics",
+        "_agent",
+        "_model",
+        "_endpoint",
+        "_streaming",
+        "_started",
+        "_prepared",
+        "_first",
+        "_last",
+        "_gaps",
+        "_output_tokens",
+        "_series",
+    )
+
+    def __init__(
+        self,
+        metrics: LatencyMetrics,
+        agent: str | None,
+        model: str,
+        endpoint: str,
+        streaming: bool,
+    ) -> None:
+        self._metrics = metrics
+        self._agent = agent
+        self._model = model
+        self._endpoint = endpoint
+        self._streaming = streaming
+        self._started = time.perf_counter()
+        self._prepared: float | None = None
+        self._first: float | None = None
+        self._last = 0.0
+        self._gaps = 0
+        self._output_tokens: int | None = None
+        self._series: _Series | None = None
+
+    def prepared(self, model: str | None = None) -> None:
+        """Record the end of the preparation of the request, with the model it is sent to."""
+        self._prepared = time.perf_counter()
+        if model:
+            self._model = model
+        self._get_series().stats.preparation.record(self._prepared - self._started)
+
+    def update(self, update: ChatResponseUpdate) -> None:
+        """Record a streamed update, the first content is the first token."""
+        content_seen = False
+        for content in update.contents:
+            if isinstance(content, UsageContent):
+                self._output_tokens = content.details.output_token_count
+            else:
+                content_seen = True
+        if not content_seen:
+            return
+        now = time.perf_counter()
+        stats = self._get_series().stats
+        if self._first is None:
+            self._first = now
+            stats.time_to_first_token.record(now - self._started)
+        else:
+            stats.inter_token_gap.record(now - self._last)
+            self._gaps += 1
+        self._last = now
+
+    def finish(self, usage: UsageDetails | None = None) -> None:
+        """Record the end of a successful request."""
+        now = time.perf_counter()
+        if usage is not None:
+            self._output_tokens = usage.output_token_count
+        series = self._get_series()
+        stats = series.stats
+        stats.requests += 1
+        duration = now - self._started
+        stats.duration.record(duration)
+        if self._streaming:
+            stats.streaming_requests += 1
+        generating = (
+            self._last - self._first
+            if self._first is not None and self._gaps
+            else now - (self._prepared or self._started)
+        )
+        tokens_per_second = None
+        if self._output_tokens:
+            stats.output_tokens += self._output_tokens
+            if generating > 0:
+                tokens_per_second = self._output_tokens / generating
+                stats.tokens_per_second.record(tokens_per_second)
+        if observability.OBSERVABILITY_SETTINGS.ENABLED:
+            self._export(series, tokens_per_second)
+
+    def fail(self) -> None:
+        """Record the end of a failed request."""
+        stats = self._get_series().stats
+        stats.requests += 1
+        stats.failures += 1
+        if self._streaming:
+            stats.streaming_requests += 1
+
+    def cancel(self) -> None:
+        """Record the end of a cancelled request, or of a stream closed before its end."""
+        stats = self._get_series().stats
+        stats.requests += 1
+        stats.cancelled += 1
+        if self._streaming:
+            stats.streaming_requests += 1
+
+    def _get_series(self) -> _Series:
+        if self._series is None:
+            self._series = self._metrics._series_for(
+                self._agent, self._model, self._endpoint
+            )
+        return self._series
+
+    def _export(self, series: _Series, tokens_per_second: float | None) -> None:
+        ttft, gap, preparation, throughput = _instruments()
+        if self._prepared is not None:
+            preparation.record(self._prepared - self._started, series.attributes)
+        if self._first is not None:
+            ttft.record(self._first - self._started, series.attributes)
+            if self._gaps:
+                gap.record((self._last - self._first) / self._gaps, series.attributes)
+        if tokens_per_second is not None:
+            throughput.record(tokens_per_second, series.attributes)
+
+
+async def timed_updates(
+    timing: RequestTiming, updates: AsyncIterable[ChatResponseUpdate]
+) -> AsyncIterable[ChatResponseUpdate]:
+    """Record the updates of a stream and its end."""
+    try:
+        async for update in updates:
+            timing.update(update)
+            yield update
+    except Exception:
+        timing.fail()
+        raise
+    except (GeneratorExit, asyncio.CancelledError):
+        # The consumer stopped reading or the task was cancelled
+        timing.cancel()
+        raise
+    timing.finish()
+
+
+async def timed_response(
+    timing: RequestTiming, response: Awaitable[TResponse]
+) -> TResponse:
+    """Record the end of a non-streaming request."""
+    try:
+        result = await response
+    except Exception:
+        timing.fail()
+        raise
+    except asyncio.CancelledError:
+        timing.cancel()
+        raise
+    timing.finish(result.usage_details)
+    return result
+
+
+# region OpenTelemetry
+
+_instruments_lock = threading.Lock()
+_instrument_cache: "tuple[Histogram, Histogram, Histogram, Histogram] | None" = None
+
+
+def _instruments() -> "tuple[Histogram, Histogram, Histogram, Histogram]":
+    """Get the OpenTelemetry histograms, creating them on first use."""
+    global _instrument_cache
+    if _instrument_cache is not None:
+        return _instrument_cache
+    with _instruments_lock:
+        if _instrument_cache is None:
+            from agent_framework.observability import get_meter
+
+            meter = get_meter()
+            _instrument_cache = (
+                meter.create_histogram(
+                    "gen_ai.client.operation.time_to_first_chunk",
+                    unit="s",
+                    description="The time from the start of a streamed call to its first content",
+                    explicit_bucket_boundaries_advisory=list(DEFAULT_TTFT_BUCKETS),
+                ),
+                meter.create_histogram(
+                    "gen_ai.client.operation.time_per_output_chunk",
+                    unit="s",
+                    description="The mean time between the streamed contents of a call",
+                    explicit_bucket_boundaries_advisory=list(DEFAULT_GAP_BUCKETS),
+                ),
+                meter.create_histogram(
+                    "openai.client.request.preparation.duration",
+                    unit="s",
+                    description="The time spent preparing an OpenAI request before it is sent",
+                    explicit_bucket_boundaries_advisory=list(
+                        DEFAULT_PREPARATION_BUCKETS
+                    ),
+                ),
+                meter.create_histogram(
+                    "openai.client.output.throughput",
+                    unit="{token}/s",
+                    description="The output tokens per second of an OpenAI call",
+                    explicit_bucket_boundaries_advisory=list(
+                        DEFAULT_THROUGHPUT_BUCKETS
+                    ),
+                ),
+            )
+    return _instrument_cache
+
+
+# endregion
@@ -0,0 +1,270 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import asyncio
+import base64
+import hashlib
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from agent_framework._logging import get_logger
+from agent_framework._types import ChatMessage, DataContent
+from openai import AsyncOpenAI
+
+from ._caching import IdentityCache
+
+logger = get_logger("agent_framework.openai")
+
+__all__ = ["MediaUploadCache", "MediaUploadStats"]
+
+# The longest a file can be kept by the Files API
+_MAX_EXPIRY_SECONDS = 30 * 24 * 3600
+# How much longer the service keeps a file than the cache references it
+_EXPIRY_MARGIN_SECONDS = 3600
+# How long a payload that failed to upload is sent inline before it is uploaded again
+_RETRY_AFTER_SECONDS = 300
+
+
+@dataclass
+class MediaUploadStats:
+    """Counters of a media upload cache.
+
+    Attributes:
+        uploads: The number of payloads uploaded to the Files API.
+        uploaded_bytes: The number of bytes uploaded.
+        references: The number of times a payload was put in a request as a file id instead of inline,
+            the chat client reuses the wire format of a message on later turns.
+        inline_bytes_saved: The number of data URI characters those references replaced.
+        failures: The number of uploads that failed, those payloads are sent inline.
+        evictions: The number of uploads dropped after their time to live.
+        deletions: The number of uploaded files deleted from the service.
+    """
+
+    uploads: int = 0
+    uploaded_bytes: int = 0
+    references: int = 0
+    inline_bytes_saved: int = 0
+    failures: int = 0
+    evictions: int = 0
+    deletions: int = 0
+
+
+@dataclass
+class _Upload:
+    file_id: str
+    expires_at: float
+    client: AsyncOpenAI
+
+
+class MediaUploadCache:
+    """Uploads the media payloads of the messages once, and sends them by file id afterwards.
+
+    Images, audio and documents attached as data are sent inline as base64 data URIs, on every turn
+    of the conversation they are part of. With the cache, a payload of at least ``min_bytes`` is
+    uploaded to the Files API the first time it is sent and referenced by its file id from then on.
+    Uploads are keyed on the SHA-256 of the payload, so the same document attached to several
+    messages or conversations is uploaded once, and the hash of a content is computed once for as
+    long as the content lives.
+
+    The references are dropped after ``ttl`` seconds and the files deleted from the service, which
+    also expires them on its own shortly after, in case the process does not get to delete them.
+    Call ``clear`` to delete all uploaded files, for example when shutting down. Share a cache only
+    between clients of the same account, the files are not visible to other accounts.
+
+    The chat completions API only accepts files (``application/*``) by id, the Responses API also
+    accepts images. Audio is always sent inline. Payloads that fail to upload are sent inline, and
+    uploaded again after a few minutes.
+
+    Examples:
+        .. code-block:: python
+
+            from custom_openai import MediaUploadCache, OpenAIResponsesClient
+
+            uploads = MediaUploadCache(ttl=3600)
+            client = OpenAIResponsesClient(model_id="gpt-4o", media_uploads=uploads)
+            ...
+            await uploads.clear()
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: float = 24 * 3600,
+        min_bytes: int = 32 * 1024,
+        purpose: str = "user_data",
+    ) -> None:
+        """Initialize a MediaUploadCache.
+
+        Keyword Args:
+            ttl: The number of seconds an upload is referenced, at most 30 days minus an hour.
+            min_bytes: The size of the smallest payload to upload, smaller ones are sent inline.
+            purpose: The purpose of the uploaded files.
+        """
+        if ttl <= 0 or ttl > _MAX_EXPIRY_SECONDS - _EXPIRY_MARGIN_SECONDS:
+            raise ValueError(
+                f"ttl must be positive and at most {_MAX_EXPIRY_SECONDS - _EXPIRY_MARGIN_SECONDS} seconds"
+            )
+        self.ttl = ttl
+        self.min_bytes = min_bytes
+        self.purpose = purpose
+        self._digests: IdentityCache[str] = IdentityCache()
+        self._uploads: dict[str, _Upload] = {}
+        self._pending: dict[str, asyncio.Task[_Upload | None]] = {}
+        self._failed: dict[str, float] = {}
+        self._deletions: set[asyncio.Task[None]] = set()
+        self._stats = MediaUploadStats()
+        # Changes whenever a payload is uploaded or evicted, so cached wire formats are refreshed
+        self.generation = 0
+
+    def _digest(self, content: DataContent) -> str:
+        return self._digests.get_or_create(
+            content,
+            id(content.uri),
+            lambda: hashlib.sha256(content.uri.encode()).hexdigest(),
+        )
+
+    def _eligible(self, content: Any, media_types: Sequence[str]) -> bool:
+        return (
+            isinstance(content, DataContent)
+            and content.uri.startswith("data:")
+            and ";base64," in content.uri[:256]
+            # Four base64 characters encode three bytes
+            and len(content.uri) * 3 // 4 >= self.min_bytes
+            and any(content.has_top_level_media_type(kind) for kind in media_types)
+        )
+
+    async def upload(
+        self,
+        client: AsyncOpenAI,
+        messages: Sequence[ChatMessage],
+        media_types: Sequence[str],
+    ) -> None:
+        """Upload the payloads of the messages that are not uploaded yet.
+
+        Args:
+            client: The client to upload with.
+            messages: The messages of a request.
+            media_types: The top-level media types the API accepts by file id.
+        """
+        self._evict_expired()
+        uploads = []
+        for message in messages:
+            for content in message.contents:
+                if not self._eligible(content, media_types):
+                    continue
+                digest = self._digest(content)
+                if digest in self._uploads or (
+                    digest in self._failed and self._failed[digest] > time.monotonic()
+                ):
+                    continue
+                task = self._pending.get(digest)
+                if task is None:
+                    task = self._pending[digest] = asyncio.create_task(
+                        self._upload_one(client, digest, content)
+                    )
+                    task.add_done_callback(
+                        lambda _, digest=digest: self._pending.pop(digest, None)  # type: ignore[misc]
+                    )
+                uploads.append(task)
+        if uploads:
+            # The uploads are shared with concurrent requests, one cancelled request does not cancel them
+            await asyncio.gather(*(asyncio.shield(task) for task in uploads))
+
+    async def _upload_one(
+        self, client: AsyncOpenAI, digest: str, content: DataContent
+    ) -> _Upload | None:
+        data = base64.b64decode(content.uri.split(",", 1)[1])
+        extension = (content.media_type or "").rsplit("/", 1)[-1]
+        filename = (content.additional_properties or {}).get(
+            "filename"
+        ) or f"{digest[:16]}.{extension}"
+        try:
+            file = await client.files.create(
+                file=(filename, data, content.media_type),
+                purpose=self.purpose,  # type: ignore[arg-type]
+                expires_after={
+                    "anchor": "created_at",
+                    "seconds": int(self.ttl) + _EXPIRY_MARGIN_SECONDS,
+                },
+            )
+        except Exception as ex:
+            self._stats.failures += 1
+            self._failed[digest] = time.monotonic() + _RETRY_AFTER_SECONDS
+            logger.warning(
+                "Failed to upload a media payload, sending it inline: %s", ex
+            )
+            return None
+        self._failed.pop(digest, None)
+        upload = _Upload(file.id, time.monotonic() + self.ttl, client)
+        self._uploads[digest] = upload
+        self._stats.uploads += 1
+        self._stats.uploaded_bytes += len(data)
+        self.generation += 1
+        return upload
+
+    def file_id(self, content: DataContent) -> str | None:
+        """Get the file id of an uploaded payload, None when it is sent inline."""
+        if (
+            not self._uploads
+            or not isinstance(content, DataContent)
+            or len(content.uri) * 3 // 4 < self.min_bytes
+        ):
+            return None
+        upload = self._uploads.get(self._digest(content))
+        if upload is None or upload.expires_at <= time.monotonic():
+            return None
+        self._stats.references += 1
+        self._stats.inline_bytes_saved += len(content.uri)
+        return upload.file_id
+
+    def _evict_expired(self) -> None:
+        now = time.monotonic()
+        expired = [
+            digest
+            for digest, upload in self._uploads.items()
+            if upload.expires_at <= now
+        ]
+        for digest in expired:
+            upload = self._uploads.pop(digest)
+            self._stats.evictions += 1
+            self._schedule_delete(upload)
+        if expired:
+            self.generation += 1
+
+    def _schedule_delete(self, upload: _Upload) -> None:
+        task = asyncio.create_task(self._delete(upload))
+        self._deletions.add(task)
+        task.add_done_callback(self._deletions.discard)
+
+    async def _delete(self, upload: _Upload) -> None:
+        try:
+            await upload.client.files.delete(upload.file_id)
+        except Exception as ex:
+            # The service expires the file on its own
+            logger.debug(
+                "Failed to delete the uploaded file %s: %s", upload.file_id, ex
+            )
+            return
+        self._stats.deletions += 1
+
+    async def clear(self) -> None:
+        """Delete all uploaded files from the service and drop their references."""
+        uploads = list(self._uploads.values())
+        self._uploads.clear()
+        self.generation += 1
+        await asyncio.gather(*(self._delete(upload) for upload in uploads))
+        if self._deletions:
+            await asyncio.gather(*self._deletions)
+
+    def stats(self) -> MediaUploadStats:
+        """Get a snapshot of the counters."""
+        return MediaUploadStats(
+            uploads=self._stats.uploads,
+            uploaded_bytes=self._stats.uploaded_bytes,
+            references=self._stats.references,
+            inline_bytes_saved=self._stats.inline_bytes_saved,
+            failures=self._stats.failures,
+            evictions=self._stats.evictions,
+            deletions=self._stats.deletions,
+        )
@@ -0,0 +1,240 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import json
+import re
+import types
+from collections.abc import AsyncIterable
+from typing import Annotated, Any, Literal, Union, get_args, get_origin
+
+from agent_framework._logging import get_logger
+from agent_framework._types import ChatResponseUpdate
+from pydantic import BaseModel, Field, ValidationError, create_model
+
+from ._caching import IdentityCache, _schema_fingerprint
+
+logger = get_logger("agent_framework.openai")
+
+__all__ = ["PartialJsonParser", "partial_model"]
+
+# The characters of a string up to its closing quote or a trailing backslash
+_STRING_RUN = re.compile(r'(?:[^"\\]|\\.)*')
+# The characters of a number or a literal up to the next delimiter
+_TOKEN_RUN = re.compile(r"[^,:\]}\s]*")
+_WHITESPACE = " \t\r\n"
+
+# What the innermost container expects next
+_KEY = 0
+_COLON = 1
+_VALUE = 2
+_COMMA = 3
+
+
+class PartialJsonParser:
+    """Parses a JSON document from the fragments of its text, as they are streamed.
+
+    The parsed value is built in place: a container is added to its parent as soon as it opens, and
+    a string, number or literal as soon as it is complete, so ``value`` always holds everything
+    complete so far. Each fragment only advances the state left by the previous ones, the text is
+    never parsed again. Text that is not valid JSON stops the parsing, ``failed`` tells when.
+
+    Examples:
+        .. code-block:: python
+
+            parser = PartialJsonParser()
+            parser.feed('{"name": "Ada", "tags": ["a", "b')
+            print(parser.value)  # {'name': 'Ada', 'tags': ['a']}
+    """
+
+    def __init__(self) -> None:
+        """Initialize a PartialJsonParser."""
+        self.value: Any = None
+        self.complete = False
+        self.failed = False
+        # The open containers, with what each expects next and the key of its next value
+        self._stack: list[list[Any]] = []
+        # The text of an unfinished string or token, and the fragment tail it could not consume yet
+        self._token: list[str] | None = None
+        self._in_string = False
+        self._carry = ""
+
+    def feed(self, text: str) -> bool:
+        """Parse the next fragment of the text.
+
+        Returns:
+            Whether the value changed, that is a container opened or a value completed.
+        """
+        if self.failed or self.complete:
+            return False
+        if self._carry:
+            text = self._carry + text
+            self._carry = ""
+        try:
+            return self._feed(text)
+        except (ValueError, IndexError) as ex:
+            logger.debug("Stopped parsing a partial JSON document: %s", ex)
+            self.failed = True
+            return False
+
+    def _feed(self, text: str) -> bool:
+        changed = False
+        index = 0
+        length = len(text)
+        while index < length:
+            if self._in_string:
+                run = _STRING_RUN.match(text, index).end()  # type: ignore[union-attr]
+                self._token.append(text[index:run])  # type: ignore[union-attr]
+                if run == length:
+                    return changed
+                if text[run] == "\\":
+                    # An escape split between fragments
+                    self._carry = text[run:]
+                    return changed
+                index = run + 1
+                self._in_string = False
+                raw = "".join(self._token)  # type: ignore[arg-type]
+                self._token = None
+                string = json.loads(f'"{raw}"') if "\\" in raw else raw
+                frame = self._stack[-1] if self._stack else None
+                if frame is not None and frame[1] == _KEY:
+                    frame[1] = _COLON
+                    frame[2] = string
+                else:
+                    changed |= self._add(string)
+                continue
+            if self._token is not None:
+                run = _TOKEN_RUN.match(text, index).end()  # type: ignore[union-attr]
+                self._token.append(text[index:run])
+                if run == length:
+                    return changed
+                index = run
+                token = "".join(self._token)
+                self._token = None
+                changed |= self._add(json.loads(token))
+                continue
+            char = text[index]
+            index += 1
+            if char in _WHITESPACE:
+                continue
+            if char == '"':
+                self._in_string = True
+                self._token = []
+            elif char == "{" or char == "[":
+                container: Any = {} if char == "{" else []
+                self._add(container)
+                self._stack.append([container, _KEY if char == "{" else _VALUE, None])
+                changed = True
+            elif char == "}" or char == "]":
+                self._stack.pop()
+                if not self._stack:
+                    self.complete = True
+                    return changed
+            elif char == ":":
+                self._stack[-1][1] = _VALUE
+            elif char == ",":
+                frame = self._stack[-1]
+                frame[1] = _KEY if isinstance(frame[0], dict) else _VALUE
+            else:
+                self._token = [char]
+        return changed
+
+    def _add(self, value: Any) -> bool:
+        if not self._stack:
+            self.value = value
+            if not isinstance(value, (dict, list)):
+                self.complete = True
+            return True
+        frame = self._stack[-1]
+        if frame[1] != _VALUE:
+            raise ValueError("unexpected value")
+        if isinstance(frame[0], dict):
+            frame[0][frame[2]] = value
+        else:
+            frame[0].append(value)
+        frame[1] = _COMMA
+        return True
+
+
+_partial_models: IdentityCache[type[BaseModel]] = IdentityCache()
+# The models whose partial model is being created, a reference back to one of them is not made partial
+_creating: set[type] = set()
+
+
+def _partial_annotation(annotation: Any) -> Any:
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return Any if annotation in _creating else partial_model(annotation)
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if origin is None or not args or origin is Literal:
+        return annotation
+    if origin is Annotated:
+        # The constraints do not hold for a value that is still streamed, like the length of a list
+        return _partial_annotation(args[0])
+    if origin is Union or origin is types.UnionType:
+        return Union[tuple(_partial_annotation(arg) for arg in args)]  # type: ignore[return-value]
+    if origin is dict:
+        return dict[args[0], _partial_annotation(args[1])]  # type: ignore[index]
+    if origin is tuple:
+        return list[Any]
+    # Lists, sets and other sequences, the partial value is always a list
+    return list[_partial_annotation(args[0])]  # type: ignore[index]
+
+
+def _create_partial_model(model: type[BaseModel]) -> type[BaseModel]:
+    _creating.add(model)
+    try:
+        fields: dict[str, Any] = {
+            name: (
+                _partial_annotation(field.annotation) | None,
+                Field(default=None, alias=field.alias, description=field.description),
+            )
+            for name, field in model.model_fields.items()
+        }
+    finally:
+        _creating.discard(model)
+    return create_model(  # type: ignore[call-overload, no-any-return]
+        f"Partial{model.__name__}", __doc__=model.__doc__, **fields
+    )
+
+
+def partial_model(model: type[BaseModel]) -> type[BaseModel]:
+    """Get the partial model of a model, for the values of a structured output that is still streamed.
+
+    The partial model has the fields of the model, all optional and without their constraints and
+    validators, and its nested models are partial models too. It is created once per model.
+    """
+    return _partial_models.get_or_create(
+        model, _schema_fingerprint(model), lambda: _create_partial_model(model)
+    )
+
+
+async def _with_partial_values(
+    updates: AsyncIterable[ChatResponseUpdate], response_format: Any
+) -> AsyncIterable[ChatResponseUpdate]:
+    """Add the partial value of the structured output to the updates that complete a part of it.
+
+    The partial value is put in ``additional_properties["partial_value"]``, as an instance of the
+    partial model of the response format, or as the parsed JSON when the format is not a model.
+    """
+    model = (
+        partial_model(response_format)
+        if isinstance(response_format, type) and issubclass(response_format, BaseModel)
+        else None
+    )
+    parser = PartialJsonParser()
+    async for update in updates:
+        text = update.text
+        if text and parser.feed(text) and isinstance(parser.value, dict):
+            partial_value: Any = parser.value
+            if model is not None:
+                try:
+                    partial_value = model.model_validate(parser.value)
+                except ValidationError as ex:
+                    logger.debug(
+                        "Skipped a partial value that does not validate: %s", ex
+                    )
+                    partial_value = None
+            if partial_value is not None:
+                if update.additional_properties is None:
+                    update.additional_properties = {}
+                update.additional_properties["partial_value"] = partial_value
+        yield update
@@ -0,0 +1,103 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from agent_framework._types import UsageDetails
+from openai.types.chat import ChatCompletionPredictionContentParam
+
+__all__ = ["PredictedOutput", "PredictionStats"]
+
+
+@dataclass(frozen=True)
+class PredictedOutput:
+    """A prediction of the output of a chat completion, for the Predicted Outputs feature.
+
+    When most of the output is known in advance, like a file that is regenerated with a few edits,
+    the model only has to generate the parts that differ from the prediction, which makes the
+    response several times faster. The tokens of the prediction the model does not use are billed
+    as completion tokens, so check the acceptance ratio of the client's ``prediction_stats()`` to
+    tell whether a prediction pays off. Predictions are not supported together with tools, logprobs,
+    audio output or more than one choice.
+
+    Attributes:
+        content: The predicted text, or its parts.
+
+    Examples:
+        .. code-block:: python
+
+            from custom_openai import OpenAIChatClient, PredictedOutput
+
+            client = OpenAIChatClient(model_id="gpt-4o")
+            response = await client.get_response(
+                f"Rename the class Foo to Bar, reply with the file only:\\n{source}",
+                prediction=PredictedOutput(source),
+            )
+            print(client.prediction_stats().acceptance_ratio)
+    """
+
+    content: str | Sequence[str]
+
+    def to_param(self) -> ChatCompletionPredictionContentParam:
+        """Get the wire format of the prediction."""
+        if isinstance(self.content, str):
+            return {"type": "content", "content": self.content}
+        return {
+            "type": "content",
+            "content": [{"type": "text", "text": part} for part in self.content],
+        }
+
+
+def _prediction_param(prediction: Any) -> Any:
+    """Get the wire format of a prediction given as a PredictedOutput, a string or the wire format itself."""
+    if isinstance(prediction, PredictedOutput):
+        return prediction.to_param()
+    if isinstance(prediction, str):
+        return PredictedOutput(prediction).to_param()
+    return prediction
+
+
+@dataclass
+class PredictionStats:
+    """Counters of the predictions of a client.
+
+    Attributes:
+        requests: The number of requests with a prediction the service reported usage for.
+        accepted_tokens: The number of predicted tokens the model used.
+        rejected_tokens: The number of predicted tokens the model did not use, billed as completion tokens.
+        completion_tokens: The number of completion tokens of the requests.
+    """
+
+    requests: int = 0
+    accepted_tokens: int = 0
+    rejected_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def acceptance_ratio(self) -> float:
+        """The fraction of the predicted tokens the model used."""
+        predicted = self.accepted_tokens + self.rejected_tokens
+        return self.accepted_tokens / predicted if predicted else 0.0
+
+    @property
+    def accepted_share(self) -> float:
+        """The fraction of the completion tokens taken from the prediction instead of generated."""
+        return (
+            self.accepted_tokens / self.completion_tokens
+            if self.completion_tokens
+            else 0.0
+        )
+
+    def record(self, usage: UsageDetails | None) -> None:
+        """Count the usage of a request with a prediction."""
+        if usage is None:
+            return
+        self.requests += 1
+        self.accepted_tokens += usage.additional_counts.get(
+            "completion/accepted_prediction_tokens", 0
+        )
+        self.rejected_tokens += usage.additional_counts.get(
+            "completion/rejected_prediction_tokens", 0
+        )
+        self.completion_tokens += usage.output_token_count or 0
@@ -0,0 +1,220 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import hashlib
+import json
+from collections.abc import Iterator, Mapping, MutableMapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+
+from agent_framework._types import UsageDetails
+
+__all__ = ["PromptCacheStats", "PromptCaching"]
+
+# The roles of the messages that make up the stable prefix of a request
+_PREFIX_ROLES = frozenset({"system", "developer"})
+# The usage details keys of the cached input tokens, of chat completions and of the Responses API
+_CACHED_TOKENS_KEYS = ("prompt/cached_tokens", "openai.cached_input_tokens")
+
+_scope: ContextVar[tuple[str | None, str | None]] = ContextVar(
+    "prompt_cache_scope", default=(None, None)
+)
+
+
+@dataclass
+class PromptCacheStats:
+    """Prompt cache counters of an agent and model.
+
+    Attributes:
+        requests: The number of requests the service reported usage for.
+        requests_with_hits: The number of requests that read part of their input from the prompt cache.
+        input_tokens: The number of input tokens of the requests.
+        cached_tokens: The number of input tokens read from the prompt cache, billed at a discount.
+        prefix_changes: The number of requests whose stable prefix (instructions, tool specs and leading
+            system messages) differed from the previous request, each one starts a new cache entry.
+    """
+
+    requests: int = 0
+    requests_with_hits: int = 0
+    input_tokens: int = 0
+    cached_tokens: int = 0
+    prefix_changes: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        """The fraction of the input tokens read from the prompt cache."""
+        return self.cached_tokens / self.input_tokens if self.input_tokens else 0.0
+
+    @property
+    def saved_tokens(self) -> int:
+        """The number of input tokens that did not have to be processed again, the cached tokens."""
+        return self.cached_tokens
+
+
+class PromptCaching:
+    """Lays out requests for the service's prompt cache and reports how often it is hit.
+
+    The service caches the longest prefix of a prompt it has seen recently, so the beginning of a
+    request has to stay byte-identical across calls. With prompt caching the tool specs are sent in
+    a canonical order (by name), so merging the tools of an agent and a run in a different order does
+    not change the prefix, and the instructions and other leading system messages stay in front.
+    A ``prompt_cache_key`` is set on every request that does not set one, routing requests with the
+    same prefix, tenant and conversation to the same cache.
+
+    Usage is aggregated per agent and model. The client does not know which agent is calling it,
+    wrap the calls of an agent in ``scope(agent=...)`` to attribute them, unscoped calls are counted
+    under the agent None.
+
+    Examples:
+        .. code-block:: python
+
+            from custom_openai import OpenAIChatClient, PromptCaching
+
+            caching = PromptCaching()
+            client = OpenAIChatClient(model_id="gpt-4o-mini", prompt_caching=caching)
+            agent = client.create_agent(name="planner", instructions=LONG_INSTRUCTIONS)
+            with caching.scope(agent="planner", tenant="contoso"):
+                await agent.run("Plan the release")
+            for (agent_name, model), stats in caching.stats().items():
+                print(agent_name, model, stats.hit_ratio, stats.saved_tokens)
+    """
+
+    def __init__(
+        self,
+        *,
+        tenant: str | None = None,
+        per_conversation: bool = True,
+        sort_tools: bool = True,
+    ) -> None:
+        """Initialize a PromptCaching.
+
+        Keyword Args:
+            tenant: The default tenant of the cache keys, ``scope(tenant=...)`` overrides it.
+            per_conversation: Whether the cache key includes the conversation, identified by its
+                first message, so all turns of a conversation are routed to the same cache.
+                Otherwise all conversations with the same prefix and tenant share a key.
+            sort_tools: Whether to send the tool specs in a canonical order.
+        """
+        self.tenant = tenant
+        self.per_conversation = per_conversation
+        self.sort_tools = sort_tools
+        self._stats: dict[tuple[str | None, str], PromptCacheStats] = {}
+        self._prefixes: dict[tuple[str | None, str], str] = {}
+
+    @contextmanager
+    def scope(
+        self, *, agent: str | None = None, tenant: str | None = None
+    ) -> Iterator[None]:
+        """Attribute the requests made in this context to an agent and a tenant.
+
+        Keyword Args:
+            agent: The name of the agent the usage is aggregated under.
+            tenant: The tenant of the cache keys, instead of the default tenant.
+        """
+        token = _scope.set((agent, tenant))
+        try:
+            yield
+        finally:
+            _scope.reset(token)
+
+    def prepare(self, options_dict: MutableMapping[str, Any]) -> None:
+        """Lay out a prepared request for the prompt cache and set its cache key.
+
+        Args:
+            options_dict: The prepared options of a chat completions or Responses API request.
+        """
+        if self.sort_tools and (tools := options_dict.get("tools")):
+            options_dict["tools"] = sorted(tools, key=_tool_name)
+        items = options_dict.get("messages") or options_dict.get("input") or []
+        if isinstance(items, str):
+            items = [{"role": "user", "content": items}]
+        prefix: list[Any] = [
+            options_dict.get("model"),
+            options_dict.get("instructions"),
+            options_dict.get("tools"),
+        ]
+        conversation: Any = options_dict.get("conversation")
+        for item in items:
+            if isinstance(item, Mapping) and item.get("role") in _PREFIX_ROLES:
+                prefix.append(item)
+                continue
+            if conversation is None:
+                conversation = item
+            break
+        prefix_hash = _hash(prefix)
+
+        agent, tenant = _scope.get()
+        key = (agent, str(options_dict.get("model")))
+        if self._prefixes.get(key, prefix_hash) != prefix_hash:
+            self._stats_for(key).prefix_changes += 1
+        self._prefixes[key] = prefix_hash
+
+        if "prompt_cache_key" not in options_dict:
+            options_dict["prompt_cache_key"] = (
+                "pc-"
+                + _hash(
+                    [
+                        tenant or self.tenant,
+                        prefix_hash,
+                        conversation if self.per_conversation else None,
+                    ]
+                )[:24]
+            )
+
+    def record(self, model: str, usage: UsageDetails | None) -> None:
+        """Count the usage of a request against the agent of the current scope.
+
+        Args:
+            model: The model of the request.
+            usage: The usage the service reported for the request.
+        """
+        if usage is None or not usage.input_token_count:
+            return
+        stats = self._stats_for((_scope.get()[0], model))
+        cached = 0
+        for name in _CACHED_TOKENS_KEYS:
+            if value := usage.additional_counts.get(name):
+                cached = value
+                break
+        stats.requests += 1
+        stats.input_tokens += usage.input_token_count
+        if cached:
+            stats.requests_with_hits += 1
+            stats.cached_tokens += cached
+
+    def _stats_for(self, key: tuple[str | None, str]) -> PromptCacheStats:
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = PromptCacheStats()
+        return stats
+
+    def stats(self) -> dict[tuple[str | None, str], PromptCacheStats]:
+        """Get a snapshot of the counters, by agent and model."""
+        return {
+            key: PromptCacheStats(
+                requests=stats.requests,
+                requests_with_hits=stats.requests_with_hits,
+                input_tokens=stats.input_tokens,
+                cached_tokens=stats.cached_tokens,
+                prefix_changes=stats.prefix_changes,
+            )
+            for key, stats in self._stats.items()
+        }
+
+
+def _tool_name(tool: Any) -> str:
+    if not isinstance(tool, Mapping):
+        return ""
+    function = tool.get("function")
+    if isinstance(function, Mapping):
+        return str(function.get("name") or "")
+    return str(tool.get("name") or tool.get("server_label") or tool.get("type") or "")
+
+
+def _hash(value: Any) -> str:
+    return hashlib.sha256(
+        json.dumps(
+            value, separators=(",", ":"), ensure_ascii=False, default=repr
+        ).encode()
+    ).hexdigest()
@@ -0,0 +1,334 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import asyncio
+import json
+import threading
+import time
+import weakref
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from agent_framework._logging import get_logger
+
+from ._client_registry import OpenAIClientRegistry
+
+if TYPE_CHECKING:
+    from agent_framework import UsageDetails
+
+logger = get_logger("agent_framework.openai")
+
+__all__ = [
+    "OpenAIRateLimiter",
+    "OpenAIRateLimiterStats",
+    "RateLimitReservation",
+    "get_shared_rate_limiter",
+]
+
+# The option keys whose content counts towards the prompt tokens
+_PROMPT_KEYS = ("messages", "input", "instructions", "tools", "prediction")
+# The option keys limiting the completion tokens, in order of precedence
+_COMPLETION_KEYS = ("max_completion_tokens", "max_output_tokens", "max_tokens")
+
+
+def _parse_seconds(value: str | None) -> float | None:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _parse_int(value: str | None) -> int | None:
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+@dataclass
+class OpenAIRateLimiterStats:
+    """A snapshot of an OpenAIRateLimiter.
+
+    Attributes:
+        requests_per_minute: The requests per minute limit, None while unknown.
+        tokens_per_minute: The tokens per minute limit, None while unknown.
+        available_requests: The requests that can currently be sent without waiting.
+        available_tokens: The tokens that can currently be used without waiting.
+        requests: The number of requests that went through the limiter.
+        waits: The number of requests that had to wait.
+        wait_time: The total number of seconds requests waited.
+        corrections: The total number of tokens the estimates were corrected by from the actual usage.
+    """
+
+    requests_per_minute: int | None
+    tokens_per_minute: int | None
+    available_requests: float | None
+    available_tokens: float | None
+    requests: int
+    waits: int
+    wait_time: float
+    corrections: int
+
+
+class _Bucket:
+    """A token bucket refilled continuously at ``capacity`` per minute, unlimited while the capacity is unknown."""
+
+    def __init__(self, capacity: int | None, now: float) -> None:
+        self.capacity = capacity
+        self.level = float(capacity or 0)
+        self.updated = now
+        self.blocked_until = 0.0
+
+    def refill(self, now: float) -> None:
+        if self.capacity is not None:
+            self.level = min(
+                self.capacity,
+                self.level + (now - self.updated) * self.capacity / 60.0,
+            )
+        self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """The number of seconds until ``amount`` can be taken."""
+        if self.blocked_until > now:
+            return self.blocked_until - now
+        if self.capacity is None:
+            return 0.0
+        # A request larger than the whole bucket only waits for a full bucket
+        missing = min(amount, self.capacity) - self.level
+        return max(missing, 0.0) * 60.0 / self.capacity
+
+    def set_limit(self, limit: int) -> None:
+        if self.capacity is None:
+            self.level = float(limit)
+        self.capacity = limit
+
+    def set_remaining(self, remaining: int) -> None:
+        # The server only knows about requests that already reached it, never raise the local level
+        self.level = min(self.level, float(remaining))
+
+
+class RateLimitReservation:
+    """The capacity reserved for a single request, corrected once the response is known."""
+
+    def __init__(self, limiter: "OpenAIRateLimiter", tokens: int) -> None:
+        self._limiter = limiter
+        self.tokens = tokens
+        # Tokens reserved before the limit was known were never taken from the bucket
+        self._settled = limiter._tokens.capacity is None
+
+    def observe_headers(self, headers: Mapping[str, str]) -> None:
+        """Update the limiter from the ``x-ratelimit-*`` headers of the response."""
+        self._limiter.update_from_headers(headers)
+
+    def settle(self, usage: "UsageDetails | None") -> None:
+        """Replace the estimated tokens with the actual usage of the request."""
+        if self._settled or usage is None or usage.total_token_count is None:
+            return
+        self._settled = True
+        self._limiter._correct(self.tokens - usage.total_token_count)
+
+    def cancel(self) -> None:
+        """Give the reserved tokens back, for requests rejected without being processed."""
+        if not self._settled:
+            self._settled = True
+            self._limiter._correct(self.tokens)
+
+
+class OpenAIRateLimiter:
+    """A client-side limiter for the requests and tokens per minute of an OpenAI account.
+
+    Requests wait for capacity before they are sent instead of running into 429 errors and
+    burning the SDK's retries. The tokens of each request are estimated from its options,
+    and corrected afterwards from the actual usage. The limits, when not configured, and the
+    remaining capacity are taken from the ``x-ratelimit-*`` response headers.
+
+    Share one limiter between all clients using the same account, either by passing the same
+    instance or through ``get_shared_rate_limiter``.
+
+    Examples:
+        .. code-block:: python
+
+            from custom_openai import OpenAIChatClient, get_shared_rate_limiter
+
+            limiter = get_shared_rate_limiter("sk-...", tokens_per_minute=30_000)
+            client = OpenAIChatClient(model_id="gpt-4o", api_key="sk-...", rate_limiter=limiter)
+    """
+
+    def __init__(
+        self,
+        *,
+        requests_per_minute: int | None = None,
+        tokens_per_minute: int | None = None,
+        default_completion_tokens: int = 1024,
+        chars_per_token: float = 4.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize an OpenAIRateLimiter.
+
+        Keyword Args:
+            requests_per_minute: The requests per minute limit, learned from the response headers when not set.
+            tokens_per_minute: The tokens per minute limit, learned from the response headers when not set.
+            default_completion_tokens: The completion tokens estimated for requests without a max tokens option.
+            chars_per_token: The number of prompt characters estimated per token.
+            clock: The monotonic clock to use, mainly for testing.
+        """
+        self._clock = clock
+        now = clock()
+        self._requests = _Bucket(requests_per_minute, now)
+        self._tokens = _Bucket(tokens_per_minute, now)
+        self.default_completion_tokens = default_completion_tokens
+        self.chars_per_token = chars_per_token
+        # One lock per event loop, an asyncio lock can only be used from the loop it first waited on
+        self._locks: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, asyncio.Lock
+        ] = weakref.WeakKeyDictionary()
+        self._stats = OpenAIRateLimiterStats(
+            requests_per_minute=None,
+            tokens_per_minute=None,
+            available_requests=None,
+            available_tokens=None,
+            requests=0,
+            waits=0,
+            wait_time=0.0,
+            corrections=0,
+        )
+
+    def estimate_tokens(self, options: Mapping[str, Any]) -> int:
+        """Estimate the tokens a request counts for, its prompt plus its maximum completion."""
+        prompt = [options[key] for key in _PROMPT_KEYS if options.get(key)]
+        prompt_chars = len(json.dumps(prompt, default=str, ensure_ascii=False))
+        completion = next(
+            (options[key] for key in _COMPLETION_KEYS if options.get(key)),
+            self.default_completion_tokens,
+        )
+        return int(prompt_chars / self.chars_per_token) + int(completion)
+
+    async def reserve(self, options: Mapping[str, Any]) -> RateLimitReservation:
+        """Wait until there is capacity for the request, and reserve it.
+
+        Args:
+            options: The prepared options of the request.
+        """
+        tokens = self.estimate_tokens(options)
+        # Waiters are served in order, so large requests are not starved by small ones
+        async with self._loop_lock():
+            waited = 0.0
+            while True:
+                now = self._clock()
+                self._requests.refill(now)
+                self._tokens.refill(now)
+                delay = max(
+                    self._requests.delay(1, now), self._tokens.delay(tokens, now)
+                )
+                if delay <= 0:
+                    break
+                waited += delay
+                await asyncio.sleep(delay)
+            self._requests.level -= 1
+            self._tokens.level -= tokens
+        self._stats.requests += 1
+        if waited:
+            self._stats.waits += 1
+            self._stats.wait_time += waited
+            logger.debug("Rate limiter delayed a request by %.2f seconds", waited)
+        return RateLimitReservation(self, tokens)
+
+    def _loop_lock(self) -> asyncio.Lock:
+        """Get the lock of the running event loop, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        lock = self._locks.get(loop)
+        if lock is None:
+            # A lock refers to its loop once it was waited on, so the locks of closed loops are dropped here
+            for closed in [other for other in self._locks if other.is_closed()]:
+                del self._locks[closed]
+            lock = self._locks[loop] = asyncio.Lock()
+        return lock
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """Update the limits and the remaining capacity from the ``x-ratelimit-*`` response headers."""
+        now = self._clock()
+        for name, bucket in (("requests", self._requests), ("tokens", self._tokens)):
+            bucket.refill(now)
+            if (
+                limit := _parse_int(headers.get(f"x-ratelimit-limit-{name}"))
+            ) is not None:
+                bucket.set_limit(limit)
+            if (
+                remaining := _parse_int(headers.get(f"x-ratelimit-remaining-{name}"))
+            ) is not None:
+                bucket.set_remaining(remaining)
+        # The reset headers give the time until a bucket is full again, which the continuous
+        # refill already models; only an explicit retry-after blocks new requests
+        if retry_after := _parse_seconds(headers.get("retry-after")):
+            self._requests.blocked_until = max(
+                self._requests.blocked_until, now + retry_after
+            )
+
+    def _correct(self, tokens: int) -> None:
+        self._tokens.refill(self._clock())
+        self._tokens.level += tokens
+        if self._tokens.capacity is not None:
+            self._tokens.level = min(self._tokens.level, self._tokens.capacity)
+        self._stats.corrections += tokens
+
+    def stats(self) -> OpenAIRateLimiterStats:
+        """Get a snapshot of the limits, the available capacity and the counters."""
+        now = self._clock()
+        self._requests.refill(now)
+        self._tokens.refill(now)
+        return OpenAIRateLimiterStats(
+            requests_per_minute=self._requests.capacity,
+            tokens_per_minute=self._tokens.capacity,
+            available_requests=self._requests.level
+            if self._requests.capacity is not None
+            else None,
+            available_tokens=self._tokens.level
+            if self._tokens.capacity is not None
+            else None,
+            requests=self._stats.requests,
+            waits=self._stats.waits,
+            wait_time=self._stats.wait_time,
+            corrections=self._stats.corrections,
+        )
+
+
+_shared_limiters: dict[tuple[str, str, str], OpenAIRateLimiter] = {}
+_shared_limiters_lock = threading.Lock()
+
+
+def get_shared_rate_limiter(
+    api_key: str | Callable[[], str | Awaitable[str]],
+    *,
+    org_id: str | None = None,
+    base_url: str | None = None,
+    requests_per_minute: int | None = None,
+    tokens_per_minute: int | None = None,
+) -> OpenAIRateLimiter:
+    """Get the process-wide OpenAIRateLimiter of an account, creating it on first use.
+
+    Args:
+        api_key: The API key of the account, only a hash of it is kept.
+
+    Keyword Args:
+        org_id: The organization ID of the account.
+        base_url: The base URL of the service.
+        requests_per_minute: The requests per minute limit, used when the limiter is created.
+        tokens_per_minute: The tokens per minute limit, used when the limiter is created.
+    """
+    key = (
+        OpenAIClientRegistry._api_key_identity(api_key),
+        org_id or "",
+        base_url or "",
+    )
+    with _shared_limiters_lock:
+        limiter = _shared_limiters.get(key)
+        if limiter is None:
+            limiter = _shared_limiters[key] = OpenAIRateLimiter(
+                requests_per_minute=requests_per_minute,
+                tokens_per_minute=tokens_per_minute,
+            )
+        return limiter
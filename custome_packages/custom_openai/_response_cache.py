@@ -0,0 +1,364 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Callable, Iterator, Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+from agent_framework._logging import get_logger
+from agent_framework._types import (
+    ChatResponse,
+    ChatResponseUpdate,
+    FunctionApprovalRequestContent,
+    FunctionCallContent,
+    UsageContent,
+)
+
+logger = get_logger("agent_framework.openai")
+
+__all__ = [
+    "DiskResponseCacheBackend",
+    "MemoryResponseCacheBackend",
+    "ResponseCache",
+    "ResponseCacheBackend",
+    "ResponseCacheStats",
+]
+
+# Options that change how a response is delivered, not what it contains
+_TRANSPORT_KEYS = frozenset({"stream", "stream_options"})
+# The temperature the API uses when a request does not set one
+_DEFAULT_TEMPERATURE = 1.0
+
+
+@dataclass
+class ResponseCacheStats:
+    """Counters of a ResponseCache.
+
+    Attributes:
+        hits: The number of requests answered from the cache.
+        misses: The number of cacheable requests that were sent to the service.
+        bypassed: The number of requests that were not cacheable, by temperature, tools or server side state.
+        stores: The number of responses written to the cache.
+        errors: The number of backend reads and writes that failed, they count as misses.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    bypassed: int = 0
+    stores: int = 0
+    errors: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        """The fraction of cacheable requests answered from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ResponseCacheBackend(ABC):
+    """Stores serialized responses by key, implement it to cache in another store."""
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        """Get the value stored under the key, None when missing or expired."""
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes) -> None:
+        """Store a value under the key."""
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """Remove all values."""
+
+
+class MemoryResponseCacheBackend(ResponseCacheBackend):
+    """An in-memory LRU backend, evicting the least recently used responses beyond a total size."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024) -> None:
+        """Initialize a MemoryResponseCacheBackend.
+
+        Args:
+            max_bytes: The maximum total size of the stored responses.
+        """
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self.size = 0
+        self.evictions = 0
+
+    async def get(self, key: str) -> bytes | None:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        if (previous := self._entries.pop(key, None)) is not None:
+            self.size -= len(previous)
+        self._entries[key] = value
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+            self.evictions += 1
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskResponseCacheBackend(ResponseCacheBackend):
+    """An on-disk backend with one file per response, expiring responses after a time to live.
+
+    Files are written atomically, so several processes can share a directory.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        *,
+        ttl: float | None = 7 * 24 * 3600,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Initialize a DiskResponseCacheBackend.
+
+        Args:
+            directory: The directory the responses are stored in, created when missing.
+
+        Keyword Args:
+            ttl: The number of seconds a response is kept, None to keep responses until cleared.
+            clock: The wall clock, in seconds.
+        """
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self._clock = clock
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / key
+
+    def _read(self, key: str) -> bytes | None:
+        path = self._path(key)
+        try:
+            if self.ttl is not None and self._clock() - path.stat().st_mtime > self.ttl:
+                path.unlink(missing_ok=True)
+                return None
+            return path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, key: str, value: bytes) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f"{key}.{os.getpid()}.tmp")
+        temporary.write_bytes(value)
+        os.replace(temporary, path)
+
+    def _prune(self) -> int:
+        removed = 0
+        if not self.directory.exists():
+            return removed
+        for path in self.directory.glob("*/*"):
+            if self.ttl is None or self._clock() - path.stat().st_mtime > self.ttl:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+    async def get(self, key: str) -> bytes | None:
+        return await asyncio.to_thread(self._read, key)
+
+    async def set(self, key: str, value: bytes) -> None:
+        await asyncio.to_thread(self._write, key, value)
+
+    async def clear(self) -> None:
+        ttl, self.ttl = self.ttl, None
+        try:
+            await asyncio.to_thread(self._prune)
+        finally:
+            self.ttl = ttl
+
+    async def prune(self) -> int:
+        """Remove the expired responses, returns the number of removed responses."""
+        return await asyncio.to_thread(self._prune)
+
+
+class ResponseCache:
+    """An exact-match cache of chat responses, keyed on a canonical hash of the prepared request.
+
+    Only requests that are expected to be answered the same way are cached. Requests are bypassed
+    when their temperature is above ``max_temperature`` (the service default of 1 applies when a
+    request sets none), when they offer tools unless ``cache_tool_turns`` is set, and when they
+    store or continue a conversation on the service. Streaming calls are answered from the same
+    entries as non-streaming calls, a hit is replayed as a short stream of updates.
+
+    Examples:
+        .. code-block:: python
+
+            from custom_openai import DiskResponseCacheBackend, OpenAIChatClient, ResponseCache
+
+            cache = ResponseCache(DiskResponseCacheBackend(".response_cache", ttl=24 * 3600))
+            client = OpenAIChatClient(model_id="gpt-4o-mini", response_cache=cache)
+            await client.get_response("Classify: ...", temperature=0)
+            print(cache.stats().hit_ratio)
+    """
+
+    def __init__(
+        self,
+        backend: ResponseCacheBackend | None = None,
+        *,
+        max_temperature: float = 0.0,
+        cache_tool_turns: bool = False,
+        namespace: str = "",
+    ) -> None:
+        """Initialize a ResponseCache.
+
+        Args:
+            backend: The store of the responses, an in-memory LRU of 64 MB by default.
+
+        Keyword Args:
+            max_temperature: The highest temperature of a request that is still cached.
+            cache_tool_turns: Whether to cache requests that offer tools, and responses with function calls.
+            namespace: Part of every key, change it to invalidate all entries of an existing store.
+        """
+        self.backend = backend or MemoryResponseCacheBackend()
+        self.max_temperature = max_temperature
+        self.cache_tool_turns = cache_tool_turns
+        self.namespace = namespace
+        self._stats = ResponseCacheStats()
+
+    def key(self, options_dict: Mapping[str, Any], *scope: Any) -> str | None:
+        """Get the key of a prepared request, None when the request must not be cached.
+
+        Args:
+            options_dict: The prepared options of the request, as sent to the service.
+            scope: Other values the response depends on, for example the endpoint and response format.
+        """
+        temperature = options_dict.get("temperature")
+        if (
+            (_DEFAULT_TEMPERATURE if temperature is None else temperature)
+            > self.max_temperature
+            or (options_dict.get("tools") and not self.cache_tool_turns)
+            or options_dict.get("store")
+            or options_dict.get("previous_response_id")
+            or options_dict.get("conversation")
+        ):
+            self._stats.bypassed += 1
+            return None
+        return _request_key(options_dict, self.namespace, *scope)
+
+    async def get(
+        self, key: str, response_format: type[BaseModel] | None = None
+    ) -> ChatResponse | None:
+        """Get the cached response of a key, counting a hit or a miss.
+
+        Args:
+            key: The key of the request.
+            response_format: The structured output type to parse the cached response into.
+        """
+        try:
+            data = await self.backend.get(key)
+            if data is None:
+                self._stats.misses += 1
+                return None
+            response = ChatResponse.from_json(data.decode())
+            if response_format is not None:
+                response.try_parse_value(output_format_type=response_format)
+        except Exception as ex:
+            # An unreadable or corrupt entry is a miss, the response is fetched and cached again
+            logger.warning("Failed to read a cached response: %s", ex)
+            self._stats.errors += 1
+            self._stats.misses += 1
+            return None
+        self._stats.hits += 1
+        return response
+
+    async def set(self, key: str, response: ChatResponse) -> None:
+        """Cache the response of a key, unless it asks for function calls and tool turns are not cached."""
+        if not self.cache_tool_turns and any(
+            isinstance(content, (FunctionCallContent, FunctionApprovalRequestContent))
+            for message in response.messages
+            for content in message.contents
+        ):
+            return
+        try:
+            payload = response.to_dict()
+            # The structured output is parsed again from the text on a hit
+            payload.pop("value", None)
+            data = json.dumps(payload).encode()
+            await self.backend.set(key, data)
+        except Exception as ex:
+            logger.warning("Failed to cache a response: %s", ex)
+            self._stats.errors += 1
+            return
+        self._stats.stores += 1
+
+    @staticmethod
+    def replay(response: ChatResponse) -> Iterator[ChatResponseUpdate]:
+        """Replay a cached response as a stream of updates, one per message and a final one with the usage."""
+        for message in response.messages:
+            yield ChatResponseUpdate(
+                contents=list(message.contents),
+                role=message.role,
+                author_name=message.author_name,
+                message_id=message.message_id,
+                response_id=response.response_id,
+                model_id=response.model_id,
+                created_at=response.created_at,
+            )
+        yield ChatResponseUpdate(
+            contents=[UsageContent(details=response.usage_details)]
+            if response.usage_details
+            else [],
+            response_id=response.response_id,
+            conversation_id=response.conversation_id,
+            model_id=response.model_id,
+            finish_reason=response.finish_reason,
+        )
+
+    def stats(self) -> ResponseCacheStats:
+        """Get a snapshot of the counters."""
+        return ResponseCacheStats(
+            hits=self._stats.hits,
+            misses=self._stats.misses,
+            bypassed=self._stats.bypassed,
+            stores=self._stats.stores,
+            errors=self._stats.errors,
+        )
+
+
+def _request_key(options_dict: Mapping[str, Any], *scope: Any) -> str:
+    """Hash a prepared request and the other values its response depends on into a key.
+
+    The options that only change how the response is delivered are left out.
+    """
+    payload = {
+        key: value for key, value in options_dict.items() if key not in _TRANSPORT_KEYS
+    }
+    canonical = json.dumps(
+        [*scope, payload],
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=_json_default,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, type):
+        return f"{value.__module__}.{value.__qualname__}"
+    return repr(value)
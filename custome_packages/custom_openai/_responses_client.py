@@ -10,15 +10,13 @@ from collections.abc import (
     Sequence,
 )
 from datetime import datetime
+from functools import cached_property
 from itertools import chain
-from typing import Any, TypeVar
+from typing import TYPE_CHECKING, Any, TypeVar
 
 from openai import AsyncOpenAI, BadRequestError
 from openai.types.responses.file_search_tool_param import FileSearchToolParam
 from openai.types.responses.function_tool_param import FunctionToolParam
-from openai.types.responses.parsed_response import (
-    ParsedResponse,
-)
 from openai.types.responses.response import Response as OpenAIResponse
 from openai.types.responses.response_stream_event import (
     ResponseStreamEvent as OpenAIResponseStreamEvent,
@@ -79,11 +77,48 @@ from agent_framework.exceptions import (
 from agent_framework.observability import use_observability
 from ._exceptions import OpenAIContentFilterException
 from ._shared import OpenAIBase, OpenAIConfigMixin, OpenAISettings
+from ._tool_calls import StreamingToolCallAssembler
+
+if TYPE_CHECKING:
+    # The feature modules are only imported when their feature is configured
+    from ._caching import ToolSpecCache
+    from ._client_registry import OpenAIClientRegistry
+    from ._coalescing import RequestCoalescer
+    from ._concurrency import AdaptiveConcurrencyLimiter
+    from ._context_budget import ContextBudget
+    from ._endpoint_pool import OpenAIEndpointPool
+    from ._hedging import HedgingPolicy
+    from ._latency_metrics import LatencyMetrics
+    from ._media_uploads import MediaUploadCache
+    from ._prompt_caching import PromptCaching
+    from ._rate_limits import OpenAIRateLimiter, RateLimitReservation
+    from ._response_cache import ResponseCache
+    from ._streaming import StreamCoalescing
+    from ._transports import CassetteTransport
 
 logger = get_logger("agent_framework.openai")
 
 __all__ = ["OpenAIResponsesClient"]
 
+# The top-level media types the Responses API accepts by file id, as images and files
+_FILE_ID_MEDIA_TYPES = ("image", "application")
+# The path of the API, appended to the base URL to name the endpoint in the latency metrics
+_ENDPOINT_PATH = "responses"
+
+
+def _function_tool_param(tool: AIFunction[Any, Any]) -> FunctionToolParam:
+    """Build the Responses API spec of a function tool."""
+    params = tool.parameters()
+    params["additionalProperties"] = False
+    return FunctionToolParam(
+        name=tool.name,
+        parameters=params,
+        strict=False,
+        type="function",
+        description=tool.description,
+    )
+
+
 # region ResponsesClient
 
 
@@ -101,33 +136,29 @@ class OpenAIBaseResponsesClient(OpenAIBase, BaseChatClient):
         chat_options: ChatOptions,
         **kwargs: Any,
     ) -> ChatResponse:
-        options_dict = self._prepare_options(messages, chat_options)
+        timing = self._start_timing(_ENDPOINT_PATH, streaming=False)
+        with self._timed_preparation(timing):
+            # Only the media of the messages left after trimming to the context budget is uploaded
+            fitted_messages = self._fit_context(messages, chat_options)
+            await self._upload_media(fitted_messages, _FILE_ID_MEDIA_TYPES)
+            options_dict = self._prepare_options(fitted_messages, chat_options)
+            if timing is not None:
+                timing.prepared(options_dict["model"])
         try:
-            if not chat_options.response_format:
-                response = await self.client.responses.create(
-                    stream=False,
-                    **options_dict,
-                )
-                chat_options.conversation_id = (
-                    response.id if chat_options.store is True else None
-                )
-                return self._create_response_content(
-                    response, chat_options=chat_options
-                )
-            # create call does not support response_format, so we need to handle it via parse call
-            resp_format = chat_options.response_format
-            parsed_response: ParsedResponse[
-                BaseModel
-            ] = await self.client.responses.parse(
-                text_format=resp_format,
-                stream=False,
-                **options_dict,
-            )
-            chat_options.conversation_id = (
-                parsed_response.id if chat_options.store is True else None
-            )
-            return self._create_response_content(
-                parsed_response, chat_options=chat_options
+            response = await self._timed_response(
+                timing,
+                self._coalesced(
+                    options_dict,
+                    chat_options,
+                    lambda: self._cached(
+                        options_dict,
+                        chat_options,
+                        lambda: self._hedged(
+                            options_dict,
+                            lambda: self._get_response_once(options_dict, chat_options),
+                        ),
+                    ),
+                ),
             )
         except BadRequestError as ex:
             if ex.code == "content_filter":
@@ -144,6 +175,33 @@ class OpenAIBaseResponsesClient(OpenAIBase, BaseChatClient):
                 f"{type(self)} service failed to complete the prompt: {ex}",
                 inner_exception=ex,
             ) from ex
+        chat_options.conversation_id = (
+            response.conversation_id if chat_options.store is True else None
+        )
+        return response
+
+    async def _get_response_once(
+        self, options_dict: dict[str, Any], chat_options: ChatOptions
+    ) -> ChatResponse:
+        """Send one non-streaming request, hedging may call this twice for one response."""
+        async with (
+            self._rate_limited(options_dict) as reservation,
+            self._concurrency_slot() as permit,
+        ):
+            response = await self._send(
+                self.client.responses,
+                reservation,
+                permit=permit,
+                stream=False,
+                **options_dict,
+            )
+            chat_response = self._create_response_content(
+                response, chat_options=chat_options
+            )
+            if reservation is not None:
+                reservation.settle(chat_response.usage_details)
+            self._record_prompt_cache(options_dict, chat_response.usage_details)
+            return chat_response
 
     async def _inner_get_streaming_response(
         self,
@@ -152,36 +210,45 @@ class OpenAIBaseResponsesClient(OpenAIBase, BaseChatClient):
         chat_options: ChatOptions,
         **kwargs: Any,
     ) -> AsyncIterable[ChatResponseUpdate]:
-        options_dict = self._prepare_options(messages, chat_options)
-        function_call_ids: dict[
-            int, tuple[str, str]
-        ] = {}  # output_index: (call_id, name)
+        timing = self._start_timing(_ENDPOINT_PATH, streaming=True)
+        with self._timed_preparation(timing):
+            # Only the media of the messages left after trimming to the context budget is uploaded
+            fitted_messages = self._fit_context(messages, chat_options)
+            await self._upload_media(fitted_messages, _FILE_ID_MEDIA_TYPES)
+            options_dict = self._prepare_options(fitted_messages, chat_options)
+            if timing is not None:
+                timing.prepared(options_dict["model"])
+        updates = self._coalesced_updates(
+            self._timed_updates(
+                timing,
+                self._cached_stream(
+                    options_dict,
+                    chat_options,
+                    lambda: self._stream_once(options_dict, chat_options),
+                ),
+            )
+        )
+        if kwargs.get("partial_values") and chat_options.response_format:
+            from ._partial_json import _with_partial_values
+
+            updates = _with_partial_values(updates, chat_options.response_format)
+        async for update in updates:
+            yield update
+
+    async def _stream_once(
+        self, options_dict: dict[str, Any], chat_options: ChatOptions
+    ) -> AsyncIterable[ChatResponseUpdate]:
+        """Send one streaming request, or subscribe to an identical one in flight."""
+        tool_calls = StreamingToolCallAssembler()
         try:
-            if not chat_options.response_format:
-                response = await self.client.responses.create(
-                    stream=True,
-                    **options_dict,
+            async for chunk in self._coalesced_stream(
+                options_dict,
+                chat_options,
+                lambda: self._stream_events(options_dict, chat_options),
+            ):
+                yield self._create_streaming_response_content(
+                    chunk, chat_options=chat_options, tool_calls=tool_calls
                 )
-                async for chunk in response:
-                    update = self._create_streaming_response_content(
-                        chunk,
-                        chat_options=chat_options,
-                        function_call_ids=function_call_ids,
-                    )
-                    yield update
-                return
-            # create call does not support response_format, so we need to handle it via stream call
-            async with self.client.responses.stream(
-                text_format=chat_options.response_format,
-                **options_dict,
-            ) as response:
-                async for chunk in response:
-                    update = self._create_streaming_response_content(
-                        chunk,
-                        chat_options=chat_options,
-                        function_call_ids=function_call_ids,
-                    )
-                    yield update
         except BadRequestError as ex:
             if ex.code == "content_filter":
                 raise OpenAIContentFilterException(
@@ -198,11 +265,47 @@ class OpenAIBaseResponsesClient(OpenAIBase, BaseChatClient):
                 inner_exception=ex,
             ) from ex
 
+    async def _stream_events(
+        self, options_dict: dict[str, Any], chat_options: ChatOptions
+    ) -> AsyncIterable[OpenAIResponseStreamEvent]:
+        """Send one streaming request, yielding its raw events."""
+        async with (
+            self._rate_limited(options_dict) as reservation,
+            self._concurrency_slot() as permit,
+        ):
+            response = await self._send(
+                self.client.responses,
+                reservation,
+                permit=permit,
+                stream=True,
+                **options_dict,
+            )
+            async for event in response:
+                self._settle_from_event(options_dict, reservation, event)
+                yield event
+
+    def _settle_from_event(
+        self,
+        options_dict: dict[str, Any],
+        reservation: "RateLimitReservation | None",
+        event: OpenAIResponseStreamEvent,
+    ) -> None:
+        if (
+            event.type == "response.completed"
+            and event.response.usage
+            and (usage := self._usage_details_from_openai(event.response.usage))
+        ):
+            if reservation is not None:
+                reservation.settle(usage)
+            self._record_prompt_cache(options_dict, usage)
+
     # region Prep methods
 
     def _tools_to_response_tools(
         self, tools: Sequence[ToolProtocol | MutableMapping[str, Any]]
     ) -> list[ToolParam | dict[str, Any]]:
+        if (cached := self._tool_specs.get_all(tools)) is not None:
+            return cached
         response_tools: list[ToolParam | dict[str, Any]] = []
         for tool in tools:
             if isinstance(tool, ToolProtocol):
@@ -271,17 +374,7 @@ class OpenAIBaseResponsesClient(OpenAIBase, BaseChatClient):
                             )
                         )
                     case AIFunction():
-                        params = tool.parameters()
-                        params["additionalProperties"] = False
-                        response_tools.append(
-                            FunctionToolParam(
-                                name=tool.name,
-                                parameters=params,
-                                strict=False,
-                                type="function",
-                                description=tool.description,
-                            )
-                        )
+                        response_tools.append(self._tool_specs.get(tool))
                     case HostedFileSearchTool():
                         if not tool.inputs:
                             raise ValueError(
@@ -352,14 +445,21 @@ class OpenAIBaseResponsesClient(OpenAIBase, BaseChatClient):
                     response_tools.append(tool_dict)
         return response_tools
 
+    @cached_property
+    def _tool_specs(self) -> "ToolSpecCache[ToolParam | dict[str, Any]]":
+        """The compiled specs of the function tools, so their JSON schemas are not rebuilt on every request."""
+        from ._caching import ToolSpecCache
+
+        return ToolSpecCache(_function_tool_param)
+
     def _prepare_options(
-        self, messages: MutableSequence[ChatMessage], chat_options: ChatOptions
+        self, messages: Sequence[ChatMessage], chat_options: ChatOptions
     ) -> dict[str, Any]:
         """Take ChatOptions and create the specific options for Responses API."""
         options_dict: dict[str, Any] = chat_options.to_dict(
             exclude={
                 "type",
-                "response_format",  # handled in inner get methods
+                "response_format",  # sent as text.format
                 "presence_penalty",  # not supported
                 "frequency_penalty",  # not supported
                 "logit_bias",  # not supported
@@ -403,6 +503,15 @@ class OpenAIBaseResponsesClient(OpenAIBase, BaseChatClient):
                     options_dict[key] = value
         if "store" not in options_dict:
             options_dict["store"] = False
+        if chat_options.response_format:
+            from ._caching import response_formats
+
+            # The compiled schema of the type, instead of the parse and stream helpers that rebuild it per call
+            options_dict["text"] = {
+                **(options_dict.get("text") or {}),
+                "format": response_formats.text_format(chat_options.response_format),
+            }
+        self._apply_prompt_caching(options_dict)
         return options_dict
 
     def _prepare_chat_messages_for_request(
@@ -532,6 +641,16 @@ class OpenAIBaseResponsesClient(OpenAIBase, BaseChatClient):
                 return ret
             case DataContent() | UriContent():
                 if content.has_top_level_media_type("image"):
+                    if file_id := self._uploaded_file_id(content):
+                        return {
+                            "type": "input_image",
+                            "file_id": file_id,
+                            "detail": content.additional_properties.get(
+                                "detail", "auto"
+                            )
+                            if content.additional_properties
+                            else "auto",
+                        }
                     return {
                         "type": "input_image",
                         "image_url": content.uri,
@@ -566,6 +685,8 @@ class OpenAIBaseResponsesClient(OpenAIBase, BaseChatClient):
                         and content.additional_properties
                         else None
                     )
+                    if file_id := self._uploaded_file_id(content):
+                        return {"type": "input_file", "file_id": file_id}
                     file_obj = {
                         "type": "input_file",
                         "file_data": content.uri,
@@ -628,13 +749,11 @@ class OpenAIBaseResponsesClient(OpenAIBase, BaseChatClient):
 
     def _create_response_content(
         self,
-        response: OpenAIResponse | ParsedResponse[BaseModel],
+        response: OpenAIResponse,
         chat_options: ChatOptions,
     ) -> "ChatResponse":
         """Create a chat message content object from a choice."""
-        structured_response: BaseModel | None = (
-            response.output_parsed if isinstance(response, ParsedResponse) else None
-        )  # type: ignore[reportUnknownMemberType]
+        structured_response: BaseModel | None = None
 
         metadata: dict[str, Any] = response.metadata or {}
         contents: list[Contents] = []
@@ -662,6 +781,15 @@ class OpenAIBaseResponsesClient(OpenAIBase, BaseChatClient):
                     for message_content in item.content:  # type: ignore[reportMissingTypeArgument]
                         match message_content.type:
                             case "output_text":
+                                if (
+                                    chat_options.response_format
+                                    and structured_response is None
+                                ):
+                                    from ._caching import response_formats
+
+                                    structured_response = response_formats.validator(
+                                        chat_options.response_format
+                                    )(message_content.text)
                                 text_content = TextContent(
                                     text=message_content.text,
                                     raw_representation=message_content,  # type: ignore[reportUnknownArgumentType]
@@ -898,9 +1026,16 @@ class OpenAIBaseResponsesClient(OpenAIBase, BaseChatClient):
         self,
         event: OpenAIResponseStreamEvent,
         chat_options: ChatOptions,
-        function_call_ids: dict[int, tuple[str, str]],
+        tool_calls: StreamingToolCallAssembler,
     ) -> ChatResponseUpdate:
-        """Create a streaming chat message content object from a choice."""
+        """Create a streaming chat message content object from a choice.
+
+        Args:
+            event: The streamed event.
+            chat_options: The chat options of the request.
+            tool_calls: Assembles the function call arguments of the stream by output index, each
+                call is emitted once when its arguments are complete.
+        """
         metadata: dict[str, Any] = {}
         contents: list[Contents] = []
         conversation_id: str | None = None
@@ -1003,6 +1138,7 @@ class OpenAIBaseResponsesClient(OpenAIBase, BaseChatClient):
                     event.response.id if chat_options.store is True else None
                 )
                 model = event.response.model
+                contents.extend(tool_calls.finish_all())
                 if event.response.usage:
                     usage = self._usage_details_from_openai(event.response.usage)
                     if usage:
@@ -1027,9 +1163,14 @@ class OpenAIBaseResponsesClient(OpenAIBase, BaseChatClient):
                     # McpApprovalRequest,
                     # ResponseCustomToolCall,
                     case "function_call":
-                        function_call_ids[event.output_index] = (
-                            event_item.call_id,
-                            event_item.name,
+                        tool_calls.add(
+                            event.output_index,
+                            call_id=event_item.call_id,
+                            name=event_item.name,
+                            additional_properties={
+                                "output_index": event.output_index,
+                                "fc_id": event_item.id,
+                            },
                         )
                     case "mcp_approval_request":
                         contents.append(
@@ -1098,20 +1239,13 @@ class OpenAIBaseResponsesClient(OpenAIBase, BaseChatClient):
                             "Unparsed event of type: %s: %s", event.type, event
                         )
             case "response.function_call_arguments.delta":
-                call_id, name = function_call_ids.get(event.output_index, (None, None))
-                if call_id and name:
-                    contents.append(
-                        FunctionCallContent(
-                            call_id=call_id,
-                            name=name,
-                            arguments=event.delta,
-                            additional_properties={
-                                "output_index": event.output_index,
-                                "fc_id": event.item_id,
-                            },
-                            raw_representation=event,
-                        )
-                    )
+                if call := tool_calls.add(
+                    event.output_index, event.delta, raw_representation=event
+                ):
+                    contents.append(call)
+            case "response.function_call_arguments.done":
+                if call := tool_calls.finish(event.output_index, event.arguments):
+                    contents.append(call)
             case _:
                 logger.debug("Unparsed event of type: %s: %s", event.type, event)
 
@@ -1169,6 +1303,21 @@ class OpenAIResponsesClient(OpenAIConfigMixin, OpenAIBaseResponsesClient):
         base_url: str | None = None,
         default_headers: Mapping[str, str] | None = None,
         async_client: AsyncOpenAI | None = None,
+        client_registry: "OpenAIClientRegistry | None" = None,
+        http2: bool | None = None,
+        http2_max_concurrent_streams: int | None = None,
+        cassette: "CassetteTransport | None" = None,
+        concurrency_limiter: "AdaptiveConcurrencyLimiter | None" = None,
+        endpoint_pool: "OpenAIEndpointPool | None" = None,
+        rate_limiter: "OpenAIRateLimiter | None" = None,
+        hedging: "HedgingPolicy | None" = None,
+        response_cache: "ResponseCache | None" = None,
+        request_coalescer: "RequestCoalescer | None" = None,
+        stream_coalescing: "StreamCoalescing | None" = None,
+        prompt_caching: "PromptCaching | None" = None,
+        context_budget: "ContextBudget | None" = None,
+        media_uploads: "MediaUploadCache | None" = None,
+        latency_metrics: "LatencyMetrics | None" = None,
         instruction_role: str | None = None,
         env_file_path: str | None = None,
         env_file_encoding: str | None = None,
@@ -1188,6 +1337,40 @@ class OpenAIResponsesClient(OpenAIConfigMixin, OpenAIBaseResponsesClient):
             default_headers: The default headers mapping of string keys to
                 string values for HTTP requests.
             async_client: An existing client to use.
+            client_registry: A registry to share a pooled AsyncOpenAI client with other
+                clients using the same endpoint, credentials and headers,
+                for example ``get_shared_client_registry()``. Ignored when async_client is set.
+            http2: Whether to multiplex requests over HTTP/2 connections, requires the 'h2' package.
+                Ignored when async_client is set. Can also be set via environment variable OPENAI_HTTP2.
+            http2_max_concurrent_streams: The maximum number of concurrent streams per HTTP/2 connection,
+                up to 100. Can also be set via environment variable OPENAI_HTTP2_MAX_CONCURRENT_STREAMS.
+            cassette: A transport that records the exchanges with the service to a file, or replays them
+                offline at the recorded or an accelerated pace, see CassetteTransport. Ignored when
+                async_client is set.
+            concurrency_limiter: An adaptive (AIMD) limiter of the number of concurrent calls, raised on
+                success and cut on 429/503 responses or rising latency. Can be shared between clients.
+            endpoint_pool: A pool of endpoints serving the same models to balance the requests over,
+                with latency and error based routing and failover. Ignored when async_client is set.
+            rate_limiter: A limiter for the requests and tokens per minute of the account, requests wait
+                for capacity instead of failing with rate limit errors. Share it between clients of the
+                same account, for example with ``get_shared_rate_limiter(api_key)``.
+            hedging: A policy that sends a second attempt for non-streaming calls that have not completed
+                by a latency percentile deadline, the first to finish wins. Streaming calls are not hedged.
+            response_cache: An exact-match cache of the responses, keyed on the prepared request. Only
+                requests at temperature 0 without tools are cached by default, streaming calls replay hits.
+            request_coalescer: Shares one call between identical requests in flight at the same time, for
+                example the same prompt fanned out by a workflow. Streams are teed to all of their requests.
+            stream_coalescing: Merges the streamed text deltas into fewer updates, flushed after a delay or
+                a number of characters, and immediately on tool calls, usage and the finish reason.
+            prompt_caching: Keeps the prefix of the requests stable for the service's prompt cache, sets a
+                prompt_cache_key per tenant and conversation, and aggregates the cached tokens per agent and
+                model, see PromptCaching.
+            context_budget: Keeps the messages and tools of the requests within a token budget, trimming
+                the messages with its strategy and reporting what was trimmed, see ContextBudget.
+            media_uploads: Uploads the images and documents attached as data to the Files API once, and
+                sends them by file id on every later turn, see MediaUploadCache.
+            latency_metrics: Records the time to first token, inter-token gaps, duration, throughput and
+                preparation time of the requests per agent, model and endpoint, see LatencyMetrics.
             instruction_role: The role to use for 'instruction' messages, for example,
                 "system" or "developer". If not provided, the default is "system".
             env_file_path: Use the environment settings file as a fallback
@@ -1210,6 +1393,13 @@ class OpenAIResponsesClient(OpenAIConfigMixin, OpenAIBaseResponsesClient):
 
                 # Or loading from a .env file
                 client = OpenAIResponsesClient(env_file_path="path/to/.env")
+
+                # Streaming a structured output with its partial values, as soon as its fields complete
+                async for update in client.get_streaming_response(
+                    "Extract the invoice", response_format=Invoice, partial_values=True
+                ):
+                    if partial := (update.additional_properties or {}).get("partial_value"):
+                        render(partial)
         """
         try:
             openai_settings = OpenAISettings(
@@ -1217,6 +1407,8 @@ class OpenAIResponsesClient(OpenAIConfigMixin, OpenAIBaseResponsesClient):
                 org_id=org_id,
                 base_url=base_url,
                 responses_model_id=model_id,
+                http2=http2,
+                http2_max_concurrent_streams=http2_max_concurrent_streams,
                 env_file_path=env_file_path,
                 env_file_encoding=env_file_encoding,
             )
@@ -1225,7 +1417,11 @@ class OpenAIResponsesClient(OpenAIConfigMixin, OpenAIBaseResponsesClient):
                 "Failed to create OpenAI settings.", ex
             ) from ex
 
-        if not async_client and not openai_settings.api_key:
+        if (
+            not async_client
+            and not openai_settings.api_key
+            and not (endpoint_pool and endpoint_pool.primary_api_key)
+        ):
             raise ServiceInitializationError(
                 "OpenAI API key is required. Set via 'api_key' parameter or 'OPENAI_API_KEY' environment variable."
             )
@@ -1241,6 +1437,21 @@ class OpenAIResponsesClient(OpenAIConfigMixin, OpenAIBaseResponsesClient):
             org_id=openai_settings.org_id,
             default_headers=default_headers,
             client=async_client,
+            client_registry=client_registry,
+            http2=openai_settings.http2,
+            http2_max_concurrent_streams=openai_settings.http2_max_concurrent_streams,
+            cassette=cassette,
+            concurrency_limiter=concurrency_limiter,
+            endpoint_pool=endpoint_pool,
+            rate_limiter=rate_limiter,
+            hedging=hedging,
+            response_cache=response_cache,
+            request_coalescer=request_coalescer,
+            stream_coalescing=stream_coalescing,
+            prompt_caching=prompt_caching,
+            context_budget=context_budget,
+            media_uploads=media_uploads,
+            latency_metrics=latency_metrics,
             instruction_role=instruction_role,
             base_url=openai_settings.base_url,
         )
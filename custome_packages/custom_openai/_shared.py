@@ -1,24 +1,25 @@
 # Copyright (c) Microsoft. All rights reserved.
 
+import asyncio
 import logging
-from collections.abc import Awaitable, Callable, Mapping
+import weakref
+from collections.abc import (
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterator,
+    Mapping,
+    Sequence,
+)
+from contextlib import asynccontextmanager, contextmanager
 from copy import copy
-from typing import Any, ClassVar, Union
+from functools import cache
+from typing import TYPE_CHECKING, Any, ClassVar, TypeVar, Union
 
 import openai
-from openai import (
-    AsyncOpenAI,
-    AsyncStream,
-    _legacy_response,  # type: ignore
-)
-from openai.types import Completion
-from openai.types.audio import Transcription
-from openai.types.chat import ChatCompletion, ChatCompletionChunk
-from openai.types.images_response import ImagesResponse
-from openai.types.responses.response import Response
-from openai.types.responses.response_stream_event import ResponseStreamEvent
-from packaging import version
-from pydantic import SecretStr
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from pydantic import BaseModel, SecretStr
 
 from agent_framework._logging import get_logger
 from agent_framework._pydantic import AFBaseSettings
@@ -28,39 +29,76 @@ from agent_framework._telemetry import (
     USER_AGENT_KEY,
     prepend_agent_framework_to_user_agent,
 )
-from agent_framework._types import ChatOptions
+from agent_framework._types import (
+    ChatMessage,
+    ChatOptions,
+    ChatResponse,
+    ChatResponseUpdate,
+    UsageDetails,
+)
 from agent_framework.exceptions import ServiceInitializationError
 
+if TYPE_CHECKING:
+    # The feature modules are only imported when their feature is configured
+    from ._client_registry import OpenAIClientRegistry
+    from ._coalescing import RequestCoalescer
+    from ._concurrency import AdaptiveConcurrencyLimiter, ConcurrencyPermit
+    from ._context_budget import ContextBudget
+    from ._endpoint_pool import OpenAIEndpointPool
+    from ._hedging import HedgingPolicy
+    from ._latency_metrics import LatencyMetrics, RequestTiming
+    from ._media_uploads import MediaUploadCache
+    from ._prompt_caching import PromptCaching
+    from ._rate_limits import OpenAIRateLimiter, RateLimitReservation
+    from ._response_cache import ResponseCache
+    from ._streaming import StreamCoalescing
+    from ._transports import CassetteTransport
+
+    # Only needed for the RESPONSE_TYPE alias, these are not imported at runtime to keep imports light
+    from openai import AsyncStream, _legacy_response  # type: ignore
+    from openai.types import Completion
+    from openai.types.audio import Transcription
+    from openai.types.chat import ChatCompletion, ChatCompletionChunk
+    from openai.types.images_response import ImagesResponse
+    from openai.types.responses.response import Response
+    from openai.types.responses.response_stream_event import ResponseStreamEvent
+
 logger: logging.Logger = get_logger("agent_framework.openai")
 
 
 RESPONSE_TYPE = Union[
-    ChatCompletion,
-    Completion,
-    AsyncStream[ChatCompletionChunk],
-    AsyncStream[Completion],
+    "ChatCompletion",
+    "Completion",
+    "AsyncStream[ChatCompletionChunk]",
+    "AsyncStream[Completion]",
     list[Any],
-    ImagesResponse,
-    Response,
-    AsyncStream[ResponseStreamEvent],
-    Transcription,
-    _legacy_response.HttpxBinaryResponseContent,
+    "ImagesResponse",
+    "Response",
+    "AsyncStream[ResponseStreamEvent]",
+    "Transcription",
+    "_legacy_response.HttpxBinaryResponseContent",
 ]
 
 OPTION_TYPE = Union[ChatOptions, dict[str, Any]]
 
+TResult = TypeVar("TResult")
+
 
 __all__ = [
     "OpenAISettings",
 ]
 
 
+@cache
 def _check_openai_version_for_callable_api_key() -> None:
     """Check if OpenAI version supports callable API keys.
 
     Callable API keys require OpenAI >= 1.106.0.
     If the version is too old, raise a ServiceInitializationError with helpful message.
+    The result is cached, so the check only runs once per process.
     """
+    from packaging import version
+
     try:
         current_version = version.parse(openai.__version__)
         min_required_version = version.parse("1.106.0")
@@ -99,6 +137,10 @@ class OpenAISettings(AFBaseSettings):
             Can be set via environment variable OPENAI_CHAT_MODEL_ID.
         responses_model_id: The OpenAI responses model ID to use, for example, gpt-4o or o1.
             Can be set via environment variable OPENAI_RESPONSES_MODEL_ID.
+        http2: Whether to multiplex requests over HTTP/2 connections, requires the 'h2' package.
+            Can be set via environment variable OPENAI_HTTP2.
+        http2_max_concurrent_streams: The maximum number of concurrent streams per HTTP/2 connection.
+            Can be set via environment variable OPENAI_HTTP2_MAX_CONCURRENT_STREAMS.
         env_file_path: The path to the .env file to load settings from.
         env_file_encoding: The encoding of the .env file, defaults to 'utf-8'.
 
@@ -126,6 +168,8 @@ class OpenAISettings(AFBaseSettings):
     org_id: str | None = None
     chat_model_id: str | None = None
     responses_model_id: str | None = None
+    http2: bool = False
+    http2_max_concurrent_streams: int | None = None
 
 
 class OpenAIBase(SerializationMixin):
@@ -139,12 +183,41 @@ class OpenAIBase(SerializationMixin):
         Keyword Args:
             client: The AsyncOpenAI client instance.
             model_id: The AI model ID to use (non-empty, whitespace stripped).
+            rate_limiter: A limiter the requests wait on before they are sent.
+            concurrency_limiter: An adaptive limiter of the number of concurrent calls.
+            hedging: A policy sending a second attempt for slow non-streaming calls.
+            response_cache: An exact-match cache of the responses of deterministic requests.
+            request_coalescer: Shares one call between identical requests in flight at the same time.
+            stream_coalescing: Merges the streamed text deltas within a time and size window.
+            prompt_caching: Lays out the requests for the prompt cache and reports its hits.
+            context_budget: Trims the messages of the requests to a token budget before they are sent.
+            media_uploads: Uploads the media payloads once and sends them by file id afterwards.
+            latency_metrics: Records the time to first token, inter-token gaps, duration, throughput and
+                preparation time of the requests.
             **kwargs: Additional keyword arguments.
         """
         if not model_id or not model_id.strip():
             raise ValueError("model_id must be a non-empty string")
         self.client = client
         self.model_id = model_id.strip()
+        self._rate_limiter: OpenAIRateLimiter | None = kwargs.pop("rate_limiter", None)
+        self._concurrency_limiter: AdaptiveConcurrencyLimiter | None = kwargs.pop(
+            "concurrency_limiter", None
+        )
+        self._hedging: HedgingPolicy | None = kwargs.pop("hedging", None)
+        self._response_cache: ResponseCache | None = kwargs.pop("response_cache", None)
+        self._request_coalescer: RequestCoalescer | None = kwargs.pop(
+            "request_coalescer", None
+        )
+        self._stream_coalescing: StreamCoalescing | None = kwargs.pop(
+            "stream_coalescing", None
+        )
+        self._prompt_caching: PromptCaching | None = kwargs.pop("prompt_caching", None)
+        self._context_budget: ContextBudget | None = kwargs.pop("context_budget", None)
+        self._media_uploads: MediaUploadCache | None = kwargs.pop("media_uploads", None)
+        self._latency_metrics: LatencyMetrics | None = kwargs.pop(
+            "latency_metrics", None
+        )
 
         # Call super().__init__() to continue MRO chain (e.g., BaseChatClient)
         # Extract known kwargs that belong to other base classes
@@ -190,6 +263,269 @@ class OpenAIBase(SerializationMixin):
 
         return api_key  # Pass callable, string, or None directly to OpenAI SDK
 
+    @asynccontextmanager
+    async def _rate_limited(
+        self, options_dict: Mapping[str, Any]
+    ) -> "AsyncIterator[RateLimitReservation | None]":
+        """Wait for and reserve rate limiter capacity for a request, when a rate limiter is configured.
+
+        Args:
+            options_dict: The prepared options of the request, used to estimate its tokens.
+        """
+        if self._rate_limiter is None:
+            yield None
+            return
+        reservation = await self._rate_limiter.reserve(options_dict)
+        try:
+            yield reservation
+        except openai.APIStatusError as ex:
+            reservation.observe_headers(ex.response.headers)
+            if ex.status_code == 429:
+                reservation.cancel()
+            raise
+
+    @asynccontextmanager
+    async def _concurrency_slot(self) -> "AsyncIterator[ConcurrencyPermit | None]":
+        """Hold a slot of the concurrency limiter for the duration of a call, when one is configured."""
+        if self._concurrency_limiter is None:
+            yield None
+            return
+        async with self._concurrency_limiter.slot() as permit:
+            yield permit
+
+    async def _hedged(
+        self, options_dict: Mapping[str, Any], attempt: Callable[[], Awaitable[TResult]]
+    ) -> TResult:
+        """Run a non-streaming call, through the hedging policy when one is configured and the request is eligible."""
+        if self._hedging is None or not self._hedging.eligible(options_dict):
+            return await attempt()
+        return await self._hedging.run(attempt)
+
+    def _response_cache_key(
+        self, options_dict: Mapping[str, Any], chat_options: ChatOptions
+    ) -> str | None:
+        """Get the response cache key of a request, None without a cache or when the request is not cacheable."""
+        if self._response_cache is None:
+            return None
+        return self._response_cache.key(
+            options_dict, str(self.client.base_url), chat_options.response_format
+        )
+
+    async def _cached(
+        self,
+        options_dict: Mapping[str, Any],
+        chat_options: ChatOptions,
+        call: Callable[[], Awaitable[ChatResponse]],
+    ) -> ChatResponse:
+        """Answer a non-streaming call from the response cache, when one is configured and the request is cacheable."""
+        key = self._response_cache_key(options_dict, chat_options)
+        if key is None or self._response_cache is None:
+            return await call()
+        cached = await self._response_cache.get(
+            key, _response_format_type(chat_options)
+        )
+        if cached is not None:
+            return cached
+        response = await call()
+        await self._response_cache.set(key, response)
+        return response
+
+    async def _cached_stream(
+        self,
+        options_dict: Mapping[str, Any],
+        chat_options: ChatOptions,
+        stream: Callable[[], AsyncIterable[ChatResponseUpdate]],
+    ) -> AsyncIterator[ChatResponseUpdate]:
+        """Answer a streaming call from the response cache, replaying a hit and caching a completed stream."""
+        key = self._response_cache_key(options_dict, chat_options)
+        if key is None or self._response_cache is None:
+            async for update in stream():
+                yield update
+            return
+        cached = await self._response_cache.get(
+            key, _response_format_type(chat_options)
+        )
+        if cached is not None:
+            for update in self._response_cache.replay(cached):
+                yield update
+            return
+        updates: list[ChatResponseUpdate] = []
+        async for update in stream():
+            updates.append(update)
+            yield update
+        await self._response_cache.set(
+            key, ChatResponse.from_chat_response_updates(updates)
+        )
+
+    async def _coalesced(
+        self,
+        options_dict: Mapping[str, Any],
+        chat_options: ChatOptions,
+        call: Callable[[], Awaitable[ChatResponse]],
+    ) -> ChatResponse:
+        """Share a non-streaming call with identical requests in flight, when a request coalescer is configured."""
+        if self._request_coalescer is None:
+            return await call()
+        key = self._request_coalescer.key(
+            options_dict, str(self.client.base_url), chat_options.response_format
+        )
+        response = await self._request_coalescer.run(key, call)
+        # The function invocation layer adds to the messages of a response, every request gets its own list
+        response = copy(response)
+        response.messages = list(response.messages)
+        return response
+
+    def _coalesced_stream(
+        self,
+        options_dict: Mapping[str, Any],
+        chat_options: ChatOptions,
+        source: Callable[[], AsyncIterable[TResult]],
+    ) -> AsyncIterable[TResult]:
+        """Subscribe to the raw chunks of an identical stream in flight, when a request coalescer is configured.
+
+        Every subscriber parses the chunks itself, so it gets its own updates.
+        """
+        if self._request_coalescer is None:
+            return source()
+        key = self._request_coalescer.key(
+            options_dict,
+            str(self.client.base_url),
+            chat_options.response_format,
+            "stream",
+        )
+        return self._request_coalescer.stream(key, source)
+
+    def _coalesced_updates(
+        self, updates: AsyncIterable[ChatResponseUpdate]
+    ) -> AsyncIterable[ChatResponseUpdate]:
+        """Merge the streamed text deltas, when stream coalescing is configured."""
+        if self._stream_coalescing is None:
+            return updates
+        from ._streaming import coalesce_updates
+
+        return coalesce_updates(updates, self._stream_coalescing)
+
+    def _fit_context(
+        self, messages: Sequence[ChatMessage], chat_options: ChatOptions
+    ) -> Sequence[ChatMessage]:
+        """Trim the messages of a request to the context budget, when one is configured.
+
+        The clients fit the messages before uploading their media, so the payloads of trimmed messages are not uploaded.
+        """
+        if self._context_budget is None:
+            return messages
+        return self._context_budget.fit(messages, chat_options.tools)
+
+    async def _upload_media(
+        self, messages: Sequence[ChatMessage], media_types: Sequence[str]
+    ) -> None:
+        """Upload the media payloads of the messages, when a media upload cache is configured.
+
+        Args:
+            messages: The messages of a request.
+            media_types: The top-level media types the API accepts by file id.
+        """
+        if self._media_uploads is not None:
+            await self._media_uploads.upload(self.client, messages, media_types)
+
+    def _uploaded_file_id(self, content: Any) -> str | None:
+        """Get the file id of an uploaded media payload, None when it is sent inline."""
+        if self._media_uploads is None:
+            return None
+        return self._media_uploads.file_id(content)
+
+    def _start_timing(self, api: str, *, streaming: bool) -> "RequestTiming | None":
+        """Start timing a request to an API of the client, when latency metrics are configured."""
+        if self._latency_metrics is None:
+            return None
+        return self._latency_metrics.start(
+            self.model_id, f"{self.client.base_url}{api}", streaming=streaming
+        )
+
+    @contextmanager
+    def _timed_preparation(self, timing: "RequestTiming | None") -> Iterator[None]:
+        """Record a request that fails or is cancelled while it is prepared, like a rejection of the context budget."""
+        if timing is None:
+            yield
+            return
+        try:
+            yield
+        except Exception:
+            timing.fail()
+            raise
+        except asyncio.CancelledError:
+            timing.cancel()
+            raise
+
+    def _timed_updates(
+        self,
+        timing: "RequestTiming | None",
+        updates: AsyncIterable[ChatResponseUpdate],
+    ) -> AsyncIterable[ChatResponseUpdate]:
+        """Record the timing of the updates of a stream, when latency metrics are configured."""
+        if timing is None:
+            return updates
+        from ._latency_metrics import timed_updates
+
+        return timed_updates(timing, updates)
+
+    def _timed_response(
+        self, timing: "RequestTiming | None", response: Awaitable[ChatResponse]
+    ) -> Awaitable[ChatResponse]:
+        """Record the timing of a non-streaming request, when latency metrics are configured."""
+        if timing is None:
+            return response
+        from ._latency_metrics import timed_response
+
+        return timed_response(timing, response)
+
+    def _apply_prompt_caching(self, options_dict: dict[str, Any]) -> None:
+        """Lay out the request for the prompt cache and set its cache key, when prompt caching is configured."""
+        if self._prompt_caching is not None:
+            self._prompt_caching.prepare(options_dict)
+
+    def _record_prompt_cache(
+        self, options_dict: Mapping[str, Any], usage: UsageDetails | None
+    ) -> None:
+        """Count the cached input tokens of a request, when prompt caching is configured."""
+        if self._prompt_caching is not None:
+            self._prompt_caching.record(str(options_dict.get("model")), usage)
+
+    async def _send(
+        self,
+        resource: Any,
+        reservation: "RateLimitReservation | None",
+        /,
+        permit: "ConcurrencyPermit | None" = None,
+        method: str = "create",
+        **kwargs: Any,
+    ) -> Any:
+        """Call a method of an SDK resource, reading the rate limit headers when a reservation is given.
+
+        Args:
+            resource: The SDK resource, for example ``self.client.chat.completions``.
+            reservation: The rate limiter reservation of the request, if any.
+            permit: The concurrency limiter slot of the request, if any, it records the time to the response.
+            method: The name of the method to call.
+            kwargs: The arguments of the method.
+        """
+        if reservation is None:
+            result = await getattr(resource, method)(**kwargs)
+        else:
+            raw_response = await getattr(resource.with_raw_response, method)(**kwargs)
+            reservation.observe_headers(raw_response.headers)
+            result = raw_response.parse()
+        if permit is not None:
+            permit.responded()
+        return result
+
+
+def _response_format_type(chat_options: ChatOptions) -> type[BaseModel] | None:
+    response_format = chat_options.response_format
+    if isinstance(response_format, type) and issubclass(response_format, BaseModel):
+        return response_format
+    return None
+
 
 class OpenAIConfigMixin(OpenAIBase):
     """Internal class for configuring a connection to an OpenAI service."""
@@ -205,6 +541,21 @@ class OpenAIConfigMixin(OpenAIBase):
         client: AsyncOpenAI | None = None,
         instruction_role: str | None = None,
         base_url: str | None = None,
+        client_registry: "OpenAIClientRegistry | None" = None,
+        http2: bool = False,
+        http2_max_concurrent_streams: int | None = None,
+        endpoint_pool: "OpenAIEndpointPool | None" = None,
+        cassette: "CassetteTransport | None" = None,
+        rate_limiter: "OpenAIRateLimiter | None" = None,
+        concurrency_limiter: "AdaptiveConcurrencyLimiter | None" = None,
+        hedging: "HedgingPolicy | None" = None,
+        response_cache: "ResponseCache | None" = None,
+        request_coalescer: "RequestCoalescer | None" = None,
+        stream_coalescing: "StreamCoalescing | None" = None,
+        prompt_caching: "PromptCaching | None" = None,
+        context_budget: "ContextBudget | None" = None,
+        media_uploads: "MediaUploadCache | None" = None,
+        latency_metrics: "LatencyMetrics | None" = None,
         **kwargs: Any,
     ) -> None:
         """Initialize a client for OpenAI services.
@@ -226,6 +577,35 @@ class OpenAIConfigMixin(OpenAIBase):
                 messages, for example, summarization prompts could use `developer` or `system`. (Optional)
             base_url: The optional base URL to use. If provided will override the standard value for a OpenAI connector.
                 Will not be used when supplying a custom client.
+            client_registry: A registry to get a shared, pooled AsyncOpenAI client from,
+                instead of creating a new one. Will not be used when supplying a custom client.
+            http2: Whether to multiplex requests over HTTP/2 connections instead of one HTTP/1.1
+                connection per request. Will not be used when supplying a custom client.
+            http2_max_concurrent_streams: The maximum number of concurrent streams per HTTP/2 connection,
+                up to 100. Only used when http2 is enabled.
+            endpoint_pool: A pool of endpoints to balance the requests over, with health based failover.
+                Takes precedence over client_registry and http2, configure the pool's transport instead.
+                Will not be used when supplying a custom client.
+            cassette: A transport that records the exchanges with the service to a file, or replays them
+                offline. Takes precedence over endpoint_pool, client_registry and http2, configure the
+                cassette's transport instead. Will not be used when supplying a custom client.
+            rate_limiter: A limiter for the requests and tokens per minute, shared by all clients of an account.
+            concurrency_limiter: An adaptive (AIMD) limiter of the number of concurrent calls.
+            hedging: A policy sending a second attempt for non-streaming calls that miss a latency deadline.
+            response_cache: An exact-match cache of the responses of deterministic requests.
+            request_coalescer: Shares one call between identical requests in flight at the same time,
+                teeing the stream of a streaming call to all of its requests.
+            stream_coalescing: Merges the streamed text deltas until a delay has passed or a number of
+                characters is buffered, flushing immediately on other content.
+            prompt_caching: Sends the tool specs in a canonical order, sets a prompt_cache_key per tenant
+                and conversation, and aggregates the prompt cache hits per agent and model.
+            context_budget: Counts the tokens of the messages and tools, cached per message, and trims the
+                messages with a pluggable strategy when they exceed the budget, before the request is sent.
+            media_uploads: Uploads the images and documents attached as data to the Files API once, keyed on
+                their content hash, and references them by file id instead of inlining them on every turn.
+            latency_metrics: Records the time to first token, inter-token gaps, duration, output tokens per
+                second and preparation time of the requests per agent, model and endpoint, in fixed-bucket
+                histograms, and exports them to OpenTelemetry when observability is enabled.
             kwargs: Additional keyword arguments.
 
         """
@@ -238,10 +618,51 @@ class OpenAIConfigMixin(OpenAIBase):
         # Handle callable API key using base class method
         api_key_value = self._get_api_key(api_key)
 
+        pooled_client: AsyncOpenAI | None = None
+        if not client and cassette is not None:
+            if not api_key_value:
+                raise ServiceInitializationError("Please provide an api_key")
+            args: dict[str, Any] = {
+                "api_key": api_key_value,
+                "default_headers": merged_headers,
+                "http_client": DefaultAsyncHttpxClient(transport=cassette),
+            }
+            if org_id:
+                args["organization"] = org_id
+            if base_url:
+                args["base_url"] = base_url
+            client = AsyncOpenAI(**args)
+        if not client and endpoint_pool is not None:
+            api_key_value = api_key_value or endpoint_pool.primary_api_key
+            if not api_key_value:
+                raise ServiceInitializationError("Please provide an api_key")
+            base_url = base_url or endpoint_pool.primary_base_url
+            args = {
+                "api_key": api_key_value,
+                "default_headers": merged_headers,
+                "base_url": base_url,
+                "http_client": DefaultAsyncHttpxClient(
+                    transport=endpoint_pool.create_transport(base_url)
+                ),
+            }
+            if org_id:
+                args["organization"] = org_id
+            client = AsyncOpenAI(**args)
+        if not client and client_registry is not None:
+            if not api_key_value:
+                raise ServiceInitializationError("Please provide an api_key")
+            client = pooled_client = client_registry.acquire(
+                api_key=api_key_value,
+                org_id=org_id,
+                base_url=base_url,
+                default_headers=merged_headers,
+                http2=http2,
+                http2_max_concurrent_streams=http2_max_concurrent_streams,
+            )
         if not client:
             if not api_key:
                 raise ServiceInitializationError("Please provide an api_key")
-            args: dict[str, Any] = {
+            args = {
                 "api_key": api_key_value,
                 "default_headers": merged_headers,
             }
@@ -249,6 +670,12 @@ class OpenAIConfigMixin(OpenAIBase):
                 args["organization"] = org_id
             if base_url:
                 args["base_url"] = base_url
+            if http2:
+                from ._transports import _http2_client_args
+
+                args["http_client"] = DefaultAsyncHttpxClient(
+                    **_http2_client_args(http2_max_concurrent_streams)
+                )
             client = AsyncOpenAI(**args)
 
         # Store configuration as instance attributes for serialization
@@ -268,7 +695,43 @@ class OpenAIConfigMixin(OpenAIBase):
         }
         if instruction_role:
             args["instruction_role"] = instruction_role
+        if rate_limiter is not None:
+            args["rate_limiter"] = rate_limiter
+        if concurrency_limiter is not None:
+            args["concurrency_limiter"] = concurrency_limiter
+        if hedging is not None:
+            args["hedging"] = hedging
+        if response_cache is not None:
+            args["response_cache"] = response_cache
+        if request_coalescer is not None:
+            args["request_coalescer"] = request_coalescer
+        if stream_coalescing is not None:
+            args["stream_coalescing"] = stream_coalescing
+        if prompt_caching is not None:
+            args["prompt_caching"] = prompt_caching
+        if context_budget is not None:
+            args["context_budget"] = context_budget
+        if media_uploads is not None:
+            args["media_uploads"] = media_uploads
+        if latency_metrics is not None:
+            args["latency_metrics"] = latency_metrics
 
         # Ensure additional_properties and middleware are passed through kwargs to BaseChatClient
         # These are consumed by BaseChatClient.__init__ via kwargs
         super().__init__(**args, **kwargs)
+
+        # Hand the pooled client back to the registry once this client goes away
+        self._client_registry = client_registry if pooled_client else None
+        self._client_finalizer = (
+            weakref.finalize(self, client_registry.release_nowait, pooled_client)  # type: ignore[union-attr]
+            if pooled_client is not None
+            else None
+        )
+
+    async def close(self) -> None:
+        """Release the pooled AsyncOpenAI client, if this client got one from a registry."""
+        if self._client_finalizer is None or self._client_registry is None:
+            return
+        if detached := self._client_finalizer.detach():
+            _, _, (pooled_client,), _ = detached
+            await self._client_registry.release(pooled_client)
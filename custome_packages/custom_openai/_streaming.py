@@ -0,0 +1,230 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import asyncio
+from collections.abc import AsyncIterable, AsyncIterator
+from dataclasses import dataclass
+from typing import Any
+
+from agent_framework._types import ChatResponseUpdate, TextContent
+
+__all__ = ["LeanStreaming", "StreamCoalescing"]
+
+# The number of coalesced updates a stream reads ahead of its consumer
+_MAX_QUEUED_UPDATES = 64
+# Marks the end of a coalesced stream in its queue
+_END = object()
+
+
+@dataclass(frozen=True)
+class LeanStreaming:
+    """Settings of the lean streaming mode of the chat completion client.
+
+    In the lean mode the chunks of a stream are turned into updates with less work per chunk:
+    text deltas are coalesced into one update until ``max_text_chars`` characters are buffered or
+    another kind of content arrives, the creation time is formatted once per stream, the per-chunk
+    metadata (system fingerprint and logprobs) is not collected, and chunks that do not change the
+    content, like the first role-only delta or a tool call fragment that is still incomplete, do not
+    produce an update. Use the default mode when logprobs are needed.
+
+    Attributes:
+        max_text_chars: The number of buffered text characters that flushes an update,
+            1 emits every text delta as it arrives. Tool calls, usage and the finish reason
+            flush the buffered text immediately.
+        raw_representation: Whether to keep the SDK chunk that flushed an update as its raw
+            representation, dropped by default so the chunks can be freed right away.
+
+    Examples:
+        .. code-block:: python
+
+            from custom_openai import LeanStreaming, OpenAIChatClient
+
+            client = OpenAIChatClient(model_id="gpt-4o-mini", lean_streaming=LeanStreaming())
+            async for update in client.get_streaming_response("Tell me a story"):
+                print(update.text, end="")
+    """
+
+    max_text_chars: int = 64
+    raw_representation: bool = False
+
+    def __post_init__(self) -> None:
+        if self.max_text_chars < 1:
+            raise ValueError("max_text_chars must be at least 1")
+
+
+@dataclass(frozen=True)
+class StreamCoalescing:
+    """Settings of the coalescing of the streamed text deltas of a client.
+
+    Consecutive text deltas of the same message are merged into one update, which is emitted when
+    ``max_delay`` seconds have passed since its first delta or when ``max_chars`` characters are
+    buffered, whichever comes first. The delay is kept with a timer, so the buffered text is also
+    emitted when the service pauses. Any other update, like a tool call, the usage or the finish
+    reason, first flushes the buffered text and is then emitted right away.
+
+    A merged update keeps the ids and additional properties of its first delta, and the raw
+    representations of all of its deltas as a list.
+
+    Attributes:
+        max_delay: The maximum number of seconds a text delta is held back.
+        max_chars: The number of buffered text characters that flushes an update.
+
+    Examples:
+        .. code-block:: python
+
+            from custom_openai import OpenAIResponsesClient, StreamCoalescing
+
+            client = OpenAIResponsesClient(
+                model_id="gpt-4o-mini",
+                stream_coalescing=StreamCoalescing(max_delay=0.05, max_chars=256),
+            )
+    """
+
+    max_delay: float = 0.05
+    max_chars: int = 256
+
+    def __post_init__(self) -> None:
+        if self.max_delay <= 0:
+            raise ValueError("max_delay must be positive")
+        if self.max_chars < 1:
+            raise ValueError("max_chars must be at least 1")
+
+
+class _Failure:
+    """The exception a coalesced stream failed with."""
+
+    __slots__ = ("exception",)
+
+    def __init__(self, exception: BaseException) -> None:
+        self.exception = exception
+
+
+def _is_text_delta(update: ChatResponseUpdate) -> bool:
+    return (
+        update.finish_reason is None
+        and bool(update.contents)
+        and all(
+            type(content) is TextContent
+            and not content.annotations
+            and not content.additional_properties
+            for content in update.contents
+        )
+    )
+
+
+def _same_message(first: ChatResponseUpdate, update: ChatResponseUpdate) -> bool:
+    return (
+        first.message_id == update.message_id
+        and first.response_id == update.response_id
+        and first.role == update.role
+    )
+
+
+def _merge(updates: list[ChatResponseUpdate]) -> ChatResponseUpdate:
+    first = updates[0]
+    if len(updates) == 1:
+        return first
+    raw_representations = [update.raw_representation for update in updates]
+    return ChatResponseUpdate(
+        contents=[
+            TextContent(
+                text="".join(
+                    content.text  # type: ignore[union-attr]
+                    for update in updates
+                    for content in update.contents
+                )
+            )
+        ],
+        role=first.role,
+        author_name=first.author_name,
+        response_id=first.response_id,
+        message_id=first.message_id,
+        conversation_id=first.conversation_id,
+        model_id=first.model_id,
+        created_at=first.created_at,
+        additional_properties=first.additional_properties,
+        raw_representation=raw_representations
+        if any(raw is not None for raw in raw_representations)
+        else None,
+    )
+
+
+async def coalesce_updates(
+    updates: AsyncIterable[ChatResponseUpdate], coalescing: StreamCoalescing
+) -> AsyncIterator[ChatResponseUpdate]:
+    """Merge the text deltas of a stream of updates, see StreamCoalescing.
+
+    The stream is read by a task of its own, so a timer can flush the buffered text while the
+    next delta has not arrived yet. The task is cancelled when the iteration stops early.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[Any] = asyncio.Queue(_MAX_QUEUED_UPDATES)
+    buffered: list[ChatResponseUpdate] = []
+    buffered_chars = 0
+    timer: asyncio.TimerHandle | None = None
+
+    def take() -> ChatResponseUpdate:
+        nonlocal buffered_chars, timer
+        if timer is not None:
+            timer.cancel()
+            timer = None
+        update = _merge(buffered)
+        buffered.clear()
+        buffered_chars = 0
+        return update
+
+    def on_timer() -> None:
+        nonlocal timer
+        timer = None
+        if not buffered:
+            return
+        if queue.full():
+            # The consumer is behind, the text is not held back by the coalescing
+            timer = loop.call_later(coalescing.max_delay, on_timer)
+            return
+        queue.put_nowait(take())
+
+    async def read() -> None:
+        nonlocal buffered_chars, timer
+        iterator = aiter(updates)
+        try:
+            async for update in iterator:
+                if not _is_text_delta(update):
+                    if buffered:
+                        await queue.put(take())
+                    await queue.put(update)
+                    continue
+                if buffered and not _same_message(buffered[0], update):
+                    await queue.put(take())
+                buffered.append(update)
+                buffered_chars += sum(
+                    len(content.text)  # type: ignore[union-attr]
+                    for content in update.contents
+                )
+                if buffered_chars >= coalescing.max_chars:
+                    await queue.put(take())
+                elif timer is None:
+                    timer = loop.call_later(coalescing.max_delay, on_timer)
+            end: Any = _END
+        except Exception as ex:
+            end = _Failure(ex)
+        finally:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        if buffered:
+            await queue.put(take())
+        await queue.put(end)
+
+    reader = asyncio.create_task(read())
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.exception
+            yield item
+    finally:
+        reader.cancel()
+        if timer is not None:
+            timer.cancel()
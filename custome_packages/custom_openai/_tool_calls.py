@@ -0,0 +1,164 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import json
+import re
+from collections.abc import Hashable
+from typing import Any
+
+from agent_framework._types import FunctionCallContent
+
+# The characters that change the nesting of a JSON document, everything else is skipped by the scanner
+_STRUCTURAL = re.compile(r'[{}\[\]"\\]')
+
+
+class _PendingCall:
+    """The state of one streamed tool call."""
+
+    __slots__ = (
+        "call_id",
+        "name",
+        "parts",
+        "depth",
+        "started",
+        "in_string",
+        "escaped",
+        "emitted",
+        "additional_properties",
+        "raw_representation",
+    )
+
+    def __init__(self) -> None:
+        self.call_id = ""
+        self.name = ""
+        self.parts: list[str] = []
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+        self.emitted = False
+        self.additional_properties: dict[str, Any] | None = None
+        self.raw_representation: Any = None
+
+    def scan(self, text: str) -> bool:
+        """Track the nesting of a new fragment, returns True when the top-level value is closed."""
+        skip = 0 if self.escaped else -1
+        self.escaped = False
+        for match in _STRUCTURAL.finditer(text):
+            position = match.start()
+            if position == skip:
+                continue
+            char = match.group()
+            if self.in_string:
+                if char == "\\":
+                    if position + 1 == len(text):
+                        self.escaped = True
+                    else:
+                        skip = position + 1
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+                self.started = True
+            elif char in "}]":
+                self.depth -= 1
+        return self.started and self.depth <= 0 and not self.in_string
+
+    def content(self, arguments: str | None = None) -> FunctionCallContent:
+        self.emitted = True
+        return FunctionCallContent(
+            call_id=self.call_id,
+            name=self.name,
+            arguments="".join(self.parts) if arguments is None else arguments,
+            additional_properties=self.additional_properties,
+            raw_representation=self.raw_representation,
+        )
+
+
+class StreamingToolCallAssembler:
+    """Assembles the streamed argument fragments of tool calls into one FunctionCallContent per call.
+
+    Fragments are keyed by the position of the call in the response, the tool call index for chat
+    completions and the output index for the Responses API. The nesting of the arguments is tracked
+    as the fragments arrive, so a call is emitted as soon as its arguments are a complete and valid
+    JSON object, while later calls are still being streamed. Calls that never become valid JSON are
+    emitted as they are when the stream finishes.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, _PendingCall] = {}
+
+    def add(
+        self,
+        key: Hashable,
+        arguments: str | None = None,
+        *,
+        call_id: str | None = None,
+        name: str | None = None,
+        additional_properties: dict[str, Any] | None = None,
+        raw_representation: Any = None,
+    ) -> FunctionCallContent | None:
+        """Add a fragment of a call.
+
+        Args:
+            key: The position of the call in the response.
+            arguments: The next fragment of the arguments.
+
+        Keyword Args:
+            call_id: The id of the call, usually only sent with the first fragment.
+            name: The name of the function, usually only sent with the first fragment.
+            additional_properties: Additional properties of the emitted content.
+            raw_representation: The raw representation of the emitted content, the first one is kept.
+
+        Returns:
+            The complete call when this fragment completed its arguments, otherwise None.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = _PendingCall()
+        if call_id:
+            call.call_id = call_id
+        if name:
+            call.name = name
+        if additional_properties:
+            call.additional_properties = {
+                **(call.additional_properties or {}),
+                **additional_properties,
+            }
+        if call.raw_representation is None:
+            call.raw_representation = raw_representation
+        if not arguments or call.emitted:
+            return None
+        call.parts.append(arguments)
+        if not call.scan(arguments) or not call.name:
+            return None
+        text = "".join(call.parts)
+        try:
+            if not isinstance(json.loads(text), dict):
+                return None
+        except ValueError:
+            return None
+        return call.content(text)
+
+    def finish(
+        self, key: Hashable, arguments: str | None = None
+    ) -> FunctionCallContent | None:
+        """Finish a call, returning it when it was not emitted yet.
+
+        Args:
+            key: The position of the call in the response.
+            arguments: The final arguments when the service sends them, replacing the fragments.
+        """
+        call = self._calls.get(key)
+        if call is None or call.emitted:
+            return None
+        return call.content(arguments)
+
+    def finish_all(self) -> list[FunctionCallContent]:
+        """Finish all calls, returning the ones that were not emitted yet."""
+        return [
+            content
+            for key in list(self._calls)
+            if (content := self.finish(key)) is not None
+        ]
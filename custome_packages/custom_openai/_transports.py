@@ -0,0 +1,617 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import asyncio
+import base64
+import codecs
+import gzip
+import hashlib
+import importlib.util
+import json
+import time
+from collections import defaultdict
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any, Literal, cast
+
+import httpx
+
+from agent_framework._logging import get_logger
+from agent_framework.exceptions import ServiceInitializationError
+
+logger = get_logger("agent_framework.openai")
+
+__all__ = [
+    "CassetteStats",
+    "CassetteTransport",
+    "HTTP2MultiplexTransport",
+    "HTTP2TransportStats",
+]
+
+# httpcore advertises this value as SETTINGS_MAX_CONCURRENT_STREAMS, so it caps every connection.
+HTTP2_MAX_STREAMS_PER_CONNECTION = 100
+
+
+@dataclass
+class HTTP2TransportStats:
+    """A snapshot of the state of an HTTP2MultiplexTransport.
+
+    Attributes:
+        connections: The number of connections currently open by the transport.
+        active_streams: The number of streams currently in flight across all connections.
+        waiting: The number of requests waiting for a free stream slot.
+        peak_streams: The highest number of concurrent streams seen.
+        http_version: The HTTP version negotiated with the server, None until the first response.
+    """
+
+    connections: int = 0
+    active_streams: int = 0
+    waiting: int = 0
+    peak_streams: int = 0
+    http_version: str | None = None
+
+
+class _ReleasingByteStream(httpx.AsyncByteStream):
+    """Wraps a response stream to free the stream slot once the response is closed."""
+
+    def __init__(
+        self, stream: httpx.AsyncByteStream, release: Callable[[], Awaitable[None]]
+    ) -> None:
+        self._stream = stream
+        self._release: Callable[[], Awaitable[None]] | None = release
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._release is not None:
+                release, self._release = self._release, None
+                await release()
+
+
+@dataclass
+class _Connection:
+    transport: httpx.AsyncHTTPTransport
+    active_streams: int = 0
+    failed: bool = False
+
+
+class HTTP2MultiplexTransport(httpx.AsyncBaseTransport):
+    """An httpx transport that multiplexes requests over as few HTTP/2 connections as possible.
+
+    Each connection carries up to ``max_concurrent_streams`` requests at a time. A new connection is only
+    opened when all existing ones are saturated, and requests wait for a free stream once
+    ``max_connections`` is reached. This requires the optional ``h2`` package (``pip install httpx[http2]``).
+
+    Unless ``http1`` is False, the first request is sent alone to learn the negotiated protocol. When the
+    server answers with HTTP/1.1, for example a cleartext ``http://`` endpoint or a proxy without HTTP/2,
+    the transport falls back to a regular pool of HTTP/1.1 connections instead of queueing the requests
+    on a single connection.
+
+    Examples:
+        .. code-block:: python
+
+            from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+            from custom_openai import HTTP2MultiplexTransport
+
+            transport = HTTP2MultiplexTransport(max_concurrent_streams=100)
+            client = AsyncOpenAI(http_client=DefaultAsyncHttpxClient(transport=transport))
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrent_streams: int = HTTP2_MAX_STREAMS_PER_CONNECTION,
+        max_connections: int | None = None,
+        keepalive_expiry: float | None = 5.0,
+        http1: bool = True,
+        **transport_kwargs: Any,
+    ) -> None:
+        """Initialize an HTTP2MultiplexTransport.
+
+        Keyword Args:
+            max_concurrent_streams: The maximum number of concurrent streams per connection,
+                between 1 and 100, the limit httpcore announces to servers.
+            max_connections: The maximum number of connections, unlimited when not set.
+            keepalive_expiry: The time in seconds an idle connection is kept open.
+            http1: Whether to fall back to HTTP/1.1 when the server does not negotiate HTTP/2.
+                Set to False to use HTTP/2 with prior knowledge, for example for cleartext ``http://`` servers.
+            transport_kwargs: Additional keyword arguments for each ``httpx.AsyncHTTPTransport``,
+                for example ``verify`` or ``cert``.
+        """
+        if importlib.util.find_spec("h2") is None:
+            raise ServiceInitializationError(
+                "HTTP/2 support requires the 'h2' package. "
+                "Please install it with 'pip install httpx[http2]'."
+            )
+        if not 1 <= max_concurrent_streams <= HTTP2_MAX_STREAMS_PER_CONNECTION:
+            raise ServiceInitializationError(
+                f"max_concurrent_streams must be between 1 and {HTTP2_MAX_STREAMS_PER_CONNECTION}, "
+                f"got {max_concurrent_streams}."
+            )
+        if max_connections is not None and max_connections < 1:
+            raise ServiceInitializationError("max_connections must be at least 1.")
+        self.max_concurrent_streams = max_concurrent_streams
+        self.max_connections = max_connections
+        self._keepalive_expiry = keepalive_expiry
+        self._http1 = http1
+        self._transport_kwargs = transport_kwargs
+        self._connections: list[_Connection] = []
+        self._condition = asyncio.Condition()
+        self._waiting = 0
+        self._peak_streams = 0
+        # Without HTTP/1.1 the protocol is known, otherwise the first response tells it
+        self._http_version: str | None = None if http1 else "HTTP/2"
+        self._probing = False
+        # The pooled HTTP/1.1 transport used once the server turned out not to speak HTTP/2
+        self._fallback: httpx.AsyncHTTPTransport | None = None
+
+    def _new_connection(self) -> _Connection:
+        connection = _Connection(
+            transport=httpx.AsyncHTTPTransport(
+                http1=self._http1,
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=1,
+                    max_keepalive_connections=1,
+                    keepalive_expiry=self._keepalive_expiry,
+                ),
+                **self._transport_kwargs,
+            )
+        )
+        self._connections.append(connection)
+        logger.debug("Opened HTTP/2 connection #%d", len(self._connections))
+        return connection
+
+    def _pick_connection(self) -> _Connection | None:
+        """Get the busiest connection that still has a free stream, to keep the connection count low."""
+        if self._http_version is None:
+            # Only the request learning the protocol is sent until its response arrives
+            if self._probing:
+                return None
+            self._probing = True
+        available = [
+            connection
+            for connection in self._connections
+            if connection.active_streams < self.max_concurrent_streams
+            and not connection.failed
+        ]
+        if available:
+            return max(available, key=lambda connection: connection.active_streams)
+        if (
+            self.max_connections is None
+            or len(self._connections) < self.max_connections
+        ):
+            return self._new_connection()
+        return None
+
+    async def _acquire_stream(self) -> _Connection | None:
+        """Get a connection with a free stream, or None once the transport fell back to HTTP/1.1."""
+        async with self._condition:
+            if self._fallback is not None:
+                return None
+            connection = self._pick_connection()
+            if connection is None:
+                self._waiting += 1
+                try:
+                    while (connection := self._pick_connection()) is None:
+                        await self._condition.wait()
+                        if self._fallback is not None:
+                            return None
+                finally:
+                    self._waiting -= 1
+            connection.active_streams += 1
+            active = sum(c.active_streams for c in self._connections)
+            self._peak_streams = max(self._peak_streams, active)
+            return connection
+
+    async def _release_stream(
+        self, connection: _Connection, *, failed: bool = False
+    ) -> None:
+        async with self._condition:
+            connection.active_streams -= 1
+            connection.failed |= failed
+            # Drop a failed connection once its streams are done, and an idle one the others can do without
+            others = len(self._connections) - 1
+            drop = connection.active_streams == 0 and (
+                connection.failed
+                or self._fallback is not None
+                or (
+                    others > 0
+                    and sum(c.active_streams for c in self._connections)
+                    <= others * self.max_concurrent_streams
+                )
+            )
+            if drop and connection in self._connections:
+                self._connections.remove(connection)
+            self._condition.notify_all()
+        if drop:
+            await connection.transport.aclose()
+
+    async def _probed(self, response: httpx.Response | None) -> None:
+        """Record the protocol of the first response, and fall back to HTTP/1.1 when it is not HTTP/2."""
+        async with self._condition:
+            self._probing = False
+            if response is not None and self._http_version is None:
+                self._http_version = response.extensions.get(
+                    "http_version", b""
+                ).decode()
+                if self._http_version != "HTTP/2":
+                    logger.warning(
+                        "The server negotiated %s instead of HTTP/2, using a pool of HTTP/1.1 connections.",
+                        self._http_version,
+                    )
+                    self._fallback = httpx.AsyncHTTPTransport(
+                        limits=httpx.Limits(
+                            max_connections=self.max_connections,
+                            keepalive_expiry=self._keepalive_expiry,
+                        ),
+                        **self._transport_kwargs,
+                    )
+            self._condition.notify_all()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        connection = await self._acquire_stream()
+        if connection is None:
+            return await self._fallback.handle_async_request(request)  # type: ignore[union-attr]
+        probing = self._http_version is None
+        try:
+            response = await connection.transport.handle_async_request(request)
+        except BaseException as ex:
+            if probing:
+                await self._probed(None)
+            # A cancelled request, like the losing attempt of a hedged call, leaves the connection usable
+            await self._release_stream(
+                connection, failed=not isinstance(ex, asyncio.CancelledError)
+            )
+            raise
+        if probing:
+            await self._probed(response)
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ReleasingByteStream(
+                cast(httpx.AsyncByteStream, response.stream),
+                lambda: self._release_stream(connection),
+            ),
+            extensions=response.extensions,
+        )
+
+    def stats(self) -> HTTP2TransportStats:
+        """Get a snapshot of the connection and stream counts."""
+        connections = len(self._connections)
+        if self._fallback is not None:
+            connections += len(self._fallback._pool.connections)
+        return HTTP2TransportStats(
+            connections=connections,
+            active_streams=sum(c.active_streams for c in self._connections),
+            waiting=self._waiting,
+            peak_streams=self._peak_streams,
+            http_version=self._http_version,
+        )
+
+    async def aclose(self) -> None:
+        connections, self._connections = self._connections, []
+        for connection in connections:
+            await connection.transport.aclose()
+        if self._fallback is not None:
+            await self._fallback.aclose()
+
+
+# The response headers kept in a cassette, the ones the SDK and the rate limiter read
+_RECORDED_HEADERS = ("content-type", "x-request-id", "openai-", "x-ratelimit-")
+
+
+@dataclass
+class CassetteStats:
+    """A snapshot of the exchanges of a CassetteTransport.
+
+    Attributes:
+        recorded: The number of exchanges recorded.
+        replayed: The number of requests answered from the cassette.
+        misses: The number of requests without a recorded exchange, answered with a 404 error.
+    """
+
+    recorded: int = 0
+    replayed: int = 0
+    misses: int = 0
+
+
+class _RecordingByteStream(httpx.AsyncByteStream):
+    """Passes a response stream through, collecting its chunks with their time since the request was sent."""
+
+    def __init__(
+        self,
+        stream: httpx.AsyncByteStream,
+        started: float,
+        finish: Callable[[list[list[Any]], str | None], None],
+    ) -> None:
+        self._stream = stream
+        self._started = started
+        self._finish: Callable[[list[list[Any]], str | None], None] | None = finish
+        self._chunks: list[list[Any]] = []
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            offset = round((time.perf_counter() - self._started) * 1000)
+            if self._chunks and self._chunks[-1][0] == offset:
+                # Chunks received within the same millisecond are stored as one
+                self._chunks[-1][1] += chunk
+            else:
+                self._chunks.append([offset, chunk])
+            yield chunk
+        if self._finish is not None:
+            finish, self._finish = self._finish, None
+            finish(*_encode_chunks(self._chunks))
+
+    async def aclose(self) -> None:
+        await self._stream.aclose()
+
+
+def _encode_chunks(chunks: list[list[Any]]) -> tuple[list[list[Any]], str | None]:
+    """Encode the body chunks of a response for a cassette, as text when the body is UTF-8, else base64."""
+    try:
+        b"".join(chunk for _, chunk in chunks).decode()
+    except UnicodeDecodeError:
+        return [
+            [offset, base64.b64encode(chunk).decode("ascii")]
+            for offset, chunk in chunks
+        ], "base64"
+    # A character can be split between chunks
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    return [[offset, decoder.decode(chunk)] for offset, chunk in chunks], None
+
+
+def _multipart_boundary(content_type: str) -> bytes | None:
+    """Get the boundary of a multipart content type, None for other content types."""
+    media_type, *params = content_type.split(";")
+    if not media_type.strip().lower().startswith("multipart/"):
+        return None
+    for param in params:
+        name, _, value = param.strip().partition("=")
+        if name.lower() == "boundary" and value:
+            return value.strip('"').encode("latin-1")
+    return None
+
+
+class _ReplayByteStream(httpx.AsyncByteStream):
+    """Yields the recorded chunks of a response, each at its recorded time divided by the speed."""
+
+    def __init__(
+        self,
+        chunks: list[list[Any]],
+        started: float,
+        speed: float | None,
+        encoding: str | None = None,
+    ) -> None:
+        self._chunks = chunks
+        self._started = started
+        self._speed = speed
+        self._encoding = encoding
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for offset, text in self._chunks:
+            if self._speed is not None:
+                delay = (
+                    self._started + offset / 1000 / self._speed - time.perf_counter()
+                )
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield (
+                base64.b64decode(text) if self._encoding == "base64" else text.encode()
+            )
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """An httpx transport that records the exchanges with the service to a cassette file and replays them.
+
+    In ``"record"`` mode the requests are sent through ``transport`` and each exchange is appended to the
+    cassette once its response is read: the status, the headers the SDK reads and the body chunks with
+    their time since the request was sent, so streamed (SSE) responses keep their pacing. In ``"replay"``
+    mode nothing is sent, each request is answered with an exchange recorded for its key, at the recorded
+    pace divided by ``speed``, or without delays when ``speed`` is None. The requests are matched on their
+    method, path, query and JSON body with sorted keys, without the ``ignore_fields``, or on their raw
+    body without the multipart boundary when it is not JSON, like a file upload. Requests with the same
+    key get their recorded exchanges in turn, cycling when there are more requests than recordings, so a
+    few recorded conversations can drive a high concurrency load test.
+
+    The cassette is a JSON Lines file with one exchange per line, gzip compressed when its name ends with
+    ``.gz``. Response bodies that are not UTF-8 text, like file contents, are stored base64 encoded.
+    Recording appends to it, delete the file to record afresh.
+
+    Examples:
+        .. code-block:: python
+
+            from custom_openai import CassetteTransport, OpenAIChatClient
+
+            # Record against the service once
+            client = OpenAIChatClient(cassette=CassetteTransport("chat.jsonl.gz", mode="record"))
+
+            # Replay offline, ten times faster than recorded
+            cassette = CassetteTransport("chat.jsonl.gz", mode="replay", speed=10)
+            client = OpenAIChatClient(api_key="replay", cassette=cassette)
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        mode: Literal["record", "replay"] = "replay",
+        speed: float | None = 1.0,
+        ignore_fields: Iterable[str] = (),
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        """Initialize a CassetteTransport.
+
+        Args:
+            path: The cassette file, gzip compressed when its name ends with ``.gz``.
+
+        Keyword Args:
+            mode: Whether to record the exchanges with the service or to replay the recorded ones.
+            speed: How many times faster than recorded the responses are replayed, None to replay them
+                without delays. Only used in replay mode.
+            ignore_fields: The top-level fields of the JSON request bodies left out of the request key,
+                for example ``"user"`` or ``"metadata"`` when they change from run to run.
+            transport: The transport the requests are sent through in record mode, a new
+                ``httpx.AsyncHTTPTransport`` when not set.
+        """
+        if mode not in ("record", "replay"):
+            raise ServiceInitializationError(
+                f"mode must be 'record' or 'replay', got {mode!r}."
+            )
+        if speed is not None and speed <= 0:
+            raise ServiceInitializationError("speed must be positive.")
+        self.path = Path(path)
+        self.mode = mode
+        self.speed = speed
+        self.ignore_fields = frozenset(ignore_fields)
+        self._transport = transport
+        self._exchanges: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        self._replays: dict[str, int] = defaultdict(int)
+        self._recorded = 0
+        self._replayed = 0
+        self._misses = 0
+        if mode == "record":
+            self._transport = transport or httpx.AsyncHTTPTransport()
+            return
+        if not self.path.exists():
+            raise ServiceInitializationError(
+                f"The cassette {self.path} does not exist, record it first."
+            )
+        with self._open("rt") as file:
+            for line in file:
+                if line.strip():
+                    exchange = json.loads(line)
+                    self._exchanges[exchange["key"]].append(exchange)
+
+    def _open(self, mode: str) -> IO[str]:
+        if self.path.suffix == ".gz":
+            return cast(IO[str], gzip.open(self.path, mode, encoding="utf-8"))
+        return self.path.open(mode, encoding="utf-8")
+
+    def request_key(self, request: httpx.Request) -> str:
+        """Get the key a request is matched on, a hash of its normalized method, path, query and body."""
+        body = request.content
+        try:
+            payload = json.loads(body) if body else None
+        except ValueError:
+            # Not JSON, for example a multipart upload, whose boundary is random per request
+            if boundary := _multipart_boundary(request.headers.get("content-type", "")):
+                body = body.replace(boundary, b"")
+            canonical = hashlib.sha256(body).hexdigest()
+        else:
+            if isinstance(payload, dict) and self.ignore_fields:
+                payload = {
+                    name: value
+                    for name, value in payload.items()
+                    if name not in self.ignore_fields
+                }
+            canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        query = sorted(request.url.params.multi_items())
+        text = f"{request.method} {request.url.path} {query}\n{canonical}"
+        return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        key = self.request_key(request)
+        started = time.perf_counter()
+        if self.mode == "replay":
+            return await self._replay(request, key, started)
+
+        # Recorded bodies are kept readable, so they are requested without compression
+        request.headers["accept-encoding"] = "identity"
+        response = await self._transport.handle_async_request(request)  # type: ignore[union-attr]
+        exchange: dict[str, Any] = {
+            "key": key,
+            "method": request.method,
+            "path": request.url.path,
+            "status": response.status_code,
+            "headers": {
+                name: value
+                for name, value in response.headers.items()
+                if name.startswith(_RECORDED_HEADERS)
+            },
+            "headers_ms": round((time.perf_counter() - started) * 1000),
+        }
+
+        def finish(chunks: list[list[Any]], encoding: str | None) -> None:
+            if encoding is not None:
+                exchange["encoding"] = encoding
+            exchange["chunks"] = chunks
+            with self._open("at") as file:
+                file.write(json.dumps(exchange, separators=(",", ":")) + "\n")
+            self._recorded += 1
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_RecordingByteStream(
+                cast(httpx.AsyncByteStream, response.stream), started, finish
+            ),
+            extensions=response.extensions,
+        )
+
+    async def _replay(
+        self, request: httpx.Request, key: str, started: float
+    ) -> httpx.Response:
+        exchanges = self._exchanges.get(key)
+        if not exchanges:
+            self._misses += 1
+            logger.warning(
+                "No recorded exchange in %s for %s %s",
+                self.path,
+                request.method,
+                request.url.path,
+            )
+            return httpx.Response(
+                404,
+                json={
+                    "error": {
+                        "message": f"No recorded exchange in {self.path} for "
+                        f"{request.method} {request.url.path} (key {key}).",
+                        "type": "cassette_miss",
+                    }
+                },
+                request=request,
+            )
+        exchange = exchanges[self._replays[key] % len(exchanges)]
+        self._replays[key] += 1
+        self._replayed += 1
+        if self.speed is not None:
+            await asyncio.sleep(exchange["headers_ms"] / 1000 / self.speed)
+        return httpx.Response(
+            status_code=exchange["status"],
+            headers=exchange["headers"],
+            stream=_ReplayByteStream(
+                exchange["chunks"], started, self.speed, exchange.get("encoding")
+            ),
+            request=request,
+        )
+
+    def stats(self) -> CassetteStats:
+        """Get a snapshot of the number of recorded, replayed and missed exchanges."""
+        return CassetteStats(
+            recorded=self._recorded, replayed=self._replayed, misses=self._misses
+        )
+
+    async def aclose(self) -> None:
+        if self._transport is not None:
+            await self._transport.aclose()
+
+
+def _http2_client_args(
+    max_concurrent_streams: int | None, limits: httpx.Limits | None = None
+) -> dict[str, Any]:
+    """Get the keyword arguments for an httpx client that uses an HTTP2MultiplexTransport."""
+    transport_args: dict[str, Any] = {}
+    if max_concurrent_streams is not None:
+        transport_args["max_concurrent_streams"] = max_concurrent_streams
+    if limits is not None:
+        transport_args["max_connections"] = limits.max_connections
+        transport_args["keepalive_expiry"] = limits.keepalive_expiry
+    return {"transport": HTTP2MultiplexTransport(**transport_args)}